@@ -1,44 +1,280 @@
 from maya import cmds, mel, OpenMayaUI
 import MayaData
 
+from AnimTools import skeletonBake, dgSampler, animCache, exportCache, sceneGuard, profiler
 
-def game_exporter(root_jnt='Root_jnt'):
+import numpy
+import math
+import os
+
+FBX_PLUGIN = 'fbxmaya'
+GAME_EXPORTER_PRESET = 'gameExporterPreset2'
+FBX_OPTIONS = (  # Animation export of a game skeleton, the Game Exporter's defaults
+    'FBXResetExport',
+    'FBXExportBakeComplexAnimation -v true',
+    'FBXExportBakeComplexStep -v 1',
+    'FBXExportBakeResampleAnimation -v true',
+    'FBXExportConstraints -v false',
+    'FBXExportInputConnections -v false',
+    'FBXExportSkeletonDefinitions -v true',
+    'FBXExportSkins -v false',
+    'FBXExportShapes -v false',
+    'FBXExportCameras -v false',
+    'FBXExportLights -v false',
+    'FBXExportInAscii -v false',
+)
+FBX_KEYS_OPTIONS = (  # Keeps reduced keys as they are
+    'FBXExportBakeComplexAnimation -v false',
+    'FBXExportBakeResampleAnimation -v false',
+)
+REDUCE_TOLERANCES = (0.01, math.radians(0.05))  # Centimeters and radians, the ikfk defaults
+
+
+class ClipCaches(object):
+    """Animation cache of every clip, written from the chunks of the skeleton bake as they are sampled."""
+    def __init__(self, clips, output_dir, name):
+        self.clips = clips
+        self.paths = [clip_path(output_dir, name, clip, animCache.EXTENSION) for clip, start, end in clips]
+        self.writers = list()
+
+    def open(self, joints, parents):
+        frame_rate = cmds.currentUnit(q=True, time=True)
+        self.writers = [animCache.CacheWriter(path, joints, parents, start_frame, frame_rate)
+                        for path, (clip, start_frame, end_frame) in zip(self.paths, self.clips)]
+
+    def write(self, frames, local):
+        with profiler.phase('cache write'):
+            frames = numpy.asarray(frames)
+            values = animCache.transforms(local)
+            for writer, (clip, start_frame, end_frame) in zip(self.writers, self.clips):
+                inside = (frames >= start_frame) & (frames <= end_frame)
+                if inside.any():
+                    writer.write(values[inside])
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+
+def sample_skeleton(namespace, frames, root_jnt='Root_jnt', caches=None, skeleton_data=None):
+    """
+    Copy of a character's skeleton in the root namespace and the channels keying it to follow the character in
+    world space on the frames, see skeletonBake.sample. caches, a ClipCaches, gets the animation streamed into it
+    while sampling. Returns the joints of the copy, their nodes and the channels.
+    """
+    with profiler.phase('skeleton'):
+        skeleton_data = skeleton_data or MayaData.skeleton.get(f'{namespace}:{root_jnt}', False, False)
+        if cmds.objExists(skeleton_data['joints'][0]):
+            cmds.delete(skeleton_data['joints'][0])
+
+        MayaData.skeleton.load(skeleton_data)
+
+    all_joints = [f'|{jnt}' if jnt == root_jnt else jnt for jnt in skeleton_data['joints']]
+    if caches is not None:
+        caches.open(skeleton_data['joints'], skeletonBake.parent_indices(skeletonBake.joint_nodes(all_joints)))
+
+    target_nodes, channels = skeletonBake.sample([f'{namespace}:{jnt}' for jnt in skeleton_data['joints']],
+                                                 all_joints, frames, caches.write if caches is not None else None)
+    return all_joints, target_nodes, channels
+
+
+def duplicate_skeleton(namespace, frames, root_jnt='Root_jnt', caches=None, skeleton_data=None):
+    """Copy of a character's skeleton keyed on the frames, see sample_skeleton. Returns the joints of the copy."""
+    all_joints, target_nodes, channels = sample_skeleton(namespace, frames, root_jnt, caches, skeleton_data)
+    skeletonBake.key(target_nodes, frames, channels)
+    return all_joints
+
+
+def set_game_clip(index, clip, start_frame, end_frame, export=True):
+    anim_clip = f'{GAME_EXPORTER_PRESET}.animClips[{index}]'
+    cmds.setAttr(f'{anim_clip}.animClipName', clip, type='string')
+    cmds.setAttr(f'{anim_clip}.animClipStart', start_frame)
+    cmds.setAttr(f'{anim_clip}.animClipEnd', end_frame)
+    cmds.setAttr(f'{anim_clip}.exportAnimClip', export)
+
+
+def save_game_clips():
+    """(clip name, start frame, end frame, export) of every Game Exporter animation clip row, see restore_game_clips."""
+    rows = list()
+    for index in cmds.getAttr(f'{GAME_EXPORTER_PRESET}.animClips', mi=1) or list():
+        anim_clip = f'{GAME_EXPORTER_PRESET}.animClips[{index}]'
+        rows.append(tuple(cmds.getAttr(f'{anim_clip}.{attribute}')
+                          for attribute in ('animClipName', 'animClipStart', 'animClipEnd', 'exportAnimClip')))
+    return rows
+
+
+def restore_game_clips(rows):
+    """Put back the animation clip rows save_game_clips returned, the rows added since are deleted."""
+    indices = cmds.getAttr(f'{GAME_EXPORTER_PRESET}.animClips', mi=1) or list()
+    for index in reversed(indices[len(rows):]):
+        mel.eval(f'gameExp_DeleteAnimationClipLayout {index};')
+    for index, row in zip(indices, rows):
+        set_game_clip(index, *row)
+
+
+def set_game_clips(clips):
+    """
+    Fill the Game Exporter's animation clips with (clip name, start frame, end frame), adding rows as needed and
+    turning off the export of the rows past the table. The rows the user had are overwritten, see save_game_clips.
+    """
+    while len(cmds.getAttr(f'{GAME_EXPORTER_PRESET}.animClips', mi=1) or list()) < len(clips):
+        mel.eval('gameExp_AddNewAnimationClip 1;')
+    indices = cmds.getAttr(f'{GAME_EXPORTER_PRESET}.animClips', mi=1)
+
+    for index, (clip, start_frame, end_frame) in zip(indices, clips):
+        set_game_clip(index, clip, start_frame, end_frame)
+    for index in indices[len(clips):]:
+        cmds.setAttr(f'{GAME_EXPORTER_PRESET}.animClips[{index}].exportAnimClip', False)
+
+
+def game_clips():
+    """(clip name, start frame, end frame) of the Game Exporter's animation clips turned on for export."""
+    clips = list()
+    for index in cmds.getAttr(f'{GAME_EXPORTER_PRESET}.animClips', mi=1) or list():
+        anim_clip = f'{GAME_EXPORTER_PRESET}.animClips[{index}]'
+        if cmds.getAttr(f'{anim_clip}.exportAnimClip'):
+            clips.append((cmds.getAttr(f'{anim_clip}.animClipName'), cmds.getAttr(f'{anim_clip}.animClipStart'),
+                          cmds.getAttr(f'{anim_clip}.animClipEnd')))
+    return clips
+
+
+def game_exporter(root_jnt='Root_jnt', clips=None):
+    """
+    Export the selected character with the Game Exporter. Without clips its animation clips are exported as they
+    are set, a new one covers the playback range when there is none. clips are (clip name, start frame, end frame)
+    written to the animation clips for this export only, the user's rows are put back afterwards. The skeleton is
+    sampled once over the frames of every clip turned on for export and the Game Exporter writes them all in one
+    export.
+    """
     selected = cmds.ls(sl=True)
     if not selected:
         print('Please select any part of the character you want to export')
         return
     selected_ns = ':'.join(selected[0].split(':')[:-1])
 
-    skeleton_data = MayaData.skeleton.get(f'{selected_ns}:{root_jnt}', False, False)
-    if cmds.objExists(skeleton_data['joints'][0]):
-        cmds.delete(skeleton_data['joints'][0])
+    if not OpenMayaUI.MQtUtil.findControl('gameExporterWindow'):
+        cmds.GameExporterWnd()
 
-    MayaData.skeleton.load(skeleton_data)
+    mel.eval('tabLayout -e -sti 2 "gameExporterTabLayout";')  # Change to animation tab
 
-    all_joints = list()
-    for jnt in skeleton_data['joints']:
-        base = f'{selected_ns}:{jnt}'
-        if jnt == root_jnt:
-            jnt = f'|{jnt}'
-        all_joints.append(jnt)
-        cmds.parentConstraint(base, jnt)
+    cmds.setAttr(f'{GAME_EXPORTER_PRESET}.exportSetIndex', 2)  # Change to export only selected objects
 
-    cmds.select(all_joints, r=True)
+    saved = save_game_clips()
+    try:
+        if clips:
+            set_game_clips(clips)
+        elif not saved:
+            mel.eval('gameExp_AddNewAnimationClip 1;')
 
-    if not OpenMayaUI.MQtUtil.findControl('gameExporterWindow'):
-        cmds.GameExporterWnd()
+        # Only the sampled frames are keyed on the copy, every range the Game Exporter writes has to be among them
+        frames = sorted(set().union(*(dgSampler.frame_range(start_frame, end_frame)
+                                      for clip, start_frame, end_frame in game_clips())))
+        if not frames:
+            print('No animation clip to export, turn one on in the Game Exporter')
+            return
 
-    mel.eval('tabLayout -e -sti 2 "gameExporterTabLayout";')  # Change to animation tab
+        with profiler.run('game export'), sceneGuard.SceneGuard('game export', len(frames)):
+            all_joints = duplicate_skeleton(selected_ns, frames, root_jnt)
+            try:
+                cmds.select(all_joints, r=True)
 
-    cmds.setAttr(f'gameExporterPreset2.exportSetIndex', 2)  # Change to export only selected objects
+                with profiler.phase('export'):
+                    profiler.frames(len(frames))
 
-    if not cmds.getAttr('gameExporterPreset2.animClips', mi=1):
-        mel.eval('gameExp_AddNewAnimationClip 1;')
+                    mel.eval('gameExp_DoExport;')
+            finally:
+                with profiler.phase('cleanup'):
+                    cmds.delete(all_joints)
+    finally:
+        restore_game_clips(saved)
+
+
+def clip_path(output_dir, name, clip='', extension='.fbx'):
+    return os.path.join(output_dir, f'{name}_{clip}{extension}' if clip else f'{name}{extension}')
+
+
+def export_fbx(path, start_frame, end_frame, resample=True):
+    """
+    Export the selection to an FBX file, its animation baked over the frame range. Without resample the keys are
+    written as they are, the selection has to be keyed over the frame range only.
+    """
+    for option in FBX_OPTIONS + (() if resample else FBX_KEYS_OPTIONS):
+        mel.eval(f'{option};')
+    mel.eval(f'FBXExportBakeComplexStart -v {start_frame};')
+    mel.eval(f'FBXExportBakeComplexEnd -v {end_frame};')
+    mel.eval(f'FBXExport -f "{path.replace(os.sep, "/")}" -s;')
+
+
+def export_clips(namespace, clips, output_dir, name=None, root_jnt='Root_jnt', cache=False, manifest=None,
+                 tolerances=None):
+    """
+    Export a character to FBX without the Game Exporter window or the user's selection, one file per clip.
+    clips are (clip name, start frame, end frame), files are named after name, the namespace by default.
+    With cache, every clip also gets an animCache file next to its FBX. With an exportCache.Manifest of the output
+    directory, clips whose files were exported from the same inputs are skipped and the new files are recorded in
+    it, saving it is up to the caller. With tolerances, (centimeters, radians) such as REDUCE_TOLERANCES, each clip
+    only gets the keys needed within them and the FBX export doesn't resample it. Returns the files of every clip,
+    skipped or exported.
+    """
+    if not namespace:
+        raise RuntimeError('Characters in the root namespace would be replaced by their skeleton copy')
+    os.makedirs(output_dir, exist_ok=True)
+
+    name = name or namespace.replace(':', '_')
+    skeleton_data = MayaData.skeleton.get(f'{namespace}:{root_jnt}', False, False)
+    outputs = [[clip_path(output_dir, name, clip)] + ([clip_path(output_dir, name, clip, animCache.EXTENSION)]
+                                                      if cache else []) for clip, start_frame, end_frame in clips]
+    paths = [path for clip_paths in outputs for path in clip_paths]
+
+    if manifest is not None:
+        settings = {'fbx': FBX_OPTIONS, 'root': root_jnt, 'cache': animCache.VERSION, 'tolerances': tolerances}
+        ends = [frame for clip, start_frame, end_frame in clips for frame in (start_frame, end_frame)]
+        joint_pose = exportCache.pose([f'{namespace}:{jnt}' for jnt in skeleton_data['joints']], ends)
+        digest = exportCache.input_hash(namespace, skeleton_data, settings, joint_pose)
+        hashes = [exportCache.clip_hash(digest, *clip) for clip in clips]
+        unchanged = [all([manifest.matches(path, clip_hash) for path in clip_paths])
+                     for clip_paths, clip_hash in zip(outputs, hashes)]
+        clips = [clip for clip, skip in zip(clips, unchanged) if not skip]
+        manifest.skipped += [path for clip_paths, skip in zip(outputs, unchanged) if skip for path in clip_paths]
+        if not clips:
+            return paths
+
+    frames = sorted(set().union(*(dgSampler.frame_range(start_frame, end_frame)
+                                  for clip, start_frame, end_frame in clips)))
+    if not frames:
+        print(f'No frame to export for {namespace}')
+        return [path for path in paths if manifest is not None and path in manifest.skipped]
 
-    anim_clip = 'gameExporterPreset2.animClips[0]'
+    if not cmds.pluginInfo(FBX_PLUGIN, q=True, loaded=True):
+        cmds.loadPlugin(FBX_PLUGIN, quiet=True)
+    caches = ClipCaches(clips, output_dir, name) if cache else None
 
-    mel.eval('gameExp_DoExport;')
-    mel.eval('gameExp_DeleteAnimationClipLayout 0;')
+    with profiler.run('fbx export'), sceneGuard.SceneGuard('fbx export', len(frames)):
+        try:
+            all_joints, target_nodes, channels = sample_skeleton(namespace, frames, root_jnt, caches, skeleton_data)
+        finally:
+            if caches is not None:
+                caches.close()
 
-    cmds.delete(all_joints)
+        try:
+            if not tolerances:
+                skeletonBake.key(target_nodes, frames, channels)
+            cmds.select(all_joints, r=True)
+            for clip, start_frame, end_frame in clips:
+                if tolerances:  # Every clip is keyed on its own frames, the file gets no key outside of them
+                    inside = [i for i, frame in enumerate(frames) if start_frame <= frame <= end_frame]
+                    cmds.cutKey(all_joints, clear=True)
+                    skeletonBake.key(target_nodes, [frames[i] for i in inside],
+                                     [values[:, inside] for values in channels], tolerances)
+                with profiler.phase('export'):
+                    export_fbx(clip_path(output_dir, name, clip), start_frame, end_frame, resample=not tolerances)
+            profiler.frames(len(frames))
+        finally:
+            with profiler.phase('cleanup'):
+                cmds.delete(all_joints)
 
+    if manifest is not None:
+        for clip_paths, clip_hash, skip in zip(outputs, hashes, unchanged):
+            for path in clip_paths if not skip else list():
+                manifest.record(path, clip_hash)
+    return paths
@@ -1,9 +1,13 @@
 
 from maya import OpenMayaUI, cmds
 from pathlib import Path
-import json
+import atexit
 
 from AnimTools.pyside import QtWidgets, QtCore, maya_window
+from AnimTools import sceneWatcher, selectionStore, selectionResolver, profiler
+
+FLUSH_MS = 500  # Changes made within this long are saved in one write
+SELECTED = 'Selected'  # Namespace box entry applying sets to the namespaces of the selected nodes
 
 
 class NameUI(QtWidgets.QDialog):
@@ -31,8 +35,87 @@ class NameUI(QtWidgets.QDialog):
         self.close()
 
 
+class SelectionModel(QtCore.QAbstractTableModel):
+    """
+    One row per stored set, only the names are held here and the members are fetched from the store when a set is
+    used. rows maps every name to its row, so adding or removing sets never scans the table.
+    """
+    def __init__(self, store, parent=None):
+        super(SelectionModel, self).__init__(parent)
+        self.store = store
+        self.names = list()
+        self.rows = dict()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self.names[index.row()]
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return name
+        if role == QtCore.Qt.UserRole:
+            return self.store.data.get(name, list())
+        return None
+
+    def flags(self, index):
+        return QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsEditable
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        """Renames a set, refused for empty names and names already taken."""
+        name = self.names[index.row()]
+        if role != QtCore.Qt.EditRole or not value or value == name or value in self.rows:
+            return False
+        self.store.rename(name, value)
+        self.names[index.row()] = value
+        self.rows[value] = self.rows.pop(name)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def index_rows(self):
+        self.rows = {name: row for row, name in enumerate(self.names)}
+
+    def sync(self):
+        """Follow the store after it was reloaded: new sets are appended, removed ones dropped."""
+        data = self.store.data
+        added = [name for name in data if name not in self.rows]
+        if len(self.rows) + len(added) != len(data):  # Some were removed
+            self.beginResetModel()
+            self.names = [name for name in self.names if name in data] + added
+            self.index_rows()
+            self.endResetModel()
+        elif added:
+            self.beginInsertRows(QtCore.QModelIndex(), len(self.names), len(self.names) + len(added) - 1)
+            self.names += added
+            self.index_rows()
+            self.endInsertRows()
+
+    def add(self, name):
+        if name in self.rows:
+            index = self.index(self.rows[name], 0)
+            self.dataChanged.emit(index, index)
+            return
+        row = len(self.names)
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self.names.append(name)
+        self.rows[name] = row
+        self.endInsertRows()
+
+    def remove(self, names):
+        for row in sorted((self.rows[name] for name in names if name in self.rows), reverse=True):
+            self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+            del self.names[row]
+            self.endRemoveRows()
+        self.index_rows()
+
+
 class SelectUI(QtWidgets.QDialog):
     ui_instance = None
+    stores = dict()  # Data path: SelectionStore, shared by every dialog
 
     @classmethod
     def show_ui(cls):
@@ -47,8 +130,8 @@ class SelectUI(QtWidgets.QDialog):
         cls.ui_instance.update_data(cls.ui_instance)
         cls.ui_instance.update_namespaces(cls.ui_instance)
 
-    def __init__(self, parent=maya_window()):
-        super(SelectUI, self).__init__(parent)
+    def __init__(self, parent=None):
+        super(SelectUI, self).__init__(parent or maya_window())
 
         self.setWindowTitle("Selection Helper")
         self.width = 280
@@ -58,27 +141,61 @@ class SelectUI(QtWidgets.QDialog):
 
         self.setWindowFlags(self.windowFlags() ^ QtCore.Qt.WindowContextHelpButtonHint)
 
-        self.selection_data = dict()
+        self.store = SelectUI.get_store()
+        self.resolver = selectionResolver.SelectionResolver()
+        self.namespaces = list()
+        self.namespaces_pending = False
+        self.watcher = sceneWatcher.SceneWatcher(self.scene_changed)
+
+        self.flush_timer = QtCore.QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FLUSH_MS)
 
         self.create_widgets()
         self.create_layouts()
         self.create_connections()
 
+    @property
+    def selection_data(self):
+        return self.store.data
+
+    def showEvent(self, event):
+        self.watcher.start()
+
+    def closeEvent(self, event):
+        self.watcher.stop()
+        self.resolver.forget()  # Nothing reports what changes while closed
+        self.save()
+
+    def scene_changed(self, namespace):
+        self.resolver.forget(namespace)
+        if self.namespaces_pending or namespace == '' or namespace in self.namespaces:
+            return
+        self.namespaces_pending = True
+        cmds.evalDeferred(self.refresh_namespaces)
+
+    def refresh_namespaces(self):
+        self.namespaces_pending = False
+        current = self.namespace_box.currentText()
+        SelectUI.update_namespaces(self)
+        if current in self.namespaces or current == SELECTED:
+            self.namespace_box.setCurrentText(current)
+
     def keyPressEvent(self, event):
         if event.key() == QtCore.Qt.Key_Delete:
             self.delete_selection()
     
     def contextMenuEvent(self, event):
-        position = self.base_table.mapFromGlobal(event.globalPos())
+        position = self.base_table.viewport().mapFromGlobal(event.globalPos())
 
         popup_menu = QtWidgets.QMenu(self)
-        
-        if self.base_table.itemAt(position):
-            selected_item = self.base_table.selectedItems()[0]
-            popup_menu.addAction('Rename', lambda: self.rename_selection(selected_item))
+
+        index = self.base_table.indexAt(position)
+        if index.isValid():
+            popup_menu.addAction('Rename', lambda: self.rename_selection(index))
             popup_menu.exec_(event.globalPos())
             return
-        
+
         popup_menu.addAction('Add Selection', self.handle_signal)
         popup_menu.exec_(event.globalPos())
 
@@ -93,49 +210,73 @@ class SelectUI(QtWidgets.QDialog):
             file_path.touch()
         return str(file_path)
 
+    @staticmethod
+    def get_store():
+        path = SelectUI.data_path()
+        if path not in SelectUI.stores:
+            SelectUI.stores[path] = selectionStore.SelectionStore(path)
+            atexit.register(SelectUI.stores[path].flush)  # Changes still waiting on the timer
+        return SelectUI.stores[path]
+
     @staticmethod
     def update_data(instance):
-        with open(SelectUI.data_path(), 'r') as f:
-            content = f.read().strip()
-            if content:
-                instance.selection_data = json.loads(content)
-                instance.refresh()
+        if instance.store.reload() or instance.model.rowCount() != len(instance.selection_data):
+            instance.refresh()
+
+    def save(self):
+        self.flush_timer.stop()
+        with profiler.run('save selections'), profiler.phase('write'):
+            self.store.flush()
+
+    def schedule_save(self):
+        self.flush_timer.start()
 
     @staticmethod
     def update_namespaces(instance):
         instance.namespace_box.clear()
         namespaces = [name for name in cmds.namespaceInfo(lon=True, r=True) if name not in ['UI', 'shared']] + ['None']
-        for name in namespaces:
+        instance.namespaces = namespaces
+        for name in namespaces + [SELECTED]:
             instance.namespace_box.addItem(name)
         instance.namespace_box.setCurrentText('None')
 
     def create_widgets(self):
-        self.base_table = QtWidgets.QTableWidget()
-        self.base_table.setColumnCount(1)
+        self.model = SelectionModel(self.store, self)
+        self.proxy = QtCore.QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+
+        self.filter_line = QtWidgets.QLineEdit()
+        self.filter_line.setPlaceholderText('Filter')
+
+        self.base_table = QtWidgets.QTableView()
+        self.base_table.setModel(self.proxy)
         self.base_table.horizontalHeader().setVisible(False)
         self.base_table.verticalHeader().setVisible(False)
+        self.base_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.base_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)  # Double click selects
 
         self.base_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.base_table.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)  # No per row sizing
 
         self.namespace_box = QtWidgets.QComboBox()
         SelectUI.update_namespaces(self)
 
     def create_layouts(self):
         main_layout = QtWidgets.QVBoxLayout(self)
+        main_layout.addWidget(self.filter_line)
         main_layout.addWidget(self.base_table)
         main_layout.addWidget(self.namespace_box)
 
     def create_connections(self):
-        self.base_table.itemDoubleClicked.connect(self.load_selection)
+        self.base_table.doubleClicked.connect(self.load_selection)
+        self.filter_line.textChanged.connect(self.proxy.setFilterFixedString)
+        self.model.dataChanged.connect(lambda *args: self.schedule_save())  # Renamed or overwritten sets
+        self.flush_timer.timeout.connect(self.save)
 
-    def get_items(self):
-        return [self.base_table.item(row, 0) for row in range(self.base_table.rowCount())]
-    
     def refresh(self):
-        current_items = [item.text() for item in self.get_items()]
-        for name, data in self.selection_data.items():
-            if name not in current_items:
-                self.new_selection(name, data)
+        with profiler.run('refresh selections'), profiler.phase('refresh'):
+            self.model.sync()
 
     def handle_signal(self):
         name_dialog = NameUI()
@@ -143,46 +284,41 @@ class SelectUI(QtWidgets.QDialog):
         name_dialog.show()
     
     def new_selection(self, name, selection=None):
-        
-        row = self.base_table.rowCount()
-        self.base_table.insertRow(row)
+        with profiler.run('new selection'):
+            if not selection:
+                selection = SelectUI.get_selection()
+            self.store.set(name, selection)
+            self.schedule_save()
 
-        if not selection:
-            selection = SelectUI.get_selection()
-        self.selection_data[name] = selection
-
-        with open(SelectUI.data_path(), 'w') as f:
-            f.write(json.dumps(self.selection_data, indent=4))
-
-        item = QtWidgets.QTableWidgetItem(name)
-        item.setData(QtCore.Qt.UserRole, selection)
-        item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-    
-        self.base_table.setItem(row, 0, item)
-
-    def load_selection(self, item):
-        selection_data = item.data(QtCore.Qt.UserRole)
+            self.model.add(name)
 
+    def target_namespaces(self):
+        """Namespaces a set is applied to, '' for the root one."""
         namespace = self.namespace_box.currentText()
-        if namespace != 'None':
-            selection_data = [f'{namespace}:{one}' for one in selection_data]
+        if namespace == SELECTED:
+            return sorted({sceneWatcher.namespace_of(name) for name in cmds.ls(sl=True)})
+        return [''] if namespace == 'None' else [namespace]
+
+    def load_selection(self, index):
+        with profiler.run('load selection'):
+            namespaces = self.target_namespaces()
+            if not namespaces:
+                print('Please select any part of the characters to apply the selection to')
+                return
 
-        cmds.select(selection_data, r=True)
+            with profiler.phase('select'):
+                self.resolver.select(index.data(), index.data(QtCore.Qt.UserRole), namespaces,
+                                     check=not self.watcher.active)
 
-    def rename_selection(self, item):
-        item.setFlags(item.flags() | QtCore.Qt.ItemIsEditable)
-        self.base_table.editItem(item)
-        item.setFlags(QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled)
-        # TODO: Work on Rename method
+    def rename_selection(self, index):
+        self.base_table.edit(index)  # The model renames the set in the store, see SelectionModel.setData
 
     def delete_selection(self):
-        selected_rows = sorted(set(item.row() for item in self.base_table.selectedItems()), reverse=True)
+        names = [index.data() for index in self.base_table.selectionModel().selectedRows()]
 
-        for row in selected_rows:
-            name = self.base_table.item(row, 0).text()
+        for name in names:
             if name in self.selection_data:
-                del self.selection_data[name]
-            self.base_table.removeRow(row)
+                self.store.delete(name)
+        self.model.remove(names)
 
-        with open(SelectUI.data_path(), 'w') as f:
-            f.write(json.dumps(self.selection_data, indent=4))
+        self.schedule_save()
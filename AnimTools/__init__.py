@@ -0,0 +1,19 @@
+"""
+Nothing is imported with the package, its modules load the first time they are used so the deferred import in
+userSetup costs nothing until a tool is opened:
+
+    import AnimTools
+    AnimTools.ikfkSwitch.ikfkUI.show_ui()
+"""
+import importlib
+
+
+def __getattr__(name):
+    if name.startswith('__'):
+        raise AttributeError(name)
+    try:
+        return importlib.import_module(f'{__name__}.{name}')
+    except ModuleNotFoundError as error:
+        if error.name != f'{__name__}.{name}':
+            raise
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
@@ -0,0 +1,118 @@
+"""
+Compact binary cache of skeleton animation, no Maya dependency. A cache holds the local transform of every joint
+on every frame as float32: translate (centimeters), rotation quaternion (x, y, z, w) and scale, after a header
+with the joint names and hierarchy. Frames are appended as they are sampled and read back through numpy.memmap,
+so long shots never have to fit in memory. Quaternion signs follow from frame to frame, chunks included, so
+consecutive frames always interpolate the short way:
+
+    header, data = animCache.read('shot_char01.animcache')
+    data[5000, header['joints'].index('Head_jnt')]
+
+File layout, little endian: MAGIC, uint32 version, uint32 header size, uint64 frame count, the JSON header padded
+to ALIGN bytes, then (frames, joints, 10) float32 values. The frame count is written on close, a cache left
+unfinished by a crash still reads with the frames that made it to disk.
+"""
+from AnimTools import ikfkSolver
+
+import struct
+import numpy
+import json
+import os
+
+MAGIC = b'ANIMCACH'
+VERSION = 1
+PRELUDE = struct.Struct('<8sIIQ')
+ALIGN = 64
+VALUES = ('tx', 'ty', 'tz', 'qx', 'qy', 'qz', 'qw', 'sx', 'sy', 'sz')
+DTYPE = numpy.dtype('<f4')
+EXTENSION = '.animcache'
+
+
+def transforms(local):
+    """(joints, frames, 4, 4) local matrices to the (frames, joints, 10) values of a cache."""
+    local = numpy.asarray(local, dtype=numpy.float64)
+    scale = numpy.linalg.norm(local[..., :3, :3], axis=-1)
+    rotation = local[..., :3, :3] / numpy.maximum(scale, ikfkSolver.EPSILON)[..., None]
+    values = numpy.concatenate([local[..., 3, :3], ikfkSolver.matrix_to_quaternion(rotation), scale], axis=-1)
+    return numpy.swapaxes(values, 0, 1).astype(DTYPE)
+
+
+def local_matrices(values):
+    """(frames, joints, 10) cache values back to (joints, frames, 4, 4) local matrices."""
+    values = numpy.swapaxes(numpy.asarray(values, dtype=numpy.float64), 0, 1)
+    rotation = ikfkSolver.quaternion_to_matrix(values[..., 3:7]) * values[..., 7:, None]
+    return ikfkSolver.compose_matrix(rotation, values[..., :3])
+
+
+class CacheWriter(object):
+    def __init__(self, path, joints, parents, start_frame=0, frame_rate=None):
+        """parents holds the index of every joint's parent, None for the top ones."""
+        self.path = path
+        self.joints = list(joints)
+        self.frames = 0
+        self.last = None  # Quaternions of the last frame written, the next one continues from their signs
+
+        header = json.dumps({
+            'joints': self.joints,
+            'parents': [-1 if parent is None else parent for parent in parents],
+            'start_frame': start_frame,
+            'frame_rate': frame_rate,
+            'values': VALUES,
+        }).encode('utf-8')
+        header += b' ' * (-(PRELUDE.size + len(header)) % ALIGN)
+
+        self.file = open(path, 'wb')
+        self.file.write(PRELUDE.pack(MAGIC, VERSION, len(header), 0))
+        self.file.write(header)
+
+    def write(self, values):
+        """Append (frames, joints, 10) values, see transforms()."""
+        values = numpy.array(values, dtype=DTYPE)
+        if values.shape[1:] != (len(self.joints), len(VALUES)):
+            raise ValueError(f'Expected (frames, {len(self.joints)}, {len(VALUES)}) values, got {values.shape}')
+        if len(values):
+            quaternions = ikfkSolver.continuous_quaternions(numpy.swapaxes(values[..., 3:7], 0, 1), self.last)
+            values[..., 3:7] = numpy.swapaxes(quaternions, 0, 1)
+            self.last = values[-1, :, 3:7].copy()
+        self.file.write(values.tobytes())
+        self.frames += len(values)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.seek(PRELUDE.size - 8)
+        self.file.write(struct.pack('<Q', self.frames))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+
+def read_header(path):
+    """Header of a cache with its 'frames' count and the 'offset' of the values."""
+    with open(path, 'rb') as f:
+        magic, version, size, frames = PRELUDE.unpack(f.read(PRELUDE.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not an animation cache')
+        if version > VERSION:
+            raise ValueError(f'{path} is a version {version} cache, this reader knows up to {VERSION}')
+        header = json.loads(f.read(size).decode('utf-8'))
+
+    header['offset'] = PRELUDE.size + size
+    frame_size = len(header['joints']) * len(header['values']) * DTYPE.itemsize
+    on_disk = (os.path.getsize(path) - header['offset']) // frame_size if frame_size else 0
+    header['frames'] = min(frames, on_disk) if frames else on_disk  # Unfinished caches have no count
+    return header
+
+
+def read(path, mode='r'):
+    """Header and a (frames, joints, 10) memmap of the values, nothing is loaded until indexed."""
+    header = read_header(path)
+    shape = (header['frames'], len(header['joints']), len(header['values']))
+    if not header['frames']:
+        return header, numpy.zeros(shape, dtype=DTYPE)
+    return header, numpy.memmap(path, dtype=DTYPE, mode=mode, offset=header['offset'], shape=shape)
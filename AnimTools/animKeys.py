@@ -0,0 +1,156 @@
+"""
+Bulk keyframe writing. Every channel gets its whole range in one MFnAnimCurve.addKeys call,
+curve creation goes through one MDGModifier and key edits through one MAnimCurveChange so the write undoes as a unit.
+Values are in internal units: centimeters and radians. Reduced channels only get the keys keyReduction kept,
+with linear tangents. Locked channels and channels driven by anything but an anim curve, a pairBlend, animation
+layer or constraint, can't be keyed: they are skipped and reported instead of failing the whole write.
+"""
+from maya.api import OpenMaya
+
+from AnimTools import keyReduction, profiler, report
+
+import numpy
+
+
+class AnimCurveWriter(object):
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.channels = list()
+
+        self.modifier = OpenMaya.MDGModifier()
+        self.change = OpenMaya.MAnimCurveChange()
+        self.key_count = 0
+        self.baked_count = 0  # Keys before reduction
+        self.skipped = list()  # Channels that couldn't be keyed, with the reason
+
+    def add(self, plug, values, frames=None):
+        """plug is an MPlug or a node.attribute name, values hold one value per frame, the writer's frames if None."""
+        self.channels.append((plug, values, self.frames if frames is None else frames, None))
+
+    @staticmethod
+    def is_angular(plug):
+        name = plug.name() if isinstance(plug, OpenMaya.MPlug) else plug
+        return name.rpartition('.')[2].startswith('rotate')
+
+    def reduce(self, linear_tolerance, angular_tolerance):
+        """Only keep the keys needed to stay within tolerance, in centimeters and radians, of every baked value."""
+        groups = dict()
+        for i, (plug, values, frames, keys) in enumerate(self.channels):
+            groups.setdefault(id(frames), list()).append(i)
+
+        for indices in groups.values():
+            frames = self.channels[indices[0]][2]
+            values = numpy.array([self.channels[i][1] for i in indices], dtype=numpy.float64)
+            tolerance = [angular_tolerance if self.is_angular(self.channels[i][0]) else linear_tolerance
+                         for i in indices]
+
+            keys = keyReduction.reduce(values, frames, tolerance)
+            for row, i in enumerate(indices):
+                plug, values, frames, _ = self.channels[i]
+                self.channels[i] = (plug, values, frames, keys[row])
+
+    @staticmethod
+    def times(frames):
+        unit = OpenMaya.MTime.uiUnit()
+        times = OpenMaya.MTimeArray()
+        for frame in frames:
+            times.append(OpenMaya.MTime(frame, unit))
+        return times
+
+    @staticmethod
+    def spans(frames):
+        """Contiguous (start, end) runs of sorted whole frames."""
+        spans = list()
+        for frame in frames:
+            if spans and frame == spans[-1][1] + 1:
+                spans[-1][1] = frame
+            else:
+                spans.append([frame, frame])
+        return spans
+
+    def _curve(self, plug):
+        source = plug.source()
+        if source.isNull:
+            curve_fn = OpenMaya.MFnAnimCurve()
+            curve_fn.create(plug, curve_fn.timedAnimCurveTypeForPlug(plug), self.modifier)
+            return curve_fn
+
+        if source.node().hasFn(OpenMaya.MFn.kAnimCurve):
+            return OpenMaya.MFnAnimCurve(source.node())
+        return None  # Driven by something else than a curve, constraints etc.
+
+    @staticmethod
+    def _bisect(curve_fn, time, right=False):
+        low, high = 0, curve_fn.numKeys
+        while low < high:
+            middle = (low + high) // 2
+            value = curve_fn.input(middle).value
+            if value < time or (right and value == time):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _clear_range(self, curve_fn, spans):
+        """Remove keys inside the spans, returns True when the curve has keys outside of them to keep."""
+        count = curve_fn.numKeys
+        if not count:
+            return False
+        if len(spans) == 1 and curve_fn.input(0).value >= spans[0][0] and \
+                curve_fn.input(count - 1).value <= spans[0][1]:
+            return False
+
+        for start, end in reversed(spans):
+            first = self._bisect(curve_fn, start)
+            for index in reversed(range(first, self._bisect(curve_fn, end, right=True))):
+                curve_fn.remove(index, self.change)
+        return True
+
+    def doIt(self):
+        curves = list()
+        for plug, values, frames, keys in self.channels:
+            if not frames:
+                continue
+            if not isinstance(plug, OpenMaya.MPlug):
+                plug = OpenMaya.MSelectionList().add(plug).getPlug(0)
+            if plug.isLocked:
+                self.skipped.append(f'{plug.name()} (locked)')
+                continue
+            curve_fn = self._curve(plug)
+            if curve_fn is None:
+                source = OpenMaya.MFnDependencyNode(plug.source().node()).name()
+                self.skipped.append(f'{plug.name()} (driven by {source})')
+                continue
+            curves.append((curve_fn, values, frames, keys))
+
+        self.modifier.doIt()
+
+        times = dict()  # Channels of one bake share their frame lists
+        for curve_fn, values, frames, keys in curves:
+            if id(frames) not in times:
+                times[id(frames)] = (self.times(frames), self.spans(frames))
+            frame_times, spans = times[id(frames)]
+            tangent = OpenMaya.MFnAnimCurve.kTangentGlobal
+            self.baked_count += len(frame_times)
+
+            if keys is not None:
+                frame_times = self.times([frame for frame, key in zip(frames, keys) if key])
+                values = [value for value, key in zip(values, keys) if key]
+                tangent = OpenMaya.MFnAnimCurve.kTangentLinear
+
+            keep = self._clear_range(curve_fn, spans)
+            curve_fn.addKeys(frame_times, OpenMaya.MDoubleArray([float(value) for value in values]),
+                             tangent, tangent, keep, self.change)
+            self.key_count += len(frame_times)
+        profiler.count('OpenMaya.MFnAnimCurve.addKeys', len(curves))
+
+        if self.skipped:
+            print(f'{len(self.skipped)} channels could not be keyed, {report.names(self.skipped)}')
+
+    def redoIt(self):
+        self.modifier.doIt()
+        self.change.redoIt()
+
+    def undoIt(self):
+        self.change.undoIt()
+        self.modifier.undoIt()
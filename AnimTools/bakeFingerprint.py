@@ -0,0 +1,126 @@
+"""
+Fingerprints of what drives an IK/FK module, its controls and every parent: the animation curves of their
+connected inputs and the static values of everything else making up their transforms. Comparing the fingerprint
+taken after a bake with the current one gives the frames whose inputs changed, so the next bake only re-solves
+those. Inputs from anything but an anim curve, constraints, matrix nodes or expressions, can't be compared and make
+the whole range bake again.
+"""
+from maya.api import OpenMaya
+from maya import cmds
+
+import numpy
+
+STATIC = ([f'{attr}{axis}' for attr in ('translate', 'rotate', 'scale', 'rotateAxis', 'jointOrient', 'rotatePivot',
+                                         'rotatePivotTranslate', 'scalePivot', 'scalePivotTranslate') for axis in 'XYZ']
+          + ['shearXY', 'shearXZ', 'shearYZ'])
+ENUMS = ('rotateOrder', 'inheritsTransform')
+MATRICES = ('offsetParentMatrix',)  # Maya 2020 and later
+MARGIN = 2  # Frames re-solved on each side of a change
+
+
+def chain(cache):
+    """Controls of a module and all of their parents, each once."""
+    nodes = list()
+    for handle in cache.handles:
+        node = handle.object()
+        while node.hasFn(OpenMaya.MFn.kTransform) and node not in nodes:
+            nodes.append(node)
+            node = OpenMaya.MFnDagNode(node).parent(0)
+    return nodes
+
+
+def curve_keys(curve):
+    """Times, values, in and out tangent angles and weights of an anim curve as a (6, keys) array."""
+    keys = [cmds.keyframe(curve, q=True, tc=True), cmds.keyframe(curve, q=True, vc=True),
+            cmds.keyTangent(curve, q=True, ia=True), cmds.keyTangent(curve, q=True, oa=True),
+            cmds.keyTangent(curve, q=True, iw=True), cmds.keyTangent(curve, q=True, ow=True)]
+    return numpy.array([one or [] for one in keys], dtype=numpy.float64)
+
+
+def curve_settings(curve):
+    """Infinity, weighting and tangent types of an anim curve, what changes it besides curve_keys."""
+    settings = [cmds.setInfinity(curve, q=True, pri=True), cmds.setInfinity(curve, q=True, poi=True),
+                cmds.keyTangent(curve, q=True, weightedTangents=True), cmds.keyTangent(curve, q=True, itt=True),
+                cmds.keyTangent(curve, q=True, ott=True)]
+    return tuple(tuple(one or ()) for one in settings)
+
+
+def static_value(plug, attribute):
+    if attribute in ENUMS:
+        return float(plug.asInt())
+    if attribute in MATRICES:
+        matrix = OpenMaya.MFnMatrixData(plug.asMObject()).matrix()
+        return tuple(matrix[i] for i in range(16))
+    return plug.asDouble()
+
+
+def fingerprint(cache):
+    """
+    Plug name: (6, keys) array for inputs from anim curves, with their curve_settings under 'plug:curve', None for
+    inputs from anything else and the value of the unconnected transform attributes.
+    """
+    result = dict()
+    for node in chain(cache):
+        fn_node = OpenMaya.MFnDependencyNode(node)
+        name = fn_node.name()
+
+        for plug in fn_node.getConnections():
+            source = plug.source()
+            if source.isNull:
+                continue
+            if source.node().hasFn(OpenMaya.MFn.kAnimCurve):
+                curve = OpenMaya.MFnDependencyNode(source.node()).name()
+                result[plug.name()] = curve_keys(curve)
+                result[f'{plug.name()}:curve'] = curve_settings(curve)
+            else:
+                result[plug.name()] = None
+
+        for attribute in STATIC + list(ENUMS + MATRICES):
+            if not fn_node.hasAttribute(attribute):
+                continue
+            plug = fn_node.findPlug(attribute, False)
+            if plug.source().isNull:  # Else an input, above
+                result[f'{name}.{attribute}'] = static_value(plug, attribute)
+    return result
+
+
+def changed_spans(old, new):
+    """Start and end times of the spans where two curves, as curve_keys arrays, can evaluate differently."""
+    if old.shape == new.shape and numpy.array_equal(old, new):
+        return numpy.zeros(0), numpy.zeros(0)
+
+    times = numpy.union1d(old[0], new[0])
+    common, old_index, new_index = numpy.intersect1d(old[0], new[0], return_indices=True)
+    same = numpy.all(old[:, old_index] == new[:, new_index], axis=0)
+
+    differs = numpy.ones(len(times), dtype=bool)
+    differs[numpy.searchsorted(times, common[same])] = False
+    index = numpy.nonzero(differs)[0]
+
+    # A key change reaches the neighbouring keys, the ends of the curve extrapolate to infinity
+    padded = numpy.concatenate([[-numpy.inf], times, [numpy.inf]])
+    return padded[index], padded[index + 2]
+
+
+def changed_frames(old, new, frames, margin=MARGIN):
+    """Frames of the range whose inputs differ between two fingerprints, all of them when it can't be told."""
+    frames = numpy.asarray(frames)
+    if old is None or old.keys() != new.keys():
+        return list(frames)
+
+    dirty = numpy.zeros(len(frames), dtype=bool)
+    for plug, keys in new.items():
+        previous = old[plug]
+        curve = isinstance(keys, numpy.ndarray)
+        if keys is None or previous is None or curve != isinstance(previous, numpy.ndarray):
+            return list(frames)
+        if not curve:
+            if keys != previous:
+                return list(frames)
+            continue
+
+        start, end = changed_spans(previous, keys)
+        if len(start):
+            dirty |= numpy.any((frames >= start[:, None] - margin) & (frames <= end[:, None] + margin), axis=0)
+
+    return list(frames[dirty])
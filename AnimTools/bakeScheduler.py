@@ -0,0 +1,295 @@
+"""
+Bakes any number of IK/FK modules, from any number of characters, in a single sweep of the frame range.
+Every module is sampled in the same pass, then each direction is solved for all of its modules in one call
+and all keys are written by a single undoable command. Incremental bakes only re-solve the frames whose inputs
+changed since the module was last baked.
+
+Sampling can run a chunk of frames at a time (BakeScheduler.steps, BakeJob) so the UI stays responsive, keys are
+still only written after the last chunk. Edits made in Maya between two chunks restart the sampling, so the keys
+never mix frames sampled before and after a change.
+"""
+from maya.api import OpenMaya
+
+from AnimTools import ikfkSolver, dgSampler, animKeys, undoCommand, parallelSolve, bakeFingerprint, sceneGuard, profiler
+
+import numpy
+import time
+import sys
+
+IK_FOLLOWS_FK = ikfkSolver.IK_FOLLOWS_FK
+FK_FOLLOWS_IK = ikfkSolver.FK_FOLLOWS_IK
+
+FRAME_KEYS = ('world', 'parent_inverse', 'rotate')  # Sampled along frames, rotate at the start of each run
+CHUNK_SECONDS = 0.05  # Sampling time aimed at per step of a BakeJob
+FIRST_CHUNK = 10  # Frames
+MAX_CHUNK = 2000
+
+
+def subset(sampled, indices):
+    return {key: value[indices] for key, value in sampled.items()}
+
+
+def concatenate(parts):
+    """Join the samples of consecutive chunks of frames."""
+    if len(parts) == 1:
+        return parts[0]
+    merged = dict(parts[0])
+    for key in FRAME_KEYS:
+        merged[key] = numpy.concatenate([part[key] for part in parts], axis=2)
+    return merged
+
+
+def next_chunk(chunk, frames, seconds):
+    """Frames to sample next so a step takes about CHUNK_SECONDS, growing at most twofold at a time."""
+    if seconds <= 0.0:
+        return min(chunk * 2, MAX_CHUNK)
+    return int(max(1, min(MAX_CHUNK, chunk * 2, frames * CHUNK_SECONDS / seconds)))
+
+
+class BakeScheduler(object):
+    def __init__(self, ik_fk, workers=1, incremental=False, tolerances=None):
+        self.ik_fk = ik_fk
+        self.workers = workers  # Solver processes, 1 solves in Maya's own process, None one per spare core
+        self.incremental = incremental  # Only re-solve frames whose inputs changed since the last bake
+        self.tolerances = tolerances  # Key reduction (centimeters, radians), None keys every frame
+        self.jobs = dict()  # module name: direction
+
+        self.chunk_frames = None  # Frames sampled per step, None samples each batch at once
+        self.total_frames = 0  # Frames to sample, summed over batches
+        self.writer = None
+
+    def add(self, mods, direction):
+        for mod in mods:
+            self.jobs[mod] = direction
+
+    def groups(self, mods):
+        """Module indices per direction, in the order modules were added."""
+        groups = dict()
+        for i, mod in enumerate(mods):
+            groups.setdefault(self.jobs[mod], list()).append(i)
+        return groups
+
+    def fingerprint_key(self, mod, frames):
+        if not frames:
+            return self.jobs[mod], None, None
+        return self.jobs[mod], frames[0], frames[-1]
+
+    def dirty_frames(self, mods, frames):
+        """Frames to solve for each module, all of them unless baking incrementally."""
+        if not frames:
+            return {mod: list() for mod in mods}  # Start after end, nothing to bake
+        if not self.incremental:
+            return {mod: frames for mod in mods}
+
+        dirty = dict()
+        for mod in mods:
+            key, previous = self.ik_fk.fingerprints.get(mod, (None, None))
+            if key != self.fingerprint_key(mod, frames):
+                dirty[mod] = frames
+                continue
+            current = bakeFingerprint.fingerprint(self.ik_fk.module_cache(mod))
+            dirty[mod] = bakeFingerprint.changed_frames(previous, current, frames)
+        return dirty
+
+    @staticmethod
+    def batches(mods, dirty):
+        """Module indices sharing the same frames to solve, they are sampled together."""
+        batches = dict()
+        for i, mod in enumerate(mods):
+            if dirty[mod]:
+                batches.setdefault(tuple(dirty[mod]), list()).append(i)
+        return batches
+
+    def sample(self, batch, frames):
+        """Sample a batch chunk_frames at a time, yields the number of frames sampled by each chunk."""
+        starts = {frames[start] for start, end in dgSampler.runs(frames)}
+        parts = list()
+        done = 0
+        while done < len(frames):
+            chunk = frames[done:done + (self.chunk_frames or len(frames))]
+            with profiler.phase('sample'):
+                parts.append(self.ik_fk.sample(batch, chunk, [frame for frame in chunk if frame in starts]))
+            done += len(chunk)
+            yield len(chunk)
+        return concatenate(parts)
+
+    def steps(self, start_frame, end_frame):
+        """
+        Run the bake as a generator, yielding the number of frames sampled after each chunk. Keys are solved and
+        written once everything is sampled, closing the generator before that leaves the scene untouched.
+        """
+        self.writer = None
+        if not self.jobs:
+            return
+
+        frames = dgSampler.frame_range(start_frame, end_frame)
+        mods = list(self.jobs)
+
+        with profiler.phase('fingerprint'):
+            dirty = self.dirty_frames(mods, frames)
+
+        writer = animKeys.AnimCurveWriter(frames)
+        batches = self.batches(mods, dirty)
+        self.total_frames = sum(len(batch_frames) for batch_frames in batches)
+
+        for batch_frames, indices in batches.items():
+            batch_frames = list(batch_frames)
+            batch = [mods[i] for i in indices]
+
+            sampled = yield from self.sample(batch, batch_frames)
+            profiler.frames(len(batch_frames))
+
+            for direction, positions in self.groups(batch).items():
+                with profiler.phase('solve'):
+                    part = subset(sampled, positions)
+                    solved = parallelSolve.solve(part, direction, self.workers)
+                    ikfkSolver.unroll(solved, part['rotate'], part['rotate_order'], dgSampler.runs(batch_frames))
+                self.ik_fk.add_keys(writer, [batch[i] for i in positions], solved, batch_frames)
+
+        if self.tolerances and writer.channels:
+            with profiler.phase('reduce'):
+                writer.reduce(*self.tolerances)
+
+        if writer.channels:
+            # Already guarded when baking in one call, chunked bakes only guard the write
+            with profiler.phase('key write'), sceneGuard.SceneGuard('bake key write', self.total_frames):
+                undoCommand.run(writer)
+            if self.tolerances:
+                print(f'Reduced {writer.baked_count} baked keys to {writer.key_count}')
+
+        if self.incremental:
+            with profiler.phase('fingerprint'):
+                for indices in batches.values():
+                    for mod in [mods[i] for i in indices]:
+                        cache = self.ik_fk.module_cache(mod)
+                        self.ik_fk.fingerprints[mod] = (self.fingerprint_key(mod, frames),
+                                                        bakeFingerprint.fingerprint(cache))
+        self.writer = writer
+
+    def run(self, start_frame, end_frame):
+        for _ in self.steps(start_frame, end_frame):
+            pass
+        return self.writer
+
+
+class BakeJob(object):
+    """
+    A range bake advanced one step at a time by the caller, a UI timer usually. Chunks adapt to take about
+    CHUNK_SECONDS of sampling, cancelling before the last step writes no key at all. Animation edits, connections,
+    undo or redo, and attribute changes on the modules' controls and parents made between steps start the sampling
+    over. The profiler run only covers the steps, whatever Maya does in between isn't part of the bake's report.
+    """
+    def __init__(self, scheduler, start_frame, end_frame, operation='bake'):
+        self.scheduler = scheduler
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.profile = profiler.run(operation)
+        self.callbacks = list()
+
+        self.started = False
+        self.finished = False
+        self.cancelled = False
+        self.stepping = False  # Edits made by the job itself don't count as changes
+        self.changed = False
+        self.restarts = 0
+        self.restart()
+
+    def restart(self):
+        self.scheduler.chunk_frames = FIRST_CHUNK
+        self.steps = self.scheduler.steps(self.start_frame, self.end_frame)
+        self.changed = False
+        self.done = 0  # Frames sampled
+        self.seconds = 0.0  # Spent sampling
+
+    @property
+    def total(self):
+        return self.scheduler.total_frames
+
+    @property
+    def fps(self):
+        return self.done / self.seconds if self.seconds else 0.0
+
+    @property
+    def eta(self):
+        """Seconds of sampling left, None before the speed is known."""
+        if not self.done or not self.seconds:
+            return None
+        return (self.total - self.done) / self.fps
+
+    def step(self):
+        """Sample the next chunk, the step after the last one solves and writes keys. False once the job is over."""
+        if self.finished:
+            return False
+        if not self.started:
+            self.started = True
+            self.profile.__enter__()
+            self.watch()
+        else:
+            self.profile.resume()
+
+        if self.changed:
+            self.steps.close()
+            self.restarts += 1
+            print('The scene changed while baking, sampling again')
+            self.restart()
+
+        start = time.perf_counter()
+        self.stepping = True
+        try:
+            sampled = next(self.steps)
+        except StopIteration:
+            self._finish()
+            return False
+        except Exception:
+            self._finish(*sys.exc_info())
+            raise
+        finally:
+            self.stepping = False
+
+        seconds = time.perf_counter() - start
+        self.done += sampled
+        self.seconds += seconds
+        self.scheduler.chunk_frames = next_chunk(self.scheduler.chunk_frames, sampled, seconds)
+        self.profile.pause()
+        return True
+
+    def cancel(self):
+        """Stop before any key is written, the scene is left as it was."""
+        if self.finished:
+            return
+        self.steps.close()
+        self.cancelled = True
+        self._finish()
+
+    def watch(self):
+        nodes = list()
+        for mod in self.scheduler.jobs:
+            for node in bakeFingerprint.chain(self.scheduler.ik_fk.module_cache(mod)):
+                if node not in nodes:
+                    nodes.append(node)
+
+        self.callbacks = [OpenMaya.MAnimMessage.addAnimCurveEditedCallback(self._changed),
+                          OpenMaya.MDGMessage.addConnectionCallback(self._changed)]
+        for event in ('Undo', 'Redo'):
+            self.callbacks.append(OpenMaya.MEventMessage.addEventCallback(event, self._changed))
+        for node in nodes:
+            self.callbacks.append(OpenMaya.MNodeMessage.addAttributeChangedCallback(node, self._attribute_changed))
+
+    def unwatch(self):
+        for callback in self.callbacks:
+            OpenMaya.MMessage.removeCallback(callback)
+        self.callbacks = list()
+
+    def _changed(self, *args):
+        if not self.stepping:
+            self.changed = True
+
+    def _attribute_changed(self, message, *args):
+        if message & OpenMaya.MNodeMessage.kAttributeSet:
+            self._changed()
+
+    def _finish(self, *exc_info):
+        self.finished = True
+        self.unwatch()
+        if self.started:
+            self.profile.__exit__(*(exc_info or (None, None, None)))
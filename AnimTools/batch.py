@@ -0,0 +1,106 @@
+"""
+Shared pieces of the headless batch tools (ikfkBatch, exportBatch): starting Maya in mayapy, expanding scene file
+patterns and spreading files across worker processes.
+"""
+from maya import cmds
+
+from AnimTools import parallelSolve
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import atexit
+import glob
+import os
+
+FILE_TYPES = {'.ma': 'mayaAscii', '.mb': 'mayaBinary'}
+
+
+def initialize():
+    """Start Maya in this process unless it already runs, mayapy needs it before any command."""
+    if hasattr(cmds, 'ls'):
+        return
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+    atexit.register(maya.standalone.uninitialize)
+
+
+def expand(patterns):
+    """Scene files from paths or glob patterns, each once and in order."""
+    files = list()
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]:
+            path = os.path.abspath(path)
+            if path not in files:
+                files.append(path)
+    return files
+
+
+def scene_namespaces():
+    """The root namespace, as '', and every other one of the open scene."""
+    namespaces = cmds.namespaceInfo(':', listOnlyNamespaces=True, recurse=True) or list()
+    return [''] + [namespace for namespace in namespaces if namespace not in ('UI', 'shared')]
+
+
+def _pool(files, workers):
+    return ProcessPoolExecutor(max_workers=min(workers, len(files)), mp_context=parallelSolve.context(),
+                               initializer=initialize)
+
+
+def _failed(path, error):
+    return {'file': path, 'seconds': dict(), 'error': f'Worker failed: {error!r}'}
+
+
+def _isolated(function, path, arguments):
+    """Run one file alone in a fresh worker, if it kills Maya again nothing else goes down with it."""
+    with _pool([path], 1) as pool:
+        try:
+            return pool.submit(function, path, *arguments).result()
+        except Exception as error:
+            return _failed(path, error)
+
+
+def run(function, files, arguments=(), workers=1):
+    """
+    Entries returned by function(path, *arguments) for every file, called in this process or spread across worker
+    processes. function has to be importable and catch its own errors.
+
+    A worker dying takes its whole pool down, so only as many files as there are workers are handed out at once.
+    When the pool breaks the remaining files go on in a fresh one, and the files that were running are retried
+    one by one in their own worker, a crashing scene only fails itself.
+    """
+    if workers < 2 or len(files) < 2:
+        initialize()
+        return [function(path, *arguments) for path in files]
+
+    entries = dict()
+    waiting = list(files)
+    while waiting:
+        running = dict()
+        with _pool(waiting, workers) as pool:
+            try:
+                while waiting or running:
+                    while waiting and len(running) < workers:
+                        path = waiting.pop(0)
+                        running[pool.submit(function, path, *arguments)] = path
+                    for future in wait(running, return_when=FIRST_COMPLETED)[0]:
+                        path = running[future]
+                        try:
+                            entries[path] = future.result()
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as error:
+                            entries[path] = _failed(path, error)
+                        del running[future]
+            except BrokenProcessPool as error:
+                broken = error
+            else:
+                broken = None
+
+        for future, path in running.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                entries[path] = future.result()  # Finished before the pool went down
+            elif len(running) == 1:
+                entries[path] = _failed(path, broken)  # Nothing else was running, this file crashed Maya
+            else:
+                entries[path] = _isolated(function, path, arguments)
+    return [entries[path] for path in files]
@@ -0,0 +1,68 @@
+"""
+Time-aware plug reads. Values are pulled through a DG context for each frame, so sampling a range
+never moves the playhead or refreshes the viewport.
+"""
+from maya.api import OpenMaya
+
+from AnimTools import profiler
+
+import numpy
+
+
+def frame_range(start_frame, end_frame):
+    return list(range(int(start_frame), int(end_frame) + 1))
+
+
+def runs(frames):
+    """(start, end) index ranges of the runs of consecutive frames."""
+    runs = list()
+    for i, frame in enumerate(frames):
+        if runs and frame == frames[i - 1] + 1:
+            runs[-1][1] = i + 1
+        else:
+            runs.append([i, i + 1])
+    return [tuple(run) for run in runs]
+
+
+def matrix_plug(node, attribute='worldMatrix'):
+    if isinstance(node, str):
+        node = OpenMaya.MSelectionList().add(node).getDependNode(0)
+    fn_node = OpenMaya.MFnDependencyNode(node)
+    plug = fn_node.findPlug(attribute, False)
+    if plug.isArray:
+        plug = plug.elementByLogicalIndex(0)
+    return plug
+
+
+def as_array(matrix):
+    return numpy.array([matrix[i] for i in range(16)], dtype=numpy.float64).reshape(4, 4)
+
+
+def sample_matrices(plugs, frames):
+    """Read every matrix plug at every frame, returns a (plugs, frames, 4, 4) array."""
+    result = numpy.empty((len(plugs), len(frames), 4, 4))
+    unit = OpenMaya.MTime.uiUnit()
+
+    for f, frame in enumerate(frames):
+        context = OpenMaya.MDGContext(OpenMaya.MTime(frame, unit))
+        with OpenMaya.MDGContextGuard(context):
+            for p, plug in enumerate(plugs):
+                result[p, f] = as_array(OpenMaya.MFnMatrixData(plug.asMObject()).matrix())
+
+    profiler.count('OpenMaya.MPlug.asMObject', len(plugs) * len(frames))
+    return result
+
+
+def sample_values(plugs, frames):
+    """Read every numeric plug at every frame, returns a (plugs, frames) array in internal units."""
+    result = numpy.empty((len(plugs), len(frames)))
+    unit = OpenMaya.MTime.uiUnit()
+
+    for f, frame in enumerate(frames):
+        context = OpenMaya.MDGContext(OpenMaya.MTime(frame, unit))
+        with OpenMaya.MDGContextGuard(context):
+            for p, plug in enumerate(plugs):
+                result[p, f] = plug.asDouble()
+
+    profiler.count('OpenMaya.MPlug.asDouble', len(plugs) * len(frames))
+    return result
@@ -0,0 +1,141 @@
+"""
+Headless game export of many scene files, runs in mayapy without the Game Exporter window:
+
+    mayapy -m AnimTools.exportBatch "shots/*.ma" -n char01 -c walk 1 40 -c run 41 80 -o exports -w 4
+
+Every character, each given namespace or every one with a root joint by default, gets one FBX file per clip named
+<scene>_<namespace>_<clip>.fbx in the output directory. Without clips the playback range of each file is exported
+as <scene>_<namespace>.fbx. With --cache every FBX gets an animCache file of the same name next to it. With
+--incremental, files whose inputs didn't change since they were exported are skipped, see exportCache. With
+--reduce the FBX files only get the keys needed within Exporter.REDUCE_TOLERANCES instead of one per frame. Files
+are spread across worker processes and scenes are never saved, the summary JSON holds the exported files, timings
+and error of every scene.
+"""
+from maya import cmds
+
+from AnimTools import Exporter, exportCache, parallelSolve, batch
+
+import traceback
+import argparse
+import time
+import json
+import sys
+import os
+
+
+def export_file(path, output_dir, namespaces=None, clips=None, root_jnt='Root_jnt', cache=False, incremental=False,
+                reduce_keys=False):
+    """Open one scene file and export its characters, returns its summary entry."""
+    entry = {'file': path, 'namespaces': list(), 'exports': list(), 'skipped': list(), 'frames': 0,
+             'seconds': dict(), 'error': None}
+    manifest = exportCache.Manifest(output_dir) if incremental else None
+    seconds = entry['seconds']
+    start = time.perf_counter()
+
+    try:
+        cmds.file(path, open=True, force=True, prompt=False, ignoreVersion=True)
+        seconds['open'] = time.perf_counter() - start
+
+        if namespaces is None:
+            namespaces = [namespace for namespace in batch.scene_namespaces()
+                          if namespace and cmds.objExists(f'{namespace}:{root_jnt}')]
+        if not namespaces:
+            raise RuntimeError(f'No character with a {root_jnt} found')
+        if not clips:
+            clips = [('', int(cmds.playbackOptions(q=True, minTime=True)),
+                      int(cmds.playbackOptions(q=True, maxTime=True)))]
+
+        phase = time.perf_counter()
+        scene = os.path.splitext(os.path.basename(path))[0]
+        for namespace in namespaces:
+            name = f"{scene}_{namespace.replace(':', '_')}"
+            entry['exports'] += Exporter.export_clips(namespace, clips, output_dir, name, root_jnt, cache, manifest,
+                                                      Exporter.REDUCE_TOLERANCES if reduce_keys else None)
+            entry['namespaces'].append(namespace)
+            entry['frames'] += sum(end_frame - start_frame + 1 for clip, start_frame, end_frame in clips)
+        seconds['export'] = time.perf_counter() - phase
+
+    except Exception:
+        entry['error'] = traceback.format_exc()
+    finally:
+        cmds.file(new=True, force=True)
+        if manifest is not None:
+            manifest.save()
+            entry['skipped'] = manifest.skipped
+
+    seconds['total'] = time.perf_counter() - start
+    return entry
+
+
+def run(files, output_dir, namespaces=None, clips=None, root_jnt='Root_jnt', cache=False, incremental=False,
+        workers=1, reduce_keys=False):
+    """Export every file, in this process or spread across worker processes, returns the summary."""
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    entries = batch.run(export_file, files, (output_dir, namespaces, clips, root_jnt, cache, incremental, reduce_keys),
+                        workers)
+
+    return {
+        'output_dir': output_dir,
+        'workers': workers,
+        'seconds': time.perf_counter() - start,
+        'failed': sum(1 for entry in entries if entry['error']),
+        'files': entries,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='mayapy -m AnimTools.exportBatch',
+                                     description='Export the characters of many scene files to FBX.')
+    parser.add_argument('files', nargs='+', help='scene files or glob patterns')
+    parser.add_argument('-o', '--output-dir', required=True, help='directory the FBX files are written to')
+    parser.add_argument('-n', '--namespace', action='append', dest='namespaces',
+                        help='character namespace, can be repeated. Every namespace with a root joint by default')
+    parser.add_argument('-c', '--clip', nargs=3, action='append', dest='clips', metavar=('NAME', 'START', 'END'),
+                        help='clip exported to its own file, can be repeated. The playback range by default')
+    parser.add_argument('--root', default='Root_jnt', help='root joint of the skeletons')
+    parser.add_argument('--cache', action='store_true', help='also write a binary animation cache of every clip')
+    parser.add_argument('--incremental', action='store_true',
+                        help="skip clips whose files were exported from the same inputs, tracked in the output's "
+                             f'{exportCache.MANIFEST}')
+    parser.add_argument('--reduce', action='store_true',
+                        help='only keep the keys needed within tolerance instead of one key per frame')
+    parser.add_argument('-w', '--workers', type=int, default=parallelSolve.default_workers(),
+                        help='mayapy processes, one file at a time each')
+    parser.add_argument('-s', '--summary', default='exportBatch.json', help='JSON summary file')
+
+    options = parser.parse_args(argv)
+    try:
+        options.clips = [(name, int(start), int(end)) for name, start, end in options.clips or list()]
+    except ValueError:
+        parser.error('clip frames have to be whole numbers')
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    files = batch.expand(options.files)
+    if not files:
+        print('No scene file found')
+        return 1
+
+    namespaces = [namespace.strip(':') for namespace in options.namespaces] if options.namespaces else None
+    summary = run(files, options.output_dir, namespaces, options.clips, options.root, options.cache,
+                  options.incremental, options.workers, options.reduce)
+
+    with open(options.summary, 'w') as f:
+        f.write(json.dumps(summary, indent=4))
+
+    for entry in summary['files']:
+        if entry['error']:
+            print(f"{entry['file']}: failed\n{entry['error']}")
+        else:
+            print(f"{entry['file']}: {len(entry['exports'])} files, {len(entry['skipped'])} unchanged, "
+                  f"{entry['frames']} frames in {entry['seconds']['total']:.2f}s")
+    print(f"Exported {len(files) - summary['failed']}/{len(files)} scenes in {summary['seconds']:.1f}s, "
+          f"summary in {options.summary}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
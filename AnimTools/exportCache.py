@@ -0,0 +1,122 @@
+"""
+Skips exports whose inputs didn't change. The inputs of a character, the anim curves upstream of its namespace and
+the namespaces nested in it, through pairBlends, animation layers and constraints, its pose at the first and last
+frame of every clip, its MayaData skeleton, the clip range and the export settings, are hashed together and every
+exported file is recorded in a manifest next to it with that hash. The next export of the same file is skipped when
+the hash matches and the file on disk is still the one that was written, same size and modification time.
+
+The skip is best-effort: a static value or an input other than an anim curve, an expression for instance, is only
+seen through the pose, a change showing on none of the sampled frames goes unnoticed.
+
+The manifest keeps the MAX_ENTRIES most recently used files, entries of deleted files and the least recently used
+ones are evicted when it is saved. Saving merges with the manifest on disk under a lock file, so workers exporting to
+the same directory keep each other's entries.
+"""
+from maya import cmds
+
+from AnimTools import bakeFingerprint, skeletonBake, dgSampler, fileLock
+
+import hashlib
+import time
+import json
+import os
+
+VERSION = 1  # Bumped when the exported content changes for the same inputs
+MANIFEST = 'exportManifest.json'
+MAX_ENTRIES = 5000
+
+
+def namespace_curves(namespace):
+    """Anim curves upstream of the nodes of a namespace and its nested ones, wherever the curves live, sorted."""
+    nodes = cmds.namespaceInfo(f':{namespace}', listOnlyDependencyNodes=True, recurse=True, dagPath=True)
+    history = cmds.listHistory(nodes) if nodes else None
+    if not history:
+        return list()
+    return sorted(set(cmds.ls(history, type='animCurve') or list()))
+
+
+def pose(joints, frames):
+    """(joints, frames, 4, 4) world matrices, they show the static values and inputs the curves don't."""
+    plugs = [dgSampler.matrix_plug(node) for node in skeletonBake.joint_nodes(joints)]
+    return dgSampler.sample_matrices(plugs, sorted(set(frames)))
+
+
+def input_hash(namespace, skeleton_data, settings, joint_pose=None):
+    """
+    Hash of everything a character's export is made from, settings is any JSON serializable value and joint_pose
+    what pose() returned for its joints.
+    """
+    sha = hashlib.sha1()
+    sha.update(json.dumps([VERSION, skeleton_data, settings], sort_keys=True, default=repr).encode('utf-8'))
+    for curve in namespace_curves(namespace):
+        sha.update(curve.encode('utf-8'))
+        sha.update(bakeFingerprint.curve_keys(curve).tobytes())
+        sha.update(repr(bakeFingerprint.curve_settings(curve)).encode('utf-8'))
+    if joint_pose is not None:
+        sha.update(joint_pose.tobytes())
+    return sha.hexdigest()
+
+
+def clip_hash(digest, clip, start_frame, end_frame):
+    return hashlib.sha1(json.dumps([digest, clip, start_frame, end_frame]).encode('utf-8')).hexdigest()
+
+
+class Manifest(object):
+    """Hash and file state of the exported files of a directory, stored in its MANIFEST."""
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST)
+        self.entries = self.load()
+        self.changed = dict()
+        self.skipped = list()  # Files found unchanged, filled by Exporter.export_clips
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return dict()
+
+    def matches(self, path, digest):
+        """True when path was exported from inputs with this hash and wasn't touched since."""
+        name = os.path.relpath(path, self.directory)
+        entry = self.entries.get(name)
+        if not entry or entry['hash'] != digest or tuple(entry['file'] or ()) != fileLock.file_state(path):
+            return False
+        entry['used'] = time.time()
+        self.changed[name] = entry
+        return True
+
+    def record(self, path, digest):
+        name = os.path.relpath(path, self.directory)
+        entry = {'hash': digest, 'file': fileLock.file_state(path), 'used': time.time()}
+        self.entries[name] = self.changed[name] = entry
+
+    def save(self):
+        """Merge this run's entries into the manifest on disk, other processes may have saved since, and evict."""
+        if not self.changed:
+            return
+        lock_path = f'{self.path}.lock'
+        lock = fileLock.acquire(lock_path)
+        try:
+            entries = self.load()
+            entries.update(self.changed)
+
+            entries = {name: entry for name, entry in entries.items()
+                       if os.path.exists(os.path.join(self.directory, name))}
+            if len(entries) > MAX_ENTRIES:
+                recent = sorted(entries, key=lambda name: entries[name]['used'], reverse=True)[:MAX_ENTRIES]
+                entries = {name: entries[name] for name in recent}
+
+            temp_path = f'{self.path}.{os.getpid()}.tmp'
+            try:
+                with open(temp_path, 'w') as f:
+                    f.write(json.dumps(entries, indent=4))
+                os.replace(temp_path, self.path)  # Readers never see a half written manifest
+            except OSError as error:
+                print(f'Could not write export manifest {self.path}: {error}')
+        finally:
+            if lock is not None:
+                fileLock.release(lock_path, lock)
+        self.entries = entries
+        self.changed = dict()
@@ -0,0 +1,51 @@
+"""
+Lock files for the stores written by several sessions or workers at once, on shared drives too, no Maya dependency.
+A lock is a file created exclusively next to what it guards, one older than LOCK_SECONDS was left by a crashed
+process and is taken over.
+"""
+import time
+import os
+
+LOCK_SECONDS = 30
+WAIT_SECONDS = 0.05
+
+
+def file_state(path):
+    """(modification time in nanoseconds, size) of a file, None when it can't be found."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def is_stale(lock_path):
+    state = file_state(lock_path)
+    return state is not None and time.time() - state[0] / 1e9 > LOCK_SECONDS
+
+
+def acquire(lock_path, wait=True):
+    """Take the lock, returns its file descriptor. None when it can't be created, or is held and wait is False."""
+    while True:
+        try:
+            return os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if is_stale(lock_path):
+                try:
+                    os.remove(lock_path)
+                except OSError:
+                    pass  # Another process took it over first
+                continue
+            if not wait:
+                return None
+            time.sleep(WAIT_SECONDS)
+        except OSError:
+            return None
+
+
+def release(lock_path, lock):
+    os.close(lock)
+    try:
+        os.remove(lock_path)
+    except OSError:
+        pass
@@ -0,0 +1,242 @@
+"""
+IK/FK matching and baking of rig modules, without any UI so it also runs in mayapy. ikfkSwitch.ikfkUI drives it
+interactively, ikfkBatch over scene files.
+"""
+from maya.api import OpenMaya
+from maya import cmds
+
+from AnimTools import ikfkSolver, ikfkCache, dgSampler, bakeScheduler, moduleIndex, sceneGuard, profiler
+
+import numpy
+import math
+
+
+def retrieve_fk_pose(hierarchy):
+    parent_mat = None
+    for ctr in hierarchy:
+        ctr_obj = OpenMaya.MSelectionList().add(ctr).getDependNode(0)
+        parent_obj = OpenMaya.MFnTransform(ctr_obj).parent(0)
+
+        if not parent_mat:
+            parent_mat = OpenMaya.MFnDagNode(parent_obj).getPath().inclusiveMatrix()  # world matrix
+            continue
+        current_parent_mat = OpenMaya.MFnTransform(parent_obj).transformation().asMatrix()  # local matrix
+        parent_mat = current_parent_mat * parent_mat
+
+    return parent_mat
+
+
+class IKFK(object):
+    def __init__(self):
+        # New Name order: Limb _ Side(Number) _ type _ Suffix
+
+        self.limb = ['arm', 'leg']
+        self.side = ['L', 'R', 'C']
+        self.fk_mod = ['fk0', 'fk1', 'fk2']
+        self.ik_mod = ['upv', 'ik']
+        self.ctr_suffix = 'ctl'
+
+        self.start_frame = None
+        self.end_frame = None
+        self.use_timeline = False  # Bake by moving the playhead, keys then only come from autokey
+        self.workers = None  # Solver processes used by range bakes, None for parallelSolve.default_workers()
+        self.incremental = False  # Range bakes only re-solve frames changed since the last bake, see bakeFingerprint
+        self.reduce_keys = False  # Range bakes only keep the keys needed within tolerance, see keyReduction
+        self.linear_tolerance = 0.01  # Centimeters
+        self.angular_tolerance = 0.05  # Degrees
+
+        self.modules = dict()
+        self.selection = dict()
+        self.cache = dict()
+        self.fingerprints = dict()  # module: (direction and range baked, bakeFingerprint.fingerprint after the bake)
+        self.index = moduleIndex.ModuleIndex(self.limb, self.side, self.fk_mod + self.ik_mod, self.ctr_suffix)
+
+    def add_module(self, name, controls):
+        """Register a module, one missing any of its controls is reported and left out. Returns True when added."""
+        try:
+            cache = ikfkCache.ModuleCache(controls, self.is_mirrored(controls))
+        except RuntimeError:
+            print(f'Could not find every control of {name}')
+            return False
+
+        self.modules[name] = controls
+        self.cache[name] = cache
+        for ctr in controls:
+            self.selection[ctr] = name
+        return True
+
+    def module_cache(self, module):
+        cache = self.cache.get(module)
+        if cache and cache.is_valid():
+            return cache
+
+        if cache:
+            cache.remove_callbacks()
+            self.selection = {ctr: mod for ctr, mod in self.selection.items() if mod != module}
+            for ctr in self.modules[module]:
+                self.selection[ctr] = module
+
+        self.cache[module] = ikfkCache.ModuleCache(self.modules[module], self.is_mirrored(self.modules[module]))
+        return self.cache[module]
+
+    def clear(self):
+        for cache in self.cache.values():
+            cache.remove_callbacks()
+
+        self.modules = dict()
+        self.selection = dict()
+        self.cache = dict()
+        self.fingerprints = dict()
+
+    def check_selection(self):
+        selected = list()
+
+        for each in cmds.ls(sl=True):
+            if each not in self.selection:
+                continue
+            if self.selection[each] not in selected:
+                selected.append(self.selection[each])
+
+        return self.available(selected or list(self.modules))
+
+    def available(self, mods):
+        """The modules whose controls can still all be found, the others are reported and skipped."""
+        available = list()
+        for mod in mods:
+            try:
+                self.module_cache(mod)
+            except RuntimeError:
+                print(f'Skipping {mod}, could not find every control')
+                continue
+            available.append(mod)
+        return available
+
+    @staticmethod
+    def is_mirrored(module):
+        return module[0].split('_')[1][0] == 'R'  # Temporary solution to mirrored modules
+
+    def match_tip(self, module, fk=False):
+        cache = self.module_cache(module)
+        driver, driven = (2, 4) if not fk else (4, 2)
+
+        offset_mat = cache.tip_offset if not fk else cache.tip_offset.inverse()
+        cache.set_world_matrix(driven, offset_mat * cache.world_matrix(driver))
+
+    def sample(self, mods, frames, starts=None):
+        """Matrices of the controls at every frame, their rotations at starts, the start of each run by default."""
+        caches = [self.module_cache(mod) for mod in mods]
+
+        plugs = list()
+        for cache in caches:
+            for index in range(5):
+                plugs.append(cache.matrix_plug(index, 'worldMatrix'))
+                plugs.append(cache.matrix_plug(index, 'parentInverseMatrix'))
+
+        matrices = dgSampler.sample_matrices(plugs, frames).reshape(len(mods), 5, 2, len(frames), 4, 4)
+
+        # Baked rotations continue from the ones at the start of each run
+        if starts is None:
+            starts = [frames[start] for start, end in dgSampler.runs(frames)]
+        plugs = [cache.plug(index, f'rotate{axis}') for cache in caches for index in range(5) for axis in 'XYZ']
+        rotate = dgSampler.sample_values(plugs, starts).reshape(len(mods), 5, 3, len(starts))
+
+        return {
+            'world': matrices[:, :, 0],
+            'parent_inverse': matrices[:, :, 1],
+            'tip_offset': numpy.array([dgSampler.as_array(cache.tip_offset) for cache in caches]),
+            'mid_offset': numpy.array([dgSampler.as_array(cache.mid_offset) for cache in caches]),
+            'rotate_order': numpy.array([cache.rotate_orders for cache in caches]),
+            'rotate': rotate.transpose(0, 1, 3, 2),
+            'lengths': numpy.array([[cache.upper_length, cache.lower_length] for cache in caches]),
+            'mirrored': numpy.array([cache.mirrored for cache in caches]),
+        }
+
+    def add_keys(self, writer, mods, solved, frames=None):
+        for (index, attr), values in solved.items():
+            for m, mod in enumerate(mods):
+                cache = self.module_cache(mod)
+                for axis, channel in enumerate('XYZ'):
+                    writer.add(cache.plug(index, f'{attr}{channel}'), values[m, :, axis], frames)
+
+    def tolerances(self):
+        if not self.reduce_keys:
+            return None
+        return self.linear_tolerance, math.radians(self.angular_tolerance)
+
+    def scheduler(self, direction, mods=None):
+        """Range bake of the modules, the selected ones by default."""
+        scheduler = bakeScheduler.BakeScheduler(self, self.workers, self.incremental, self.tolerances())
+        scheduler.add(mods or list(self.check_selection()), direction)
+        return scheduler
+
+    def bake(self, direction):
+        if not self.modules:
+            return
+
+        mods = list(self.check_selection())
+        match = self.match_ik_to_fk if direction == bakeScheduler.IK_FOLLOWS_FK else self.match_fk_to_ik
+        frames = dgSampler.frame_range(self.start_frame, self.end_frame)
+        operation = f'bake {direction}' + (' timeline' if self.use_timeline else '')
+
+        with profiler.run(f'bake {direction}'), sceneGuard.SceneGuard(operation, len(frames)):
+            if self.use_timeline:
+                profiler.frames(len(frames))
+                with profiler.phase('match'):
+                    for frame in frames:
+                        cmds.currentTime(frame, edit=True)
+                        match(mods)
+                return
+
+            return self.scheduler(direction, mods).run(self.start_frame, self.end_frame)
+
+    def match_ik_to_fk(self, mods=None):
+        if not mods:
+            mods = self.check_selection()
+        caches = [self.module_cache(mod) for mod in mods]
+        if not caches:
+            return
+
+        with profiler.run('match ik to fk'):
+            # Query FK position
+            with profiler.phase('sample'):
+                fk_pos = numpy.array([[list(cache.world_position(i)) for i in range(3)] for cache in caches])
+            with profiler.phase('solve'):
+                solved = ikfkSolver.solve_ik_to_fk(fk_pos[:, 0], fk_pos[:, 1], fk_pos[:, 2])
+
+            with profiler.phase('set'):
+                for mod, cache, pole_pos in zip(mods, caches, solved['pole']):
+                    self.match_tip(mod)
+                    cache.set_world_position(3, pole_pos)
+
+    def bake_ik_to_fk(self):
+        return self.bake(bakeScheduler.IK_FOLLOWS_FK)
+
+    def match_fk_to_ik(self, mods=None):
+        if not mods:
+            mods = self.check_selection()
+        caches = [self.module_cache(mod) for mod in mods]
+        if not caches:
+            return
+
+        with profiler.run('match fk to ik'):
+            with profiler.phase('sample'):
+                # Root, mid, tip, pole vector and ik positions for every module
+                positions = numpy.array([[list(cache.world_position(i)) for i in range(5)] for cache in caches])
+
+                # Still giving gimbal lock problems
+                root_up = numpy.array([[cache.world_matrix(0)[i] * 10 for i in range(4, 7)] for cache in caches])
+
+            with profiler.phase('solve'):
+                solved = ikfkSolver.solve_fk_to_ik(positions[:, 0], positions[:, 4], positions[:, 3], root_up,
+                                                   [cache.upper_length for cache in caches],
+                                                   [cache.lower_length for cache in caches],
+                                                   [cache.mirrored for cache in caches])
+
+            with profiler.phase('set'):
+                for i, cache in enumerate(caches):
+                    cache.set_world_rotation(0, solved['root_quaternion'][i])
+                    cache.set_world_rotation(1, solved['mid_quaternion'][i])
+                    cache.set_world_position(1, solved['elbow'][i])
+
+    def bake_fk_to_ik(self):
+        return self.bake(bakeScheduler.FK_FOLLOWS_IK)
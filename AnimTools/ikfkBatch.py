@@ -0,0 +1,152 @@
+"""
+Headless IK/FK bakes over many scene files, runs in mayapy without PySide:
+
+    mayapy -m AnimTools.ikfkBatch fk "shots/*.ma" -n char01 -r 1 240 -o baked -w 4 -s summary.json
+
+Direction fk makes FK follow IK and ik the other way round, like the ikfkUI buttons. Every file is opened, the
+modules of the given namespaces, all of them by default, are range baked and the scene is saved to the output
+directory, or over the original with --in-place. Files are spread across worker processes that start Maya once
+each, the summary JSON holds the timings and error of every file. --solver-workers also spreads the solve of each
+file over processes, worth it for a few long shots.
+"""
+from maya import cmds
+
+from AnimTools import ikfk, bakeScheduler, parallelSolve, batch
+
+import traceback
+import argparse
+import time
+import json
+import sys
+import os
+
+
+def output_path(path, output_dir=None):
+    if not output_dir:
+        return path
+    return os.path.join(output_dir, os.path.basename(path))
+
+
+def bake_file(path, direction, namespaces=None, frame_range=None, output_dir=None, reduce_keys=False,
+              solver_workers=1):
+    """Open, bake and save one scene file, returns its summary entry."""
+    entry = {'file': path, 'output': output_path(path, output_dir), 'modules': list(), 'skipped': list(),
+             'frames': 0, 'seconds': dict(), 'error': None}
+    seconds = entry['seconds']
+    start = time.perf_counter()
+
+    try:
+        cmds.file(path, open=True, force=True, prompt=False, ignoreVersion=True)
+        seconds['open'] = time.perf_counter() - start
+
+        ik_fk = ikfk.IKFK()
+        ik_fk.reduce_keys = reduce_keys
+        ik_fk.workers = solver_workers
+        if frame_range:
+            ik_fk.start_frame, ik_fk.end_frame = frame_range
+        else:
+            ik_fk.start_frame = int(cmds.playbackOptions(q=True, minTime=True))
+            ik_fk.end_frame = int(cmds.playbackOptions(q=True, maxTime=True))
+
+        for namespace in batch.scene_namespaces() if namespaces is None else namespaces:
+            for module, controls in ik_fk.index.modules(namespace).items():
+                ik_fk.add_module(module, list(controls))
+        entry['modules'] = list(ik_fk.modules)
+        if not ik_fk.modules:
+            raise RuntimeError('No IK/FK module found')
+
+        phase = time.perf_counter()
+        cmds.select(clear=True)  # IKFK bakes the selected modules only
+        writer = ik_fk.bake(direction)
+        entry['skipped'] = writer.skipped if writer else list()  # Channels that couldn't be keyed
+        ik_fk.clear()
+        entry['frames'] = ik_fk.end_frame - ik_fk.start_frame + 1
+        seconds['bake'] = time.perf_counter() - phase
+
+        phase = time.perf_counter()
+        if entry['output'] != path:
+            cmds.file(rename=entry['output'])
+        cmds.file(save=True, force=True, type=batch.FILE_TYPES.get(os.path.splitext(path)[1].lower(), 'mayaAscii'))
+        seconds['save'] = time.perf_counter() - phase
+
+    except Exception:
+        entry['error'] = traceback.format_exc()
+    finally:
+        cmds.file(new=True, force=True)
+
+    seconds['total'] = time.perf_counter() - start
+    return entry
+
+
+def run(files, direction, namespaces=None, frame_range=None, output_dir=None, reduce_keys=False, workers=1,
+        solver_workers=1):
+    """Bake every file, in this process or spread across worker processes, returns the summary."""
+    start = time.perf_counter()
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    arguments = (direction, namespaces, frame_range, output_dir, reduce_keys, solver_workers)
+    entries = batch.run(bake_file, files, arguments, workers)
+
+    return {
+        'direction': direction,
+        'workers': workers,
+        'solver_workers': solver_workers,
+        'seconds': time.perf_counter() - start,
+        'failed': sum(1 for entry in entries if entry['error']),
+        'files': entries,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='mayapy -m AnimTools.ikfkBatch',
+                                     description='Bake the IK/FK modules of many scene files.')
+    parser.add_argument('direction', choices=(bakeScheduler.FK_FOLLOWS_IK, bakeScheduler.IK_FOLLOWS_FK),
+                        help='fk: FK follows IK, ik: IK follows FK')
+    parser.add_argument('files', nargs='+', help='scene files or glob patterns')
+    parser.add_argument('-n', '--namespace', action='append', dest='namespaces',
+                        help='namespace to bake, can be repeated, ":" is the root one. Every namespace by default')
+    parser.add_argument('-r', '--range', nargs=2, type=int, metavar=('START', 'END'), dest='frame_range',
+                        help='frames to bake, the playback range of each file by default')
+    parser.add_argument('-o', '--output-dir', help='directory the baked scenes are saved to')
+    parser.add_argument('--in-place', action='store_true', help='save the baked scenes over the original files')
+    parser.add_argument('--reduce', action='store_true', help='only keep the keys needed within tolerance')
+    parser.add_argument('-w', '--workers', type=int, default=parallelSolve.default_workers(),
+                        help='mayapy processes, one file at a time each')
+    parser.add_argument('--solver-workers', type=int, default=1,
+                        help='solver processes per file, for long ranges on few files. 0 for one per spare core')
+    parser.add_argument('-s', '--summary', default='ikfkBatch.json', help='JSON summary file')
+
+    options = parser.parse_args(argv)
+    if not options.output_dir and not options.in_place:
+        parser.error('pass --output-dir, or --in-place to overwrite the scene files')
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    files = batch.expand(options.files)
+    if not files:
+        print('No scene file found')
+        return 1
+
+    namespaces = [namespace.strip(':') for namespace in options.namespaces] if options.namespaces else None
+    summary = run(files, options.direction, namespaces, options.frame_range, options.output_dir, options.reduce,
+                  options.workers, options.solver_workers or None)
+
+    with open(options.summary, 'w') as f:
+        f.write(json.dumps(summary, indent=4))
+
+    for entry in summary['files']:
+        if entry['error']:
+            print(f"{entry['file']}: failed\n{entry['error']}")
+        else:
+            skipped = f", {len(entry['skipped'])} channels not keyed" if entry['skipped'] else ''
+            print(f"{entry['file']}: {len(entry['modules'])} modules, {entry['frames']} frames{skipped} "
+                  f"in {entry['seconds']['total']:.2f}s")
+    print(f"Baked {len(files) - summary['failed']}/{len(files)} files in {summary['seconds']:.1f}s, "
+          f"summary in {options.summary}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Per module handles and rest data for ikfk, built once when a module is added
+so the per frame path does no name lookups. Renaming or deleting one of the controls drops the cache.
+Controls are still set through cmds.xform, so matching stays undoable and sets keys with autokey on.
+"""
+from maya.api import OpenMaya
+from maya import cmds
+
+from AnimTools import dgSampler
+
+
+def rest_pose(paths):
+    """World matrix of the FK tip parent with the FK controls at rest, see ikfk.retrieve_fk_pose."""
+    parent_mat = paths[0].exclusiveMatrix()
+    for path in paths[1:]:
+        parent_obj = OpenMaya.MFnTransform(path).parent(0)
+        parent_mat = OpenMaya.MFnTransform(parent_obj).transformation().asMatrix() * parent_mat
+    return parent_mat
+
+
+class ModuleCache(object):
+    def __init__(self, controls, mirrored=False):
+        # fk0, fk1, fk2, upv, ik names, the list is shared with IKFK.modules and follows renames
+        self.controls = controls
+        self.mirrored = mirrored
+        self.valid = True
+
+        self.handles = list()
+        self.paths = list()
+        for ctr in controls:
+            selection = OpenMaya.MSelectionList().add(ctr)
+            self.handles.append(OpenMaya.MObjectHandle(selection.getDependNode(0)))
+            self.paths.append(selection.getDagPath(0))
+
+        self.nodes = [OpenMaya.MFnDependencyNode(handle.object()) for handle in self.handles]
+        self.rotate_orders = [node.findPlug('rotateOrder', False).asInt() for node in self.nodes]
+
+        # Constant offsets, the parents are assumed not to change between rest and animation
+        self.tip_offset = self.paths[4].exclusiveMatrix() * rest_pose(self.paths[:3]).inverse()
+        self.mid_offset = self.paths[1].exclusiveMatrix() * self.paths[0].inclusiveMatrixInverse()
+
+        root, mid, tip = [self.world_position(i) for i in range(3)]
+        self.upper_length = (mid - root).length()
+        self.lower_length = (tip - mid).length()
+
+        self.callbacks = list()
+        for handle in self.handles:
+            self.callbacks.append(OpenMaya.MNodeMessage.addNameChangedCallback(handle.object(), self._renamed))
+            self.callbacks.append(OpenMaya.MNodeMessage.addNodePreRemovalCallback(handle.object(), self._removed))
+
+    def is_valid(self):
+        return self.valid and all(handle.isValid() for handle in self.handles)
+
+    def _renamed(self, node, previous_name, *args):
+        for i, handle in enumerate(self.handles):
+            if handle.isValid() and handle.object() == node:
+                self.controls[i] = OpenMaya.MFnDependencyNode(node).name()
+        self.valid = False
+
+    def _removed(self, *args):
+        self.valid = False
+
+    def remove_callbacks(self):
+        for callback in self.callbacks:
+            OpenMaya.MMessage.removeCallback(callback)
+        self.callbacks = list()
+
+    def plug(self, index, attribute):
+        return self.nodes[index].findPlug(attribute, False)
+
+    def matrix_plug(self, index, attribute='worldMatrix'):
+        return dgSampler.matrix_plug(self.handles[index].object(), attribute)
+
+    def world_matrix(self, index):
+        return self.paths[index].inclusiveMatrix()
+
+    def world_position(self, index):
+        mat = self.paths[index].inclusiveMatrix()
+        return OpenMaya.MVector(mat[12], mat[13], mat[14])
+
+    def set_world_matrix(self, index, matrix):
+        cmds.xform(self.paths[index].fullPathName(), matrix=list(matrix), worldSpace=True)
+
+    def set_world_position(self, index, position):
+        cmds.xform(self.paths[index].fullPathName(), translation=[float(value) for value in position],
+                   worldSpace=True)
+
+    def set_world_rotation(self, index, quaternion):
+        world = OpenMaya.MTransformationMatrix(self.world_matrix(index))
+        world.setRotation(OpenMaya.MQuaternion(*quaternion))
+        self.set_world_matrix(index, world.asMatrix())
@@ -0,0 +1,379 @@
+"""
+Maya-free limb solver used by ikfk.
+
+Every function works on arrays shaped (..., 3), so a single call can solve every frame of every
+module at once. Matrices follow Maya's row-vector layout: rows are the X, Y, Z axes and the translation.
+"""
+import numpy as np
+
+EPSILON = 1.0e-8
+
+
+def _as_vectors(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def _dot(vector_a, vector_b):
+    return np.sum(vector_a * vector_b, axis=-1, keepdims=True)
+
+
+def _length(vectors):
+    return np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def normalize(vectors):
+    vectors = _as_vectors(vectors)
+    return vectors / np.maximum(_length(vectors), EPSILON)
+
+
+def pole_vector(root, mid, tip):
+    """Pole position pushed out from the mid joint by the upper bone length, away from the root-tip line."""
+    root, mid, tip = _as_vectors(root), _as_vectors(mid), _as_vectors(tip)
+
+    vector_ab = mid - root
+    ac_normal = normalize(tip - root)
+
+    proj_vector = ac_normal * _dot(vector_ab, ac_normal) + root
+    pb_normal = normalize(mid - proj_vector)
+    return mid + pb_normal * _length(vector_ab)
+
+
+def elbow_position(ik_root, ik_end, pole, upper_length, lower_length):
+    """Mid joint position for a two bone chain reaching ik_end, bending towards the pole."""
+    root_pos, end_pos, pole_pos = _as_vectors(ik_root), _as_vectors(ik_end), _as_vectors(pole)
+    a = np.asarray(upper_length, dtype=np.float64)[..., None]
+    b = np.asarray(lower_length, dtype=np.float64)[..., None]
+
+    ik_vector = end_pos - root_pos
+    ik_dir = normalize(ik_vector)
+
+    # Slightly shorter than the full chain to avoid math errors
+    c = np.minimum(_length(ik_vector), a + b - 0.001)
+    c = np.maximum(c, EPSILON)
+
+    # Law of Cosines to find projection length from root to elbow along IK vector
+    x = (a ** 2 - b ** 2 + c ** 2) / (2 * c)
+    proj_point = root_pos + ik_dir * x
+
+    # Get elbow offset direction using pole vector
+    pole_dir = pole_pos - root_pos
+    perp_dir = normalize(pole_dir - ik_dir * _dot(pole_dir, ik_dir))
+
+    # Elbow height using Pythagoras, clipped against negative roots
+    h = np.sqrt(np.maximum(0.0, a ** 2 - x ** 2))
+    return proj_point + perp_dir * h
+
+
+def aim_matrix(position, aim_position, sec_position, mirrored=False):
+    """
+    Rotation aiming X from position to aim_position with Y towards sec_position, as (..., 3, 3).
+    Mirrored modules aim down the negative axes.
+    """
+    position, aim_position, sec_position = (_as_vectors(position), _as_vectors(aim_position),
+                                            _as_vectors(sec_position))
+
+    sign = np.where(np.asarray(mirrored, dtype=bool), -1.0, 1.0)[..., None]
+    aim_vector = normalize(aim_position - position) * sign
+    up_vector = normalize(sec_position - aim_position) * sign
+
+    obj_w = normalize(np.cross(aim_vector, up_vector))  # Binormal
+    obj_v = normalize(np.cross(obj_w, aim_vector))  # Recalculate up vector to ensure orthogonality
+
+    return np.stack(np.broadcast_arrays(aim_vector, obj_v, obj_w), axis=-2)
+
+
+def matrix_to_quaternion(matrices):
+    """(..., 3, 3) or (..., 4, 4) rotation matrices to (..., 4) quaternions in Maya's x, y, z, w order."""
+    m = _as_vectors(matrices)[..., :3, :3]
+    m00, m01, m02 = m[..., 0, 0], m[..., 0, 1], m[..., 0, 2]
+    m10, m11, m12 = m[..., 1, 0], m[..., 1, 1], m[..., 1, 2]
+    m20, m21, m22 = m[..., 2, 0], m[..., 2, 1], m[..., 2, 2]
+
+    # One candidate per largest component, the most stable one is picked per element
+    candidates = np.stack([
+        np.stack([1.0 + m00 - m11 - m22, m01 + m10, m02 + m20, m12 - m21], axis=-1),
+        np.stack([m01 + m10, 1.0 - m00 + m11 - m22, m12 + m21, m20 - m02], axis=-1),
+        np.stack([m02 + m20, m12 + m21, 1.0 - m00 - m11 + m22, m01 - m10], axis=-1),
+        np.stack([m12 - m21, m20 - m02, m01 - m10, 1.0 + m00 + m11 + m22], axis=-1),
+    ], axis=-2)
+
+    diagonal = np.stack([m00 - m11 - m22, m11 - m00 - m22, m22 - m00 - m11, m00 + m11 + m22], axis=-1)
+    best = np.argmax(diagonal, axis=-1)[..., None, None]
+    quaternion = np.take_along_axis(candidates, best, axis=-2)[..., 0, :]
+    quaternion = normalize(quaternion)
+
+    # Both signs are the same rotation, w is kept positive. See continuous_quaternions for frames in sequence
+    return np.where(quaternion[..., 3:] < 0.0, -quaternion, quaternion)
+
+
+def continuous_quaternions(quaternions, previous=None):
+    """
+    (..., frames, 4) quaternions with their signs flipped so every frame is on the hemisphere of the one before,
+    the first frame on the one of previous (..., 4) when given. They then interpolate without jumps.
+    """
+    quaternions = _as_vectors(quaternions)
+    flip = np.zeros(quaternions.shape[:-1], dtype=bool)
+    flip[..., 1:] = _dot(quaternions[..., 1:, :], quaternions[..., :-1, :])[..., 0] < 0.0
+    if previous is not None and quaternions.shape[-2]:
+        flip[..., 0] = _dot(quaternions[..., 0, :], _as_vectors(previous))[..., 0] < 0.0
+
+    # Flipping a frame flips its test with the next one too, so signs are a running parity
+    sign = np.where(np.cumsum(flip, axis=-1) % 2 == 1, -1.0, 1.0)
+    return quaternions * sign[..., None]
+
+
+def quaternion_to_matrix(quaternions):
+    """(..., 4) quaternions in x, y, z, w order to (..., 3, 3) row-vector rotation matrices."""
+    x, y, z, w = np.moveaxis(normalize(quaternions), -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y + z * w), 2 * (x * z - y * w)], axis=-1),
+        np.stack([2 * (x * y - z * w), 1 - 2 * (x * x + z * z), 2 * (y * z + x * w)], axis=-1),
+        np.stack([2 * (x * z + y * w), 2 * (y * z - x * w), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=-2)
+
+
+def compose_matrix(rotation, translation):
+    """Build (..., 4, 4) Maya matrices from (..., 3, 3) rotations and (..., 3) translations."""
+    rotation, translation = _as_vectors(rotation), _as_vectors(translation)
+    shape = np.broadcast_shapes(rotation.shape[:-2], translation.shape[:-1])
+
+    matrices = np.zeros(shape + (4, 4))
+    matrices[..., :3, :3] = rotation
+    matrices[..., 3, :3] = translation
+    matrices[..., 3, 3] = 1.0
+    return matrices
+
+
+def solve_ik_to_fk(root, mid, tip):
+    """Pole vector positions that keep the IK chain on the FK plane."""
+    return {'pole': pole_vector(root, mid, tip)}
+
+
+def solve_fk_to_ik(root, ik, pole, root_up, upper_length, lower_length, mirrored=False):
+    """
+    FK pose following the IK chain. root_up is the secondary target of the root aim.
+    Returns the elbow positions plus world rotations of root and mid as quaternions and matrices.
+    """
+    root = _as_vectors(root)
+    elbow = elbow_position(root, ik, pole, upper_length, lower_length)
+
+    root_rotation = aim_matrix(root, elbow, root_up, mirrored)
+    mid_rotation = aim_matrix(elbow, ik, pole, mirrored)
+
+    return {
+        'elbow': elbow,
+        'root_quaternion': matrix_to_quaternion(root_rotation),
+        'mid_quaternion': matrix_to_quaternion(mid_rotation),
+        'root_matrix': compose_matrix(root_rotation, root),
+        'mid_matrix': compose_matrix(mid_rotation, elbow),
+    }
+
+
+# Maya rotateOrder enum: xyz, yzx, zxy, xzy, yxz, zyx
+ROTATE_ORDERS = ((0, 1, 2), (1, 2, 0), (2, 0, 1), (0, 2, 1), (1, 0, 2), (2, 1, 0))
+
+
+def matrix_to_euler(matrices, rotate_order=0):
+    """
+    Euler angles in radians of (..., 3, 3) or (..., 4, 4) matrices, scale is ignored.
+    rotate_order is a Maya rotateOrder value, or an array of them broadcastable to the matrices.
+    """
+    m = normalize(_as_vectors(matrices)[..., :3, :3])
+    orders = np.broadcast_to(np.asarray(rotate_order), m.shape[:-2])
+    angles = np.zeros(m.shape[:-1])
+
+    for order in np.unique(orders):
+        i, j, k = ROTATE_ORDERS[order]
+        parity = 1.0 if order < 3 else -1.0
+        mask = orders == order
+        sub = m[mask]
+
+        sin_b = np.clip(-parity * sub[:, i, k], -1.0, 1.0)
+        cos_b = np.sqrt(sub[:, i, i] ** 2 + (parity * sub[:, i, j]) ** 2)
+        gimbal = cos_b < 1.0e-6
+
+        first = np.where(gimbal,
+                         np.arctan2(-parity * sub[:, k, j], sub[:, j, j]),
+                         np.arctan2(parity * sub[:, j, k], sub[:, k, k]))
+        last = np.where(gimbal, 0.0, np.arctan2(parity * sub[:, i, j], sub[:, i, i]))
+
+        result = np.empty(sub.shape[:-1])
+        result[:, i] = first
+        result[:, j] = np.arcsin(sin_b)
+        result[:, k] = last
+        angles[mask] = result
+
+    return angles
+
+
+def euler_to_matrix(angles, rotate_order=0):
+    """(..., 3) Euler angles in radians to (..., 3, 3) row-vector rotation matrices, the inverse of matrix_to_euler."""
+    angles = np.asarray(angles, dtype=np.float64)
+    orders = np.broadcast_to(np.asarray(rotate_order), angles.shape[:-1])
+    cos, sin = np.cos(angles), np.sin(angles)
+
+    # One rotation per axis, composed in rotate order
+    axes = np.zeros(angles.shape[:-1] + (3, 3, 3))
+    for axis in range(3):
+        i, j = (axis + 1) % 3, (axis + 2) % 3
+        axes[..., axis, axis, axis] = 1.0
+        axes[..., axis, i, i] = cos[..., axis]
+        axes[..., axis, i, j] = sin[..., axis]
+        axes[..., axis, j, i] = -sin[..., axis]
+        axes[..., axis, j, j] = cos[..., axis]
+
+    sequence = np.array(ROTATE_ORDERS)[orders]
+    first, middle, last = (np.take_along_axis(axes, sequence[..., n, None, None, None], axis=-3)[..., 0, :, :]
+                           for n in range(3))
+    return first @ middle @ last
+
+
+def _wrap(angles):
+    return (angles + np.pi) % (2.0 * np.pi) - np.pi
+
+
+def _angle_distance(angles_a, angles_b):
+    return np.sum(_wrap(angles_a - angles_b) ** 2, axis=-1)
+
+
+def alternate_euler(angles, rotate_order=0):
+    """The other Euler triple of the same rotation: first and last angles turned by pi, the middle one mirrored."""
+    angles = np.asarray(angles, dtype=np.float64)
+    orders = np.broadcast_to(np.asarray(rotate_order), angles.shape[:-1])
+    middle = np.array([order[1] for order in ROTATE_ORDERS])[orders]
+    sign = np.where(np.arange(3) == middle[..., None], -1.0, 1.0)
+    return sign * angles + np.pi
+
+
+def unroll_euler(angles, rotate_order=0, reference=None):
+    """
+    Continuous version of (..., frames, 3) Euler angles: every frame takes the Euler branch and the 2 pi turn
+    closest to the previous one, the first frame the closest to reference (..., 3) when given.
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    if not angles.shape[-2]:
+        return angles.copy()
+    orders = np.broadcast_to(np.asarray(rotate_order), angles.shape[:-2])[..., None]
+    alternate = alternate_euler(angles, orders)
+
+    # Flipping branch between two frames is the same test on either branch, so branches are a running parity
+    flip = np.zeros(angles.shape[:-1], dtype=bool)
+    flip[..., 1:] = (_angle_distance(alternate[..., 1:, :], angles[..., :-1, :]) <
+                     _angle_distance(angles[..., 1:, :], angles[..., :-1, :]))
+    if reference is not None:
+        reference = np.asarray(reference, dtype=np.float64)
+        flip[..., 0] = (_angle_distance(alternate[..., 0, :], reference) <
+                        _angle_distance(angles[..., 0, :], reference))
+    branch = np.cumsum(flip, axis=-1) % 2 == 1
+    chosen = np.where(branch[..., None], alternate, angles)
+
+    first = chosen[..., :1, :]
+    if reference is not None:
+        first = reference[..., None, :] + _wrap(first - reference[..., None, :])
+    steps = _wrap(np.diff(chosen, axis=-2))
+    return np.concatenate([first, first + np.cumsum(steps, axis=-2)], axis=-2)
+
+
+def local_channels(world, parent_inverse, rotate_order=0):
+    """Translate and rotate (radians) channels of world matrices expressed in their parent space."""
+    local = np.matmul(world, parent_inverse)
+    return local[..., 3, :3], matrix_to_euler(local, rotate_order)
+
+
+def joint_channels(local, joint_orient, rotate_axis, rotate_order):
+    """
+    Translate, rotate (radians) and scale channels of joints giving (..., 4, 4) local matrices, Maya composing them
+    as scale * rotate axis * rotate * joint orient * translate. joint_orient and rotate_axis are (..., 3) XYZ angles
+    in radians broadcastable to the matrices, rotate_order their rotate orders. Shear and segment scale compensation
+    of scaled parents are not accounted for.
+    """
+    local = _as_vectors(local)
+    scale = _length(local[..., :3, :3])[..., 0]
+    rotation = local[..., :3, :3] / np.maximum(scale, EPSILON)[..., None]
+
+    # Peel off the rotate axis and joint orient, both orthonormal
+    rotation = np.swapaxes(euler_to_matrix(rotate_axis), -1, -2) @ rotation @ \
+        np.swapaxes(euler_to_matrix(joint_orient), -1, -2)
+    return local[..., 3, :3], matrix_to_euler(rotation, rotate_order), scale
+
+
+def bake_ik_to_fk(world, parent_inverse, tip_offset, rotate_order):
+    """
+    Solve the IK controls following the FK chain for a whole frame range.
+
+    world and parent_inverse are (modules, 5, frames, 4, 4) matrices of the fk0, fk1, fk2, upv and ik controls,
+    tip_offset is the (modules, 4, 4) rest offset from the FK tip to the IK control
+    and rotate_order the (modules, 5) rotate orders.
+    Returns {(control index, 'translate' or 'rotate'): (modules, frames, 3)}.
+    """
+    world, parent_inverse = _as_vectors(world), _as_vectors(parent_inverse)
+    rotate_order = np.asarray(rotate_order)
+    positions = world[..., 3, :3]
+
+    pole = pole_vector(positions[:, 0], positions[:, 1], positions[:, 2])
+    pole_local = np.matmul(np.concatenate([pole, np.ones(pole.shape[:-1] + (1,))], axis=-1)[..., None, :],
+                           parent_inverse[:, 3])[..., 0, :3]
+
+    ik_world = np.matmul(_as_vectors(tip_offset)[:, None], world[:, 2])
+    ik_translate, ik_rotate = local_channels(ik_world, parent_inverse[:, 4], rotate_order[:, 4, None])
+
+    return {(3, 'translate'): pole_local, (4, 'translate'): ik_translate, (4, 'rotate'): ik_rotate}
+
+
+def bake_fk_to_ik(world, parent_inverse, mid_offset, rotate_order, lengths, mirrored):
+    """
+    Solve the FK controls following the IK chain for a whole frame range.
+
+    Arrays are laid out as in bake_ik_to_fk, mid_offset is the (modules, 4, 4) rest offset from fk0 to the parent
+    of fk1, lengths the (modules, 2) upper and lower bone lengths and mirrored a (modules,) flag.
+    """
+    world, parent_inverse = _as_vectors(world), _as_vectors(parent_inverse)
+    rotate_order = np.asarray(rotate_order)
+    positions = world[..., 3, :3]
+    root_up = world[:, 0, :, 1, :3] * 10
+
+    lengths = _as_vectors(lengths)
+
+    solved = solve_fk_to_ik(positions[:, 0], positions[:, 4], positions[:, 3], root_up, lengths[:, 0, None],
+                            lengths[:, 1, None], np.asarray(mirrored, dtype=bool)[:, None])
+
+    root_rotate = local_channels(solved['root_matrix'], parent_inverse[:, 0], rotate_order[:, 0, None])[1]
+
+    mid_parent = np.matmul(_as_vectors(mid_offset)[:, None], solved['root_matrix'])
+    mid_translate, mid_rotate = local_channels(solved['mid_matrix'], np.linalg.inv(mid_parent),
+                                               rotate_order[:, 1, None])
+
+    return {(0, 'rotate'): root_rotate, (1, 'translate'): mid_translate, (1, 'rotate'): mid_rotate}
+
+
+IK_FOLLOWS_FK = 'ik'
+FK_FOLLOWS_IK = 'fk'
+
+# Channels returned by bake() for each direction
+BAKE_CHANNELS = {
+    IK_FOLLOWS_FK: ((3, 'translate'), (4, 'translate'), (4, 'rotate')),
+    FK_FOLLOWS_IK: ((0, 'rotate'), (1, 'translate'), (1, 'rotate')),
+}
+
+
+def unroll(solved, reference, rotate_order, runs):
+    """
+    Make the rotate channels of a bake continuous, in place. runs are the (start, end) frame indices of the
+    consecutive frames solved, reference the (modules, 5, runs, 3) rotations the controls had at each run start.
+    """
+    for (index, attr), values in solved.items():
+        if attr != 'rotate':
+            continue
+        for r, (start, end) in enumerate(runs):
+            values[:, start:end] = unroll_euler(values[:, start:end], rotate_order[:, index],
+                                                reference[:, index, r])
+    return solved
+
+
+def bake(sampled, direction):
+    """Solve a dictionary of sampled arrays, as built by IKFK.sample, in the given direction."""
+    if direction == IK_FOLLOWS_FK:
+        return bake_ik_to_fk(sampled['world'], sampled['parent_inverse'], sampled['tip_offset'],
+                             sampled['rotate_order'])
+    return bake_fk_to_ik(sampled['world'], sampled['parent_inverse'], sampled['mid_offset'],
+                         sampled['rotate_order'], sampled['lengths'], sampled['mirrored'])
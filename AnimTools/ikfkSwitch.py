@@ -1,251 +1,22 @@
-from maya.api import OpenMaya
-from maya import OpenMayaUI, cmds
+from maya import cmds
 
 from AnimTools.pyside import QtWidgets, QtCore, maya_window
-from MayaData.lib import constraint, templates
+from AnimTools.ikfk import IKFK, retrieve_fk_pose
+from AnimTools import bakeScheduler, sceneWatcher, sceneGuard, profiler
 
-import MayaData
 import json
-import math
+import os
 
-with open(templates.__path__[0] + '\\shapes.json', 'r') as f:
-    shapes = json.loads(f.read())
+shapes = None  # Control shapes of MayaData's templates, read when a rig part is first built
 
 
-def retrieve_fk_pose(hierarchy):
-    parent_mat = None
-    for ctr in hierarchy:
-        ctr_obj = OpenMaya.MSelectionList().add(ctr).getDependNode(0)
-        parent_obj = OpenMaya.MFnTransform(ctr_obj).parent(0)
-
-        if not parent_mat:
-            parent_mat = OpenMaya.MFnDagNode(parent_obj).getPath().inclusiveMatrix()  # world matrix
-            continue
-        current_parent_mat = OpenMaya.MFnTransform(parent_obj).transformation().asMatrix()  # local matrix
-        parent_mat = current_parent_mat * parent_mat
-
-    return parent_mat
-
-
-class IKFK(object):
-    def __init__(self):
-        # New Name order: Limb _ Side(Number) _ type _ Suffix
-
-        self.limb = ['arm', 'leg']
-        self.side = ['L', 'R', 'C']
-        self.fk_mod = ['fk0', 'fk1', 'fk2']
-        self.ik_mod = ['upv', 'ik']
-        self.ctr_suffix = 'ctl'
-
-        self.start_frame = None
-        self.end_frame = None
-
-        self.modules = dict()
-        self.selection = dict()
-
-    def check_selection(self):
-        selected = list()
-
-        for each in cmds.ls(sl=True):
-            if each not in self.selection:
-                continue
-            if self.selection[each] not in selected:
-                selected.append(self.selection[each])
-
-        if not selected:
-            return self.modules.keys()
-        return selected
-
-    def match_tip(self, module, fk=False):
-        driver, driven = (2, 4) if not fk else (4, 2)
-
-        ik_obj = OpenMaya.MSelectionList().add(self.modules[module][-1]).getDependNode(0)
-        ik_obj = OpenMaya.MFnTransform(ik_obj).parent(0)
-
-        constraint.matrix(self.modules[module][driver], self.modules[module][driven])
-
-        neutral_mat = {2: retrieve_fk_pose(self.modules[module][:3]),
-                       4: OpenMaya.MFnDagNode(ik_obj).getPath().inclusiveMatrix()}
-
-        offset_mat = neutral_mat[driven] * neutral_mat[driver].inverse()
-
-        driven_obj = OpenMaya.MSelectionList().add(self.modules[module][driven]).getDependNode(0)
-        driven_mat = OpenMaya.MFnDagNode(driven_obj).getPath().inclusiveMatrix()
-
-        cmds.xform(self.modules[module][driven], m=offset_mat * driven_mat, ws=True)
-
-    def _pole_vector(self, root, mid, end):
-        point_a = OpenMaya.MVector(*root)
-        point_b = OpenMaya.MVector(*mid)
-        point_c = OpenMaya.MVector(*end)
-
-        vector_ab = point_b - point_a
-        vector_ac = point_c - point_a
-        ac_normal = vector_ac.normalize()
-
-        proj_length = vector_ab * ac_normal
-        proj_vector = (ac_normal * proj_length) + point_a
-
-        vector_pb = point_b - proj_vector
-        pb_normal = vector_pb.normalize()
-        pole_position = point_b + (pb_normal * vector_ab.length())
-        return pole_position.x, pole_position.y, pole_position.z
-
-    @staticmethod
-    def _get_elbow_pos(ik_root, ik_end, pole_vector, upper_length, lower_length):
-        root_pos = OpenMaya.MVector(ik_root)
-        end_pos = OpenMaya.MVector(ik_end)
-        p_vector_pos = OpenMaya.MVector(pole_vector)
-
-        ik_vector = end_pos - root_pos
-        ik_length = ik_vector.length()
-        ik_dir = ik_vector.normal()
-
-        arm_total = upper_length + lower_length
-        if ik_length > arm_total:
-            ik_length = arm_total - 0.001  # Slightly shorter to avoid math errors
-
-        # Law of Cosines to find projection length from root to elbow along IK vector
-        a = upper_length
-        b = lower_length
-        c = ik_length
-
-        x = (a ** 2 - b ** 2 + c ** 2) / (2 * c)  # Distance from root along IK line
-        proj_point = root_pos + ik_dir * x
-
-        # Get elbow offset direction using pole vector
-        pole_dir = p_vector_pos - root_pos
-        proj = pole_dir - ik_dir * (pole_dir * ik_dir)
-        perp_dir = proj.normal()
-
-        # Elbow height using Pythagoras
-        h = math.sqrt(max(0.0, a ** 2 - x ** 2))  # max(0.0, …) guards against negative roots
-        return proj_point + perp_dir * h
-
-    @staticmethod
-    def _set_aim_vector(main_object, aim_position, sec_position, mirrored=False):
-        sec_position = OpenMaya.MVector(sec_position)
-        aim_pos = OpenMaya.MVector(aim_position)
-        obj_pos = OpenMaya.MVector(cmds.xform(main_object, q=True, ws=True, t=True))
-
-        obj_dag = OpenMaya.MSelectionList().add(main_object).getDagPath(0)
-        transform_fn = OpenMaya.MFnTransform(obj_dag)
-
-        aim_axis = OpenMaya.MVector.kXaxisVector
-        sec_axis = OpenMaya.MVector.kYaxisVector
-
-        # Construct orthonormal basis
-        aim_vector = (aim_pos - obj_pos).normal()
-        up_vector = (sec_position - aim_pos).normal()
-
-        if mirrored:
-            aim_vector *= -1
-            up_vector *= -1
-
-        obj_u = aim_vector  # Forward
-        obj_v = up_vector
-        obj_w = (obj_u ^ obj_v).normal()  # Cross product → binormal
-
-        obj_v = (obj_w ^ obj_u).normal()  # Recalculate up vector to ensure orthogonality
-
-        # First rotation: align secondary axis to primary axis
-        quaternion_u = OpenMaya.MQuaternion(aim_axis, obj_u)
-        quaternion = quaternion_u
-
-        # Rotate secondary axis using first quaternion
-        sec_axis_rotated = sec_axis.rotateBy(quaternion)
-
-        # Find angle between rotated sec_axis and obj_v (desired up)
-        dot = max(min(sec_axis_rotated * obj_v, 1.0), -1.0)  # Clamp dot product
-        angle = math.acos(dot)
-        quaternion_v = OpenMaya.MQuaternion(angle, obj_u)
-
-        # Fix twist direction if needed
-        if not obj_v.isEquivalent(sec_axis_rotated.rotateBy(quaternion_v), 1.0e-5):
-            angle = (2 * math.pi) - angle
-            quaternion_v = OpenMaya.MQuaternion(angle, obj_u)
-
-        # Combine rotations
-        quaternion *= quaternion_v
-        transform_fn.setRotation(quaternion, OpenMaya.MSpace.kWorld)
-
-    @staticmethod
-    def _get_matrix_vector(matrix, vector):
-        vector = vector.lower()
-        if vector == 'x':
-            return OpenMaya.MVector(matrix[0], matrix[1], matrix[2])
-        if vector == 'y':
-            return OpenMaya.MVector(matrix[4], matrix[5], matrix[6])
-        if vector == 'z':
-            return OpenMaya.MVector(matrix[8], matrix[9], matrix[10])
-
-    def match_ik_to_fk(self, mods=None):
-        if not mods:
-            mods = self.check_selection()
-
-        for mod in mods:
-            # Query FK position
-            root = cmds.xform(self.modules[mod][0], q=True, ws=True, t=True)
-            mid = cmds.xform(self.modules[mod][1], q=True, ws=True, t=True)
-            tip = cmds.xform(self.modules[mod][2], q=True, ws=True, t=True)
-
-            self.match_tip(mod)
-            cmds.xform(self.modules[mod][3], ws=True, t=self._pole_vector(root, mid, tip))
-
-    def bake_ik_to_fk(self):
-        if not self.modules:
-            return
-
-        mods = self.check_selection()
-        if not mods:
-            mods = list(self.modules.keys())
-
-        for frame in range(int(self.start_frame), int(self.end_frame) + 1):
-            cmds.currentTime(frame, edit=True)
-            self.match_ik_to_fk(mods)
-
-    def match_fk_to_ik(self, mods=None):
-        if not mods:
-            mods = self.check_selection()
-        for mod in mods:
-            mirrored = False
-            if self.modules[mod][0].split('_')[1][0] == 'R':  # Temporary solution to mirrored modules
-                mirrored = True
-            root_pos = cmds.xform(self.modules[mod][0], q=1, t=1, ws=1)
-            end_pos = cmds.xform(self.modules[mod][-1], q=1, t=1, ws=1)
-            p_vector_pos = cmds.xform(self.modules[mod][3], q=1, t=1, ws=1)
-            upper_length = (OpenMaya.MVector(cmds.xform(self.modules[mod][1], q=1, t=1, ws=1)) -
-                            OpenMaya.MVector(cmds.xform(self.modules[mod][0], q=1, t=1, ws=1))).length()
-
-            lower_length = (OpenMaya.MVector(cmds.xform(self.modules[mod][2], q=1, t=1, ws=1)) -
-                            OpenMaya.MVector(cmds.xform(self.modules[mod][1], q=1, t=1, ws=1))).length()
-
-            elbow_pos = IKFK()._get_elbow_pos(root_pos, end_pos, p_vector_pos, upper_length, lower_length)
-
-            # Still giving gimbal lock problems
-            root_dag = OpenMaya.MSelectionList().add(self.modules[mod][0]).getDagPath(0)
-            mat = OpenMaya.MFnTransform(root_dag).getPath().inclusiveMatrix()
-            up_vector = IKFK()._get_matrix_vector(mat, 'y') * 10
-
-            IKFK()._set_aim_vector(self.modules[mod][0], elbow_pos, up_vector, mirrored)
-            IKFK()._set_aim_vector(self.modules[mod][1], end_pos, p_vector_pos, mirrored)
-
-            cmds.xform(self.modules[mod][1], t=(elbow_pos.x, elbow_pos.y, elbow_pos.z), ws=True)
-
-            # Debug locator at the elbow position
-            # cmds.xform(cmds.spaceLocator()[0], t=(elbow_pos.x, elbow_pos.y, elbow_pos.z), ws=True)
-
-    def bake_fk_to_ik(self):
-        if not self.modules:
-            return
-
-        mods = self.check_selection()
-        if not mods:
-            mods = list(self.modules.keys())
-
-        for frame in range(int(self.start_frame), int(self.end_frame) + 1):
-            cmds.currentTime(frame, edit=True)
-            self.match_fk_to_ik(mods)
+def get_shapes():
+    global shapes
+    if shapes is None:
+        from MayaData.lib import templates
+        with open(os.path.join(templates.__path__[0], 'shapes.json'), 'r') as f:
+            shapes = json.loads(f.read())
+    return shapes
 
 
 class ikfkUI(QtWidgets.QDialog):
@@ -262,11 +33,14 @@ class ikfkUI(QtWidgets.QDialog):
             cls.ui_instance.raise_()
             cls.ui_instance.activateWindow()
 
-    def __init__(self, parent=maya_window()):
-        super(ikfkUI, self).__init__(parent)
+    def __init__(self, parent=None):
+        super(ikfkUI, self).__init__(parent or maya_window())
 
         self.setWindowTitle("IK FK Switch")
         self.ik_fk = IKFK()
+        self.watcher = sceneWatcher.SceneWatcher(self.scene_changed)
+        self.job = None  # Range bake in progress, advanced by bake_timer
+
         self.width = 280
         self.setMinimumWidth(self.width)
         self.setMaximumWidth(self.width + 10)
@@ -283,8 +57,25 @@ class ikfkUI(QtWidgets.QDialog):
         self.create_layouts()
         self.create_connections()
 
+    def showEvent(self, event):
+        self.watcher.start()
+        if self.show_report not in profiler.listeners:
+            profiler.listeners.append(self.show_report)
+
     def closeEvent(self, event):
+        self.cancel_bake()
+        self.watcher.stop()
+        if self.show_report in profiler.listeners:
+            profiler.listeners.remove(self.show_report)
         self.clear_all_modules()
+        self.ik_fk.index.clear()
+
+    def scene_changed(self, namespace):
+        if namespace is None:
+            self.cancel_bake()  # The modules it samples are gone
+            self.ik_fk.index.clear()
+        else:
+            self.ik_fk.index.invalidate(namespace)
 
     def create_widgets(self):
 
@@ -320,6 +111,31 @@ class ikfkUI(QtWidgets.QDialog):
         self.bake_fkik_button.setMinimumWidth((self.width - 20) / 2)
         self.bake_fkik_button.setMinimumHeight(40)
 
+        self.reduce_box = QtWidgets.QCheckBox('Reduce')
+        self.reduce_box.setChecked(self.ik_fk.reduce_keys)
+
+        self.incremental_box = QtWidgets.QCheckBox('Incremental')
+        self.incremental_box.setChecked(self.ik_fk.incremental)
+
+        self.profile_box = QtWidgets.QCheckBox('Profile')
+        self.profile_box.setChecked(profiler.enabled)
+
+        self.report_label = QtWidgets.QLabel()
+        self.report_label.setWordWrap(True)
+
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setVisible(False)
+
+        self.progress_label = QtWidgets.QLabel()
+        self.progress_label.setVisible(False)
+
+        self.cancel_button = QtWidgets.QPushButton('CANCEL')
+        self.cancel_button.setMaximumWidth(70)
+        self.cancel_button.setVisible(False)
+
+        self.bake_timer = QtCore.QTimer(self)
+        self.bake_timer.setInterval(0)  # Runs a step whenever Maya is idle
+
     def create_layouts(self):
         frame_layout = QtWidgets.QHBoxLayout()
         frame_layout.addWidget(self.start_frame_field)
@@ -338,6 +154,9 @@ class ikfkUI(QtWidgets.QDialog):
         header_layout = QtWidgets.QHBoxLayout()
 
         extra_buttons_layout = QtWidgets.QHBoxLayout()
+        extra_buttons_layout.addWidget(self.reduce_box)
+        extra_buttons_layout.addWidget(self.incremental_box)
+        extra_buttons_layout.addWidget(self.profile_box)
         extra_buttons_layout.addStretch()
         extra_buttons_layout.addWidget(self.add_button)
 
@@ -347,7 +166,14 @@ class ikfkUI(QtWidgets.QDialog):
         main_layout.addLayout(extra_buttons_layout)
         main_layout.addLayout(frame_layout)
         main_layout.addLayout(match_layout)
+        progress_layout = QtWidgets.QHBoxLayout()
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.cancel_button)
+
         main_layout.addLayout(bake_layout)
+        main_layout.addLayout(progress_layout)
+        main_layout.addWidget(self.progress_label)
+        main_layout.addWidget(self.report_label)
 
     def create_connections(self):
 
@@ -360,8 +186,14 @@ class ikfkUI(QtWidgets.QDialog):
 
         self.match_ikfk_button.clicked.connect(self.ik_fk.match_ik_to_fk)
         self.match_fkik_button.clicked.connect(self.ik_fk.match_fk_to_ik)
-        self.bake_ikfk_button.clicked.connect(self.ik_fk.bake_ik_to_fk)
-        self.bake_fkik_button.clicked.connect(self.ik_fk.bake_fk_to_ik)
+        self.bake_ikfk_button.clicked.connect(self.bake_ik_to_fk)
+        self.bake_fkik_button.clicked.connect(self.bake_fk_to_ik)
+        self.cancel_button.clicked.connect(self.cancel_bake)
+        self.bake_timer.timeout.connect(self.bake_step)
+
+        self.reduce_box.toggled.connect(self.set_reduce_keys)
+        self.incremental_box.toggled.connect(self.set_incremental)
+        self.profile_box.toggled.connect(self.set_profiling)
 
     def set_start_frame(self):
         self.ik_fk.start_frame = int(self.start_frame_field.text())
@@ -369,9 +201,86 @@ class ikfkUI(QtWidgets.QDialog):
     def set_end_frame(self):
         self.ik_fk.end_frame = int(self.end_frame_field.text())
 
+    def set_reduce_keys(self, checked):
+        self.ik_fk.reduce_keys = checked
+
+    def set_incremental(self, checked):
+        self.ik_fk.incremental = checked
+
+    @staticmethod
+    def set_profiling(checked):
+        if checked:
+            profiler.enable()
+        else:
+            profiler.disable()
+
+    def bake_ik_to_fk(self):
+        self.start_bake(bakeScheduler.IK_FOLLOWS_FK)
+
+    def bake_fk_to_ik(self):
+        self.start_bake(bakeScheduler.FK_FOLLOWS_IK)
+
+    def start_bake(self, direction):
+        if self.job is not None or not self.ik_fk.modules:
+            return
+        if self.ik_fk.use_timeline:
+            self.ik_fk.bake(direction)  # Moves the playhead, can't share Maya's idle time
+            return
+
+        self.job = bakeScheduler.BakeJob(self.ik_fk.scheduler(direction), self.ik_fk.start_frame,
+                                         self.ik_fk.end_frame, f'bake {direction}')
+        self.set_baking(True)
+        self.bake_timer.start()
+
+    def bake_step(self):
+        try:
+            running = self.job.step()
+        except Exception:
+            self.end_bake()
+            raise
+
+        if running:
+            self.show_progress()
+        else:
+            self.end_bake()
+
+    def cancel_bake(self):
+        if self.job is None:
+            return
+        self.job.cancel()
+        self.end_bake()
+        print('Bake cancelled, no keys were written')
+
+    def end_bake(self):
+        self.bake_timer.stop()
+        self.job = None
+        self.set_baking(False)
+
+    def set_baking(self, baking):
+        for button in (self.match_ikfk_button, self.match_fkik_button, self.bake_ikfk_button, self.bake_fkik_button,
+                       self.add_button):
+            button.setEnabled(not baking)
+
+        self.progress_bar.setValue(0)
+        self.progress_label.setText('')
+        for widget in (self.progress_bar, self.progress_label, self.cancel_button):
+            widget.setVisible(baking)
+
+    def show_progress(self):
+        job = self.job
+        self.progress_bar.setMaximum(max(job.total, 1))
+        self.progress_bar.setValue(job.done)
+
+        if job.done >= job.total:
+            self.progress_label.setText('Writing keys')
+        else:
+            self.progress_label.setText(f'{job.done}/{job.total} frames, {job.fps:.0f} fps, {job.eta:.1f}s left')
+
+    def show_report(self, report):
+        self.report_label.setText(profiler.summary(report))
+
     def clear_all_modules(self):
-        self.ik_fk.modules = dict()
-        self.ik_fk.selection = dict()
+        self.ik_fk.clear()
 
         self.table.clear()
         self.table.setRowCount(0)
@@ -392,50 +301,29 @@ class ikfkUI(QtWidgets.QDialog):
             if ns != ':' and ns not in namespace:
                 namespace.append(ns)
 
-        if not namespace:
-            self.add_modules()
-            return
-
-        for ns in namespace:
-            self.add_modules(ns)
-
-    def add_modules(self, namespace=None):
-        self.clear_all_modules()
-
-        for sid in self.ik_fk.side:
-            arm, leg = self.ik_fk.limb
-            if namespace:
-                arm_mods = f'{namespace}:{arm}_{sid}'
-                leg_mods = f'{namespace}:{leg}_{sid}'
-            else:
-                arm_mods = f'{arm}_{sid}'
-                leg_mods = f'{leg}_{sid}'
-
-            arm_controls = cmds.ls(f'{arm_mods}*{self.ik_fk.ctr_suffix}')
-            number_arm_mods = {int(item.partition(arm_mods)[-1].split('_')[0]) for item in arm_controls}
+        with profiler.run('add modules'), profiler.phase('refresh'):
+            self.clear_all_modules()
+            if not self.watcher.active:
+                self.ik_fk.index.clear()  # Nothing tells the index about scene changes
 
-            for n in range(len(number_arm_mods)):
-                arm_fk = [f'{arm_mods}{n}_{fk}_{self.ik_fk.ctr_suffix}' for fk in self.ik_fk.fk_mod]
-                arm_ik = [f'{arm_mods}{n}_{ik}_{self.ik_fk.ctr_suffix}' for ik in self.ik_fk.ik_mod]
-                self.insert_item(n, 0, f'{arm_mods}{n}', arm_fk + arm_ik)
+            if not namespace:
+                self.add_modules()
+                return
 
-            leg_controls = cmds.ls(f'{leg_mods}*{self.ik_fk.ctr_suffix}')
-            number_leg_mods = {int(item.partition(leg_mods)[-1].split('_')[0]) for item in leg_controls}
+            for ns in namespace:
+                self.add_modules(ns)
 
-            for n in range(len(number_leg_mods)):
-                leg_fk = [f'{leg_mods}{n}_{fk}_{self.ik_fk.ctr_suffix}' for fk in self.ik_fk.fk_mod]
-                leg_ik = [f'{leg_mods}{n}_{ik}_{self.ik_fk.ctr_suffix}' for ik in self.ik_fk.ik_mod]
-                self.insert_item(n, 0, f'{leg_mods}{n}', leg_fk + leg_ik)
+    def add_modules(self, namespace=None):
+        for module, controls in self.ik_fk.index.modules(namespace).items():
+            self.insert_item(self.table.rowCount(), 0, module, list(controls))
 
     def insert_item(self, row, column, text, module):
-        self.ik_fk.modules[text] = module
+        if not self.ik_fk.add_module(text, module):
+            return
         self.table.insertRow(row)
         item = QtWidgets.QTableWidgetItem(text)
         self.table.setItem(row, column, item)
 
-        for mod in module:
-            self.ik_fk.selection[mod] = text
-
 
 class CreateIkFK:
     def __init__(self):
@@ -445,6 +333,8 @@ class CreateIkFK:
 
     @staticmethod
     def create_ik(name):
+        import MayaData
+
         ik_shape = MayaData.curves.get_shape(f'{name}_ctl')
         ik_color = MayaData.curves.get_color(f'{name}_ctl')
         ik_pos = cmds.xform(f'{name}_ctl', q=True, m=True, ws=True)
@@ -482,6 +372,13 @@ class CreateIkFK:
             cmds.setAttr(f'{remap}.outputMax', 0)
 
     def run(self, branch='L0'):
+        with sceneGuard.SceneGuard('create ik fk'):
+            self.build(branch)
+
+    def build(self, branch):
+        from MayaData.lib import constraint
+        import MayaData
+
         # Delete global visibility attribute
         for vis_attr in ['chain_IK_vis', 'chain_FK_vis']:
             if cmds.attributeQuery(vis_attr, ex=True, n=self.global_ctr):
@@ -493,7 +390,7 @@ class CreateIkFK:
         self.create_ik(f'{ik_name}_ik2')
 
         # Creating and setting switch control
-        switch_ctr = MayaData.curves.load_shape(shapes['knot'], name=f'{name}_switch_ctl')
+        switch_ctr = MayaData.curves.load_shape(get_shapes()['knot'], name=f'{name}_switch_ctl')
         MayaData.curves.load_color(22, name=switch_ctr)  # Yellow color
 
         cmds.group(switch_ctr, n=f'{name}_switch_offset')
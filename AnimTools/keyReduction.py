@@ -0,0 +1,51 @@
+"""
+Error bounded key reduction of baked channels, no Maya dependency.
+
+Ramer-Douglas-Peucker over every channel at once: each pass interpolates linearly between the keys kept so far,
+and every segment whose worst frame is out of tolerance is split there. Written with linear tangents, the
+reduced curves stay within tolerance of every baked frame.
+"""
+import numpy as np
+
+
+def run_ends(frames):
+    """Mask of the first and last frame of every run of consecutive frames."""
+    frames = np.asarray(frames, dtype=np.float64)
+    starts = np.ones(len(frames), dtype=bool)
+    starts[1:] = np.diff(frames) != 1
+    ends = np.roll(starts, -1)
+    if len(ends):
+        ends[-1] = True
+    return starts | ends
+
+
+def reduce(values, frames, tolerance):
+    """Boolean (channels, frames) mask of the keys to keep, tolerance is a value or one per channel."""
+    values = np.asarray(values, dtype=np.float64)
+    channels, count = values.shape
+    if not count:
+        return np.zeros((channels, count), dtype=bool)
+
+    keep = np.tile(run_ends(frames), channels)
+    values = values.reshape(-1)
+    times = np.tile(np.asarray(frames, dtype=np.float64), channels)
+    limit = np.repeat(np.broadcast_to(np.asarray(tolerance, dtype=np.float64), (channels,)), count)
+    index = np.arange(len(values))
+
+    while True:
+        previous = np.maximum.accumulate(np.where(keep, index, 0))
+        following = np.minimum.accumulate(np.where(keep, index, len(values))[::-1])[::-1]
+
+        span = times[following] - times[previous]
+        weight = np.divide(times - times[previous], span, out=np.zeros_like(span), where=span > 0)
+        error = np.abs(values - (values[previous] + weight * (values[following] - values[previous])))
+        error[keep] = 0.0
+        if not np.any(error > limit):
+            break
+
+        # Worst frame of every segment, segments are named after their first key
+        order = np.lexsort((-error, previous))
+        worst = order[np.concatenate([[True], previous[order][1:] != previous[order][:-1]])]
+        keep[worst[error[worst] > limit[worst]]] = True
+
+    return keep.reshape(channels, count)
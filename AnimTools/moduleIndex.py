@@ -0,0 +1,51 @@
+"""
+Discovery of the IK/FK modules of a scene. Controls are listed once per namespace and parsed with a single
+pattern following the Limb_Side(Number)_type_Suffix convention, results are kept per namespace.
+"""
+from maya import cmds
+
+import re
+
+
+class ModuleIndex(object):
+    def __init__(self, limbs, sides, types, suffix):
+        self.limbs = list(limbs)
+        self.sides = list(sides)
+        self.types = list(types)  # Control types of a module, in the order IKFK expects them
+        self.suffix = suffix
+
+        self.pattern = re.compile(r'^(?:(?P<namespace>.+):)?(?P<limb>{})_(?P<side>{})(?P<number>\d+)_(?P<type>{})_{}$'
+                                  .format('|'.join(map(re.escape, self.limbs)), '|'.join(map(re.escape, self.sides)),
+                                          '|'.join(map(re.escape, self.types)), re.escape(suffix)))
+        self.namespaces = dict()  # namespace, '' for the root one: {module: controls}
+
+    def scan(self, namespace=None):
+        """Modules with at least one control in the namespace, sorted by side, limb then number. Gaps are kept."""
+        prefix = f'{namespace}:' if namespace else ''
+
+        found = dict()
+        for name in cmds.ls(f'{prefix}*_{self.suffix}', type='transform'):
+            match = self.pattern.match(name.split('|')[-1])
+            if not match or (match.group('namespace') or '') != (namespace or ''):
+                continue
+            limb, side, number = match.group('limb', 'side', 'number')
+            found.setdefault((self.sides.index(side), self.limbs.index(limb), int(number)),
+                             f'{prefix}{limb}_{side}{number}')
+
+        modules = dict()
+        for key in sorted(found):
+            module = found[key]
+            modules[module] = [f'{module}_{one}_{self.suffix}' for one in self.types]
+        return modules
+
+    def modules(self, namespace=None):
+        key = namespace or ''
+        if key not in self.namespaces:
+            self.namespaces[key] = self.scan(namespace)
+        return self.namespaces[key]
+
+    def invalidate(self, namespace=None):
+        self.namespaces.pop(namespace or '', None)
+
+    def clear(self):
+        self.namespaces = dict()
@@ -0,0 +1,148 @@
+"""
+Execution backends for the IK/FK range solve.
+
+Sampled matrices are copied once into shared memory, module/frame blocks are solved by a process pool
+and written straight into a shared output buffer. Small batches, or Pythons without shared memory,
+use the serial backend. Workers only import ikfkSolver, never Maya.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import atexit
+import sys
+import os
+
+import numpy
+
+from AnimTools import ikfkSolver
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python 3.7, Maya 2022 and earlier
+    shared_memory = None
+
+SHARED_KEYS = ('world', 'parent_inverse')
+MIN_PARALLEL_SIZE = 20000  # modules * frames, below this spawning processes costs more than it saves
+BLOCK_FRAMES = 500
+
+_executor = None
+_executor_workers = 0
+
+
+def context():
+    """Spawn context of worker processes, also used by the scene file batches."""
+    spawn = multiprocessing.get_context('spawn')
+
+    # Inside an interactive session sys.executable is Maya itself, workers have to run in mayapy
+    executable = os.path.basename(sys.executable).lower()
+    if executable.startswith('maya') and not executable.startswith('mayapy') and 'MAYA_LOCATION' in os.environ:
+        mayapy = 'mayapy.exe' if os.name == 'nt' else 'mayapy'
+        spawn.set_executable(os.path.join(os.environ['MAYA_LOCATION'], 'bin', mayapy))
+    return spawn
+
+
+def executor(workers):
+    global _executor, _executor_workers
+
+    if _executor is None or _executor_workers != workers:
+        shutdown()
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=context())
+        _executor_workers = workers
+    return _executor
+
+
+def shutdown():
+    global _executor, _executor_workers
+
+    if _executor is not None:
+        _executor.shutdown()
+    _executor = None
+    _executor_workers = 0
+
+
+atexit.register(shutdown)
+
+
+def default_workers():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def blocks(modules, frames, workers, block_frames=BLOCK_FRAMES):
+    """Split the modules x frames grid in roughly even (module slice, frame slice) blocks."""
+    module_step = max(1, modules // workers)
+    frame_step = max(1, min(block_frames, frames))
+    return [(slice(m, min(m + module_step, modules)), slice(f, min(f + frame_step, frames)))
+            for m in range(0, modules, module_step) for f in range(0, frames, frame_step)]
+
+
+def _attach(name, shape):
+    memory = shared_memory.SharedMemory(name=name)
+    return memory, numpy.ndarray(shape, dtype=numpy.float64, buffer=memory.buf)
+
+
+def _solve_block(direction, shared, constants, output, module_slice, frame_slice):
+    memories = list()
+    try:
+        block = dict()
+        for key, (name, shape) in shared.items():
+            memory, array = _attach(name, shape)
+            memories.append(memory)
+            block[key] = array[module_slice, :, frame_slice].copy()
+        for key, value in constants.items():
+            block[key] = value[module_slice]
+
+        solved = ikfkSolver.bake(block, direction)
+
+        memory, result = _attach(*output)
+        memories.append(memory)
+        for c, channel in enumerate(ikfkSolver.BAKE_CHANNELS[direction]):
+            result[c, module_slice, frame_slice] = solved[channel]
+    finally:
+        # Views have to be released before their shared memory can be closed
+        array = result = None
+        for memory in memories:
+            memory.close()
+
+
+def _share(array, memories):
+    memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    memories.append(memory)
+    shared = numpy.ndarray(array.shape, dtype=numpy.float64, buffer=memory.buf)
+    shared[...] = array
+    return memory.name, array.shape
+
+
+def solve_parallel(sampled, direction, workers):
+    modules, frames = sampled['world'].shape[0], sampled['world'].shape[2]
+    channels = ikfkSolver.BAKE_CHANNELS[direction]
+
+    memories = list()
+    try:
+        shared = {key: _share(numpy.ascontiguousarray(sampled[key], dtype=numpy.float64), memories)
+                  for key in SHARED_KEYS}
+        constants = {key: value for key, value in sampled.items() if key not in SHARED_KEYS}
+        output = _share(numpy.zeros((len(channels), modules, frames, 3)), memories)
+
+        pool = executor(workers)
+        futures = [pool.submit(_solve_block, direction, shared, constants, output, module_slice, frame_slice)
+                   for module_slice, frame_slice in blocks(modules, frames, workers)]
+        for future in futures:
+            future.result()
+
+        result = numpy.ndarray(output[1], dtype=numpy.float64, buffer=memories[-1].buf).copy()
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+    return {channel: result[c] for c, channel in enumerate(channels)}
+
+
+def solve(sampled, direction, workers=1):
+    """Solve sampled modules in the given direction, on a process pool when workers > 1 and it is worth it."""
+    modules, frames = sampled['world'].shape[0], sampled['world'].shape[2]
+
+    if workers is None:
+        workers = default_workers()
+    if workers < 2 or shared_memory is None or modules * frames < MIN_PARALLEL_SIZE:
+        return ikfkSolver.bake(sampled, direction)
+    return solve_parallel(sampled, direction, workers)
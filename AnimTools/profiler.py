@@ -0,0 +1,218 @@
+"""
+Opt-in profiling of AnimTools operations. While enabled, every operation (bake, export, selection...) times its
+phases, counts the cmds/OpenMaya calls made by AnimTools and records the frames it processed. Each run prints a
+summary line and is appended to a JSON report. Disabled, an operation only pays one flag check.
+
+    from AnimTools import profiler
+    profiler.enable()
+"""
+from collections import deque
+import tempfile
+import time
+import json
+import sys
+import os
+
+INSTRUMENTED = ('AnimTools.ikfk', 'AnimTools.ikfkSwitch', 'AnimTools.ikfkCache', 'AnimTools.dgSampler',
+                'AnimTools.animKeys', 'AnimTools.undoCommand', 'AnimTools.bakeScheduler', 'AnimTools.Exporter',
+                'AnimTools.SelectionHelper', 'AnimTools.selectionResolver', 'AnimTools.sceneGuard')
+COUNTED_MODULES = ('cmds', 'mel', 'OpenMaya')
+
+enabled = False
+report_file = os.path.join(tempfile.gettempdir(), 'AnimToolsProfile.json')
+reports = deque(maxlen=50)
+listeners = list()  # Called with every finished report, the ikfkUI dialog shows them
+active = None
+
+
+def enable(file_path=None):
+    global enabled, report_file
+    enabled = True
+    if file_path:
+        report_file = file_path
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+class _Null(object):
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *args):
+        return False
+
+    def resume(self):
+        pass
+
+    def pause(self):
+        pass
+
+
+NULL = _Null()
+
+
+class _Counted(object):
+    """Stands in for cmds, mel or OpenMaya in the instrumented modules and counts what gets called."""
+    def __init__(self, target, prefix, run):
+        self._target = target
+        self._prefix = prefix
+        self._run = run
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if isinstance(value, type):
+            return _CountedClass(value, f'{self._prefix}.{name}', self._run)
+        if not callable(value):
+            return value
+
+        key = f'{self._prefix}.{name}'
+        calls = self._run.calls
+
+        def counted(*args, **kwargs):
+            calls[key] = calls.get(key, 0) + 1
+            return value(*args, **kwargs)
+        return counted
+
+
+class _CountedClass(_Counted):
+    def __call__(self, *args, **kwargs):
+        calls = self._run.calls
+        calls[self._prefix] = calls.get(self._prefix, 0) + 1
+        return self._target(*args, **kwargs)
+
+    def __instancecheck__(self, instance):
+        return isinstance(instance, self._target)
+
+
+class Phase(object):
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        phases = self.run.phases
+        phases[self.name] = phases.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class Run(object):
+    def __init__(self, operation):
+        self.operation = operation
+        self.phases = dict()
+        self.calls = dict()
+        self.frames = 0
+        self.start = 0.0
+        self.seconds = 0.0
+        self.swapped = list()
+
+    def __enter__(self):
+        self.resume()
+        return self
+
+    def __exit__(self, exc_type, *args):
+        self.pause()
+        finish(self.report(failed=exc_type is not None))
+        return False
+
+    def resume(self):
+        """Make the run active again, a run spread over several calls is paused in between."""
+        global active
+        active = self
+        self.instrument()
+        self.start = time.perf_counter()
+
+    def pause(self):
+        """Stop timing and counting until resumed, while paused other operations profile on their own."""
+        global active
+        if active is not self:
+            return
+        self.seconds += time.perf_counter() - self.start
+        self.restore()
+        active = None
+
+    def instrument(self):
+        for module_name in INSTRUMENTED:
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            for name in COUNTED_MODULES:
+                target = module.__dict__.get(name)
+                if target is not None and not isinstance(target, _Counted):
+                    prefix = 'OpenMaya' if name == 'OpenMaya' else name
+                    setattr(module, name, _Counted(target, prefix, self))
+                    self.swapped.append((module, name, target))
+
+    def restore(self):
+        for module, name, target in self.swapped:
+            setattr(module, name, target)
+        self.swapped = list()
+
+    def report(self, failed=False):
+        return {
+            'operation': self.operation,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'seconds': self.seconds,
+            'frames': self.frames,
+            'fps': self.frames / self.seconds if self.frames and self.seconds else None,
+            'phases': self.phases,
+            'api_calls': sum(self.calls.values()),
+            'calls': dict(sorted(self.calls.items(), key=lambda item: item[1], reverse=True)),
+            'failed': failed,
+        }
+
+
+def run(operation):
+    """Profile an operation, nested operations are folded into the outer one."""
+    if not enabled or active is not None:
+        return NULL
+    return Run(operation)
+
+
+def phase(name):
+    if active is None:
+        return NULL
+    return Phase(active, name)
+
+
+def count(name, amount=1):
+    if active is not None:
+        active.calls[name] = active.calls.get(name, 0) + amount
+
+
+def frames(amount):
+    if active is not None:
+        active.frames += amount
+
+
+def summary(report):
+    line = f"AnimTools {report['operation']}: {report['seconds']:.3f}s"
+    if report['frames']:
+        line += f", {report['frames']} frames ({report['fps']:.1f} fps)"
+    line += f", {report['api_calls']} API calls"
+    if report['phases']:
+        line += ' | ' + ', '.join(f'{name} {seconds:.3f}s' for name, seconds in report['phases'].items())
+    if report['failed']:
+        line += ' | failed'
+    return line
+
+
+def finish(report):
+    reports.append(report)
+    print(summary(report))
+
+    try:
+        with open(report_file, 'w') as f:
+            f.write(json.dumps(list(reports), indent=4))
+    except OSError as error:
+        print(f'Could not write profile report to {report_file}: {error}')
+
+    for listener in listeners:
+        listener(report)
@@ -1,17 +1,20 @@
-from maya import cmds
-from maya import OpenMayaUI
-
-version = int(cmds.about(version=True))
-
-if version <= 2024:
-    from PySide2 import QtWidgets, QtCore, QtGui
-    from shiboken2 import wrapInstance
-    # Launching MayaData 2024 and earlier
-else:
-    from PySide6 import QtWidgets, QtCore, QtGui
-    from shiboken6 import wrapInstance
-    # Launching MayaData 2025 and later
-
-def maya_window():
-    ptr = OpenMayaUI.MQtUtil.mainWindow()
-    return wrapInstance(int(ptr), QtWidgets.QWidget)
+from maya.api import OpenMaya
+from maya import OpenMayaUI
+
+import sys
+
+# The binding Maya already loaded decides, else its API version. Asking for the version with a command costs more at
+# import time, and a pip installed PySide6 must not be loaded next to the PySide2 of Maya 2024 and earlier
+if 'PySide6' in sys.modules or ('PySide2' not in sys.modules and OpenMaya.MGlobal.apiVersion() >= 20250000):
+    from PySide6 import QtWidgets, QtCore, QtGui
+    from shiboken6 import wrapInstance
+    # Launching MayaData 2025 and later
+else:
+    from PySide2 import QtWidgets, QtCore, QtGui
+    from shiboken2 import wrapInstance
+    # Launching MayaData 2024 and earlier
+
+
+def maya_window():
+    ptr = OpenMayaUI.MQtUtil.mainWindow()
+    return wrapInstance(int(ptr), QtWidgets.QWidget)
@@ -0,0 +1,10 @@
+"""
+Console reports shared by the tools, no Maya dependency.
+"""
+SHOWN = 5  # Names listed in a report, the rest are counted
+
+
+def names(items, shown=SHOWN):
+    """The first names of a list followed by how many more there are: 'a, b, c, d, e and 12 more'."""
+    listed = ', '.join(items[:shown])
+    return f'{listed} and {len(items) - shown} more' if len(items) > shown else listed
@@ -0,0 +1,158 @@
+"""
+Scene state for bulk operations. SceneGuard suspends viewport refresh, pauses Viewport 2.0, switches the
+evaluation manager mode when configured and wraps the operation in one undo chunk, then puts everything back as it
+was, also when the operation fails. Guards nest, only the outermost one changes anything.
+
+Every run adds its time per frame to stats_file under the settings it ran with, disabling the guard for a few
+runs gives the baseline saved() and report() compare against. Defaults can be tuned per show:
+
+    from AnimTools import sceneGuard
+    sceneGuard.settings['evaluation'] = 'parallel'
+    print(sceneGuard.report())
+"""
+from maya import cmds
+
+import tempfile
+import time
+import json
+import os
+
+UNGUARDED = 'unguarded'
+
+settings = {
+    'enabled': True,
+    'suspend_refresh': True,
+    'pause_viewport': True,
+    'evaluation': None,  # 'parallel', 'serial' or 'off' (DG only), None keeps the user's mode
+    'undo_chunk': True,
+}
+stats_file = os.path.join(tempfile.gettempdir(), 'AnimToolsSceneGuard.json')
+stats = None  # operation: {configuration: [runs, seconds, frames]}, read from stats_file when first needed
+active = None
+
+
+def configuration():
+    """Name of the current settings, runs are compared by it."""
+    if not settings['enabled']:
+        return UNGUARDED
+    parts = [name for name in ('suspend_refresh', 'pause_viewport', 'undo_chunk') if settings[name]]
+    if settings['evaluation']:
+        parts.append(f"evaluation={settings['evaluation']}")
+    return ','.join(parts) or UNGUARDED
+
+
+def load_stats():
+    global stats
+    if stats is None:
+        try:
+            with open(stats_file, 'r') as f:
+                stats = json.loads(f.read())
+        except (OSError, ValueError):
+            stats = dict()
+    return stats
+
+
+def record(operation, seconds, frames):
+    entry = load_stats().setdefault(operation, dict()).setdefault(configuration(), [0, 0.0, 0])
+    entry[0] += 1
+    entry[1] += seconds
+    entry[2] += max(frames, 1)  # Operations without frames count as one
+
+    try:
+        with open(stats_file, 'w') as f:
+            f.write(json.dumps(stats, indent=4))
+    except OSError as error:
+        print(f'Could not write scene guard stats to {stats_file}: {error}')
+
+
+def seconds_per_frame(operation, config=None):
+    entry = load_stats().get(operation, dict()).get(config or configuration())
+    if not entry or not entry[2]:
+        return None
+    return entry[1] / entry[2]
+
+
+def saved(operation, frames=1, config=None):
+    """Seconds a configuration saves on that many frames of an operation, None until it was also timed unguarded."""
+    guarded = seconds_per_frame(operation, config)
+    unguarded = seconds_per_frame(operation, UNGUARDED)
+    if guarded is None or unguarded is None:
+        return None
+    return (unguarded - guarded) * frames
+
+
+def report():
+    lines = list()
+    for operation, configs in sorted(load_stats().items()):
+        for config, (runs, seconds, frames) in configs.items():
+            line = f'{operation} [{config}]: {seconds / frames * 1000.0:.2f} ms/frame over {runs} runs'
+            saving = saved(operation, frames, config) if config != UNGUARDED else None
+            if saving is not None:
+                line += f', saved {saving:.2f}s'
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+class SceneGuard(object):
+    def __init__(self, operation, frames=0):
+        self.operation = operation
+        self.frames = frames  # Processed by the operation, can be set once known
+        self.outer = False
+        self.undo = list()  # Restores what the guard changed, in reverse order
+        self.start = 0.0
+
+    def __enter__(self):
+        global active
+        if active is not None:
+            return self
+
+        active = self
+        self.outer = True
+        self.start = time.perf_counter()
+        if settings['enabled']:
+            try:
+                self.apply()
+            except Exception:
+                self.restore()
+                active = None
+                raise
+        return self
+
+    def __exit__(self, exc_type, *args):
+        global active
+        if not self.outer:
+            return False
+
+        self.restore()
+        active = None
+        if exc_type is None:
+            record(self.operation, time.perf_counter() - self.start, self.frames)
+        return False
+
+    def apply(self):
+        interactive = not cmds.about(batch=True)
+
+        if settings['undo_chunk']:
+            cmds.undoInfo(openChunk=True, chunkName=f'AnimTools {self.operation}')
+            self.undo.append(lambda: cmds.undoInfo(closeChunk=True))
+
+        if settings['suspend_refresh'] and interactive and not cmds.refresh(q=True, suspend=True):
+            cmds.refresh(suspend=True)
+            self.undo.append(lambda: cmds.refresh(suspend=False))
+
+        if settings['pause_viewport'] and interactive and not cmds.ogs(q=True, pause=True):
+            cmds.ogs(pause=True)  # Toggles
+            self.undo.append(lambda: cmds.ogs(pause=True))
+
+        mode = settings['evaluation']
+        previous = (cmds.evaluationManager(q=True, mode=True) or [None])[0] if mode else None
+        if mode and previous and previous != mode:
+            cmds.evaluationManager(mode=mode)
+            self.undo.append(lambda: cmds.evaluationManager(mode=previous))
+
+    def restore(self):
+        while self.undo:
+            try:
+                self.undo.pop()()
+            except RuntimeError as error:
+                print(f'Could not restore scene state after {self.operation}: {error}')
@@ -0,0 +1,57 @@
+"""
+Scene callbacks telling the tools which namespace changed, so cached data is dropped for that namespace only.
+Transforms added, removed, renamed or reparented report their namespace ('' for the root one), opening or clearing
+the scene reports None. Referencing, unloading or renaming a namespace arrives as the add, remove and rename of its
+nodes.
+"""
+from maya.api import OpenMaya
+
+SCENE_EVENTS = ('kAfterOpen', 'kAfterNew', 'kAfterImport')
+
+
+def namespace_of(name):
+    return name.split('|')[-1].rpartition(':')[0]
+
+
+class SceneWatcher(object):
+    def __init__(self, listener):
+        self.listener = listener  # Called with the namespace that changed, None for the whole scene
+        self.callbacks = list()
+
+    @property
+    def active(self):
+        return bool(self.callbacks)
+
+    def start(self):
+        if self.callbacks:
+            return
+        self.callbacks.append(OpenMaya.MDGMessage.addNodeAddedCallback(self._node_changed, 'transform'))
+        self.callbacks.append(OpenMaya.MDGMessage.addNodeRemovedCallback(self._node_changed, 'transform'))
+        self.callbacks.append(OpenMaya.MNodeMessage.addNameChangedCallback(OpenMaya.MObject.kNullObj,
+                                                                           self._renamed))
+        self.callbacks.append(OpenMaya.MDagMessage.addParentAddedCallback(self._reparented))
+        for event in SCENE_EVENTS:
+            self.callbacks.append(OpenMaya.MSceneMessage.addCallback(getattr(OpenMaya.MSceneMessage, event),
+                                                                     self._scene_changed))
+
+    def stop(self):
+        for callback in self.callbacks:
+            OpenMaya.MMessage.removeCallback(callback)
+        self.callbacks = list()
+
+    def _node_changed(self, node, *args):
+        self.listener(namespace_of(OpenMaya.MFnDependencyNode(node).name()))
+
+    def _renamed(self, node, previous_name, *args):
+        if not node.hasFn(OpenMaya.MFn.kTransform):
+            return
+        namespace = namespace_of(OpenMaya.MFnDependencyNode(node).name())
+        self.listener(namespace)
+        if previous_name and namespace_of(previous_name) != namespace:
+            self.listener(namespace_of(previous_name))
+
+    def _reparented(self, child, parent, *args):
+        self.listener(namespace_of(child.partialPathName()))
+
+    def _scene_changed(self, *args):
+        self.listener(None)
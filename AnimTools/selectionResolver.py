@@ -0,0 +1,80 @@
+"""
+Turns the stored Selection Helper sets into MSelectionLists. The members of a set are looked up once per
+namespace and the resulting list is kept with the MObjectHandles of its nodes, selecting the set again hands the
+same list to Maya's select command without any name lookup, so it still undoes. Members missing from the scene are
+skipped and reported instead of failing the whole selection.
+
+Cached lists are trusted while a scene watcher runs: SelectUI forgets the namespaces it reports as changed, so
+deleted, new, renamed or reparented nodes are looked up again, and forgets everything once its watcher stops.
+Without one, pass check to test every handle and DAG path before use.
+"""
+from maya.api import OpenMaya
+
+from AnimTools import report
+
+
+class Resolved(object):
+    """One set's members looked up in one namespace."""
+    def __init__(self, members, namespace):
+        self.members = members  # The store's list, a set saved again gets a new one
+        self.selection = OpenMaya.MSelectionList()
+        self.missing = list()
+
+        for member in members:
+            name = f'{namespace}:{member}' if namespace else member
+            try:
+                self.selection.add(name)
+            except RuntimeError:
+                self.missing.append(name)
+
+        self.handles = list()
+        self.paths = list()  # Full path of the DAG members, None for the others
+        for i in range(self.selection.length()):
+            node = self.selection.getDependNode(i)
+            self.handles.append(OpenMaya.MObjectHandle(node))
+            self.paths.append(OpenMaya.MFnDagNode(node).fullPathName() if node.hasFn(OpenMaya.MFn.kDagNode) else None)
+
+    def is_valid(self, members, check=False):
+        if members is not self.members:
+            return False
+        return not check or all(handle.isValid() and (path is None or
+                                                      OpenMaya.MFnDagNode(handle.object()).fullPathName() == path)
+                                for handle, path in zip(self.handles, self.paths))
+
+
+class SelectionResolver(object):
+    def __init__(self):
+        self.cache = dict()  # (set name, namespace): Resolved
+
+    def resolve(self, name, members, namespaces, check=False):
+        """MSelectionList of the members of a set in every namespace, '' for the root one, and the missing names."""
+        lists, missing = list(), list()
+        for namespace in namespaces:
+            resolved = self.cache.get((name, namespace))
+            if resolved is None or not resolved.is_valid(members, check):
+                resolved = self.cache[(name, namespace)] = Resolved(members, namespace)
+            lists.append(resolved.selection)
+            missing += resolved.missing
+
+        if len(lists) == 1:
+            return lists[0], missing
+        selection = OpenMaya.MSelectionList()
+        for one in lists:
+            selection.merge(one)
+        return selection, missing
+
+    def select(self, name, members, namespaces, check=False):
+        """Replace the active selection with the set in every namespace, returns the missing members."""
+        selection, missing = self.resolve(name, members, namespaces, check)
+        OpenMaya.MGlobal.selectCommand(selection, OpenMaya.MGlobal.kReplaceList)
+
+        if missing:
+            print(f'{name}: {len(missing)} members not found, {report.names(missing)}')
+        return missing
+
+    def forget(self, namespace=None):
+        """Drop what was resolved in a namespace, in every one with None."""
+        if namespace is None:
+            self.cache = dict()
+            return
+        self.cache = {key: resolved for key, resolved in self.cache.items() if key[1] != namespace}
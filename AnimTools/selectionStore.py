@@ -0,0 +1,141 @@
+"""
+Storage of the Selection Helper sets, made for big files on shared drives. The sets live in a JSON snapshot,
+{name: [members]}, and every change is appended to a log next to it as one JSON line, so saving a set writes that
+set only. Changes are buffered until flush(), the UI flushes them in batches. Once the log outgrows COMPACT_LINES
+it is folded into the snapshot: the log is moved aside, so other sessions keep appending to a new one, and the
+snapshot is written to a temporary file swapped in with an atomic replace. A lock file keeps two sessions from
+compacting at once.
+
+Reading replays the log over the snapshot, reload() only does it again when either file changed on disk.
+"""
+from AnimTools import fileLock
+
+import json
+import os
+
+COMPACT_LINES = 500
+
+class SelectionStore(object):
+    def __init__(self, path):
+        self.path = path
+        self.log_path = f'{path}.log'
+        self.compacting_path = f'{path}.log.compacting'
+        self.lock_path = f'{path}.lock'
+        self.data = dict()
+        self.pending = list()
+        self.log_lines = 0
+        self.state = None
+
+    def read(self):
+        data = dict()
+        try:
+            with open(self.path, 'r') as f:
+                content = f.read().strip()
+            if content:
+                data = json.loads(content)
+        except (OSError, ValueError) as error:
+            if os.path.exists(self.path):
+                print(f'Could not read selections from {self.path}: {error}')
+
+        lines = 0
+        for log_path in (self.compacting_path, self.log_path):  # A log being compacted is older than the current one
+            try:
+                with open(log_path, 'r') as f:
+                    for line in f:
+                        try:
+                            change = json.loads(line)
+                        except ValueError:
+                            continue  # Line cut short by a crash or a write still going on
+                        self.apply(data, change)
+                        lines += 1
+            except OSError:
+                pass
+        return data, lines
+
+    @staticmethod
+    def apply(data, change):
+        if 'delete' in change:
+            data.pop(change['delete'], None)
+        else:
+            data[change['set']] = change['selection']
+
+    def disk_state(self):
+        return fileLock.file_state(self.path), fileLock.file_state(self.log_path)
+
+    def reload(self):
+        """Read the sets again if the files changed since, returns True when they did."""
+        state = self.disk_state()
+        if state == self.state:
+            return False
+        self.data, self.log_lines = self.read()
+        for change in self.pending:  # Not flushed yet, still ahead of the files
+            self.apply(self.data, change)
+        self.state = state
+        return True
+
+    def set(self, name, selection):
+        self.change({'set': name, 'selection': list(selection)})
+
+    def delete(self, name):
+        self.change({'delete': name})
+
+    def rename(self, name, new_name):
+        self.set(new_name, self.data[name])
+        self.delete(name)
+
+    def change(self, change):
+        self.apply(self.data, change)
+        self.pending.append(change)
+
+    def flush(self):
+        """Append the buffered changes to the log in one write, compact it when it got long."""
+        if not self.pending:
+            return
+        reloaded = self.state is not None and self.disk_state() != self.state  # Another session wrote meanwhile
+        lines = ''.join(json.dumps(change) + '\n' for change in self.pending).encode('utf-8')
+        try:
+            with open(self.log_path, 'ab+') as f:
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':  # Cut short by a crash, don't glue the next change to it
+                        lines = b'\n' + lines
+                f.write(lines)
+        except OSError as error:
+            print(f'Could not save selections to {self.log_path}: {error}')
+            return
+
+        self.log_lines += len(self.pending)
+        self.pending = list()
+        if reloaded:
+            self.state = None
+            self.reload()
+        else:
+            self.state = self.disk_state()
+
+        if self.log_lines > COMPACT_LINES:
+            self.compact()
+
+    def compact(self):
+        """Fold the log into the snapshot, skipped while another session holds the lock."""
+        lock = fileLock.acquire(self.lock_path, wait=False)
+        if lock is None:
+            return
+
+        try:
+            if not os.path.exists(self.compacting_path):  # Else left by a crashed compaction, fold that one first
+                os.replace(self.log_path, self.compacting_path)
+            data = self.read()[0]
+            temp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp_path, 'w') as f:
+                f.write(json.dumps(data))
+            os.replace(temp_path, self.path)
+            os.remove(self.compacting_path)
+
+            self.data, self.log_lines = self.read()
+            for change in self.pending:
+                self.apply(self.data, change)
+            self.state = self.disk_state()
+        except OSError as error:
+            print(f'Could not compact selections in {self.path}: {error}')
+        finally:
+            fileLock.release(self.lock_path, lock)
@@ -0,0 +1,105 @@
+"""
+Keys a copy of a skeleton straight from the world matrices of the original, in place of one constraint per joint.
+Source joints are sampled CHUNK_FRAMES frames at a time under a DG context, each chunk is turned into the copy's
+local matrices with NumPy, handed to on_chunk (animation caches stream from it) and split into translate, rotate and
+scale. Every channel is then written with one addKeys call, reduced to the keys needed within tolerance if asked.
+"""
+from maya.api import OpenMaya
+
+from AnimTools import ikfkSolver, dgSampler, animKeys, undoCommand, profiler
+
+import numpy
+
+CHANNELS = ('translate', 'rotate', 'scale')
+CHUNK_FRAMES = 500
+
+
+def joint_nodes(names):
+    selection = OpenMaya.MSelectionList()
+    for name in names:
+        selection.add(name)
+    return [selection.getDependNode(i) for i in range(len(names))]
+
+
+def parent_indices(nodes):
+    """Index of every node's parent among the nodes, None for the top ones."""
+    paths = [OpenMaya.MFnDagNode(node).fullPathName() for node in nodes]
+    index = {path: i for i, path in enumerate(paths)}
+    return [index.get(path.rpartition('|')[0]) for path in paths]
+
+
+def joint_data(nodes):
+    """(nodes, 3) joint orients and rotate axes in radians, and the rotate orders. Transforms have no orient."""
+    orients, axes, orders = list(), list(), list()
+    for node in nodes:
+        fn_node = OpenMaya.MFnDependencyNode(node)
+        orient = [f'jointOrient{axis}' for axis in 'XYZ'] if fn_node.hasAttribute('jointOrientX') else list()
+        orients.append([fn_node.findPlug(attr, False).asDouble() for attr in orient] or [0.0] * 3)
+        axes.append([fn_node.findPlug(f'rotateAxis{axis}', False).asDouble() for axis in 'XYZ'])
+        orders.append(fn_node.findPlug('rotateOrder', False).asInt())
+    return numpy.array(orients), numpy.array(axes), numpy.array(orders)
+
+
+def sample(sources, targets, frames, on_chunk=None):
+    """
+    Channels keying the targets to match the sources in world space on every frame, both are node names in the same
+    order. Targets form a hierarchy of their own, its top nodes sit under the world. on_chunk(frames, local) is
+    called with the (targets, frames, 4, 4) local matrices of every chunk as it is sampled. Returns the target nodes
+    and their (targets, frames, 3) translate, rotate and scale.
+    """
+    source_nodes, target_nodes = joint_nodes(sources), joint_nodes(targets)
+    plugs = [dgSampler.matrix_plug(node) for node in source_nodes]
+    parents = parent_indices(target_nodes)
+    orients, axes, orders = joint_data(target_nodes)
+    channels = list()
+
+    for start in range(0, len(frames), CHUNK_FRAMES):
+        chunk = frames[start:start + CHUNK_FRAMES]
+        with profiler.phase('sample'):
+            world = dgSampler.sample_matrices(plugs, chunk)
+
+        with profiler.phase('solve'):
+            parent_world = numpy.broadcast_to(numpy.eye(4), world.shape).copy()
+            for j, parent in enumerate(parents):
+                if parent is not None:
+                    parent_world[j] = world[parent]
+
+            local = world @ numpy.linalg.inv(parent_world)
+            channels.append(ikfkSolver.joint_channels(local, orients[:, None], axes[:, None], orders[:, None]))
+
+        if on_chunk:
+            on_chunk(chunk, local)
+
+    if not channels:  # No frame to sample
+        return target_nodes, tuple(numpy.zeros((len(target_nodes), 0, 3)) for _ in CHANNELS)
+
+    with profiler.phase('solve'):
+        translate, rotate, scale = (numpy.concatenate(values, axis=1) for values in zip(*channels))
+        rotate = ikfkSolver.unroll_euler(rotate, orders)
+    return target_nodes, (translate, rotate, scale)
+
+
+def key(target_nodes, frames, channels, tolerances=None):
+    """
+    Key the sampled channels on the target nodes over the frames. With tolerances, (centimeters, radians), only the
+    keys needed to stay within them are written. Returns the AnimCurveWriter.
+    """
+    writer = animKeys.AnimCurveWriter(frames)
+    for j, node in enumerate(target_nodes):
+        fn_node = OpenMaya.MFnDependencyNode(node)
+        for attr, values in zip(CHANNELS, channels):
+            for axis, channel in enumerate('XYZ'):
+                writer.add(fn_node.findPlug(f'{attr}{channel}', False), values[j, :, axis])
+
+    if tolerances:
+        with profiler.phase('reduce'):
+            writer.reduce(*tolerances)
+    with profiler.phase('key write'):
+        undoCommand.run(writer)
+    return writer
+
+
+def bake(sources, targets, frames, on_chunk=None, tolerances=None):
+    """Sample and key the targets in one go, see sample and key. Returns the AnimCurveWriter."""
+    target_nodes, channels = sample(sources, targets, frames, on_chunk)
+    return key(target_nodes, frames, channels, tolerances)
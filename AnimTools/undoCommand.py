@@ -0,0 +1,61 @@
+"""
+Maya command putting API edits (MDGModifier, MAnimCurveChange...) on the undo queue as a single entry.
+This file is loaded as a plugin by run(), the operation is handed over through the AnimTools module.
+"""
+from maya.api import OpenMaya
+from maya import cmds
+
+import sys
+import os
+
+COMMAND_NAME = 'animToolsUndoable'
+pending = list()
+
+
+def maya_useNewAPI():
+    pass
+
+
+class UndoableCommand(OpenMaya.MPxCommand):
+    def __init__(self):
+        super(UndoableCommand, self).__init__()
+        self.operation = None
+
+    @staticmethod
+    def creator():
+        return UndoableCommand()
+
+    def doIt(self, args):
+        self.operation = sys.modules['AnimTools.undoCommand'].pending.pop()
+        self.operation.doIt()
+
+    def redoIt(self):
+        self.operation.redoIt()
+
+    def undoIt(self):
+        self.operation.undoIt()
+
+    def isUndoable(self):
+        return True
+
+
+def initializePlugin(plugin):
+    OpenMaya.MFnPlugin(plugin).registerCommand(COMMAND_NAME, UndoableCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    OpenMaya.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
+
+
+def run(operation):
+    """Execute an object with doIt, redoIt and undoIt methods as one undoable Maya command."""
+    plugin_name = os.path.splitext(os.path.basename(__file__))[0]
+    if not cmds.pluginInfo(plugin_name, q=True, loaded=True):
+        cmds.loadPlugin(os.path.splitext(__file__)[0] + '.py', quiet=True)
+
+    pending.append(operation)
+    try:
+        getattr(cmds, COMMAND_NAME)()
+    finally:
+        del pending[:]
+    return operation
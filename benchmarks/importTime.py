@@ -0,0 +1,107 @@
+"""
+Import time of AnimTools against the Maya stand-in in mayaStub, each module in a fresh interpreter.
+
+    python benchmarks/importTime.py
+    python benchmarks/importTime.py --json imports.json
+    python benchmarks/importTime.py --baseline imports.json --time-tolerance 0.5
+
+Every Maya session runs the startup imports (userSetup and the AnimTools package), they must not pull in Qt,
+MayaData or numpy. The run exits with 1 when one does, or with --baseline when a module imports slower than the
+tolerance allows.
+"""
+import subprocess
+import argparse
+import json
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP = ('userSetup', 'AnimTools')
+MODULES = STARTUP + ('AnimTools.ikfkSwitch', 'AnimTools.SelectionHelper', 'AnimTools.ikfkBatch',
+                     'AnimTools.exportBatch')
+HEAVY = ('PySide2', 'PySide6', 'shiboken2', 'shiboken6', 'MayaData', 'numpy')
+
+CHILD = '''
+import importlib, builtins, json, time, sys
+sys.path[:0] = {paths!r}
+import mayaStub
+mayaStub.install()
+
+imported = set()
+original = builtins.__import__
+
+
+def record(name, *args, **kwargs):
+    imported.add(name.partition('.')[0])
+    return original(name, *args, **kwargs)
+
+
+builtins.__import__ = record
+start = time.perf_counter()
+importlib.import_module({module!r})
+seconds = time.perf_counter() - start
+builtins.__import__ = original
+print(json.dumps({{'seconds': seconds, 'heavy': sorted(imported.intersection({heavy!r}))}}))
+'''
+
+
+def time_import(module, repeat):
+    """Fastest import time of a module over repeat fresh interpreters, and the heavy modules it imported."""
+    code = CHILD.format(paths=[ROOT, os.path.join(ROOT, 'benchmarks')], module=module, heavy=HEAVY)
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=ROOT)
+        if output.returncode:
+            raise RuntimeError(f'Importing {module} failed:\n{output.stderr}')
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return dict(best, module=module, startup=module in STARTUP)
+
+
+def compare(results, baseline, time_tolerance):
+    regressions = list()
+    previous = {one['module']: one for one in baseline['results']}
+    for result in results:
+        old = previous.get(result['module'])
+        if old and result['seconds'] > old['seconds'] * (1.0 + time_tolerance):
+            regressions.append(f"{result['module']}: {result['seconds'] * 1000:.1f}ms "
+                               f"(baseline {old['seconds'] * 1000:.1f}ms)")
+    return regressions
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-m', '--module', action='append', dest='modules', help='Module to time, all by default')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Keep the fastest of n imports')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Results file to compare against')
+    parser.add_argument('--time-tolerance', type=float, default=0.5, help='Allowed import time increase')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = parse_args(args)
+
+    results, failures = list(), list()
+    for module in options.modules or MODULES:
+        result = time_import(module, options.repeat)
+        results.append(result)
+        print(f"{module:<28} {result['seconds'] * 1000:>9.1f}ms   {', '.join(result['heavy']) or '-'}")
+        if result['startup'] and result['heavy']:
+            failures.append(f"{module} imports {', '.join(result['heavy'])} at startup")
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            f.write(json.dumps({'options': vars(options), 'results': results}, indent=4))
+
+    if options.baseline:
+        with open(options.baseline, 'r') as f:
+            failures += compare(results, json.loads(f.read()), options.time_tolerance)
+    for failure in failures:
+        print(f'Regression, {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
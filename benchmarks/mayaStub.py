@@ -0,0 +1,2046 @@
+"""
+Lightweight stand-in for maya.cmds, maya.api.OpenMaya, MayaData and PySide2, enough to import and run AnimTools
+outside of Maya. It simulates a scene of rigged characters and records how often, and for how long,
+every cmds and OpenMaya call runs.
+
+    scene = mayaStub.install()
+    scene.build_character('charA', limbs=4, frames=200)
+"""
+from collections import OrderedDict
+import importlib.util
+import functools
+import tempfile
+import fnmatch
+import types
+import json
+import math
+import time
+import sys
+import os
+
+import numpy
+
+SCENE = None
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Call recording
+
+class Recorder(object):
+    def __init__(self):
+        self.depth = 0
+        self.calls = dict()
+        self.seconds = dict()
+
+    def reset(self):
+        self.calls = dict()
+        self.seconds = dict()
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def total_seconds(self):
+        return sum(self.seconds.values())
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def recorded(*args, **kwargs):
+            # Only the outermost call counts, the stand-in calling itself is not API traffic
+            if self.depth:
+                return func(*args, **kwargs)
+
+            self.depth += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.depth -= 1
+                self.calls[name] = self.calls.get(name, 0) + 1
+                self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+        return recorded
+
+    def report(self, top=10):
+        ordered = sorted(self.calls, key=lambda name: self.seconds[name], reverse=True)
+        return [{'call': name, 'count': self.calls[name], 'seconds': self.seconds[name]} for name in ordered[:top]]
+
+
+RECORDER = Recorder()
+
+
+def _record_class(cls, prefix):
+    for name, value in list(vars(cls).items()):
+        if name.startswith('_') and name != '__init__':
+            continue
+        if isinstance(value, staticmethod):
+            setattr(cls, name, staticmethod(RECORDER.wrap(f'{prefix}.{cls.__name__}.{name}', value.__func__)))
+        elif isinstance(value, classmethod):
+            setattr(cls, name, classmethod(RECORDER.wrap(f'{prefix}.{cls.__name__}.{name}', value.__func__)))
+        elif isinstance(value, types.FunctionType):
+            setattr(cls, name, RECORDER.wrap(f'{prefix}.{cls.__name__}.{name}', value))
+    return cls
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Math helpers, row-vector matrices as in Maya
+
+ROTATE_ORDERS = ((0, 1, 2), (1, 2, 0), (2, 0, 1), (0, 2, 1), (1, 0, 2), (2, 1, 0))
+CHANNELS = {'translate': 'translate', 'rotate': 'rotate', 'scale': 'scale', 'jointOrient': 'jointOrient',
+            'rotateAxis': 'rotateAxis', 't': 'translate', 'r': 'rotate', 's': 'scale', 'jo': 'jointOrient',
+            'ra': 'rotateAxis'}
+
+
+def axis_rotation(axis, angle):
+    c, s = math.cos(angle), math.sin(angle)
+    m = numpy.eye(3)
+    i, j = [(1, 2), (2, 0), (0, 1)][axis]
+    m[i, i], m[i, j], m[j, i], m[j, j] = c, s, -s, c
+    return m
+
+
+def euler_matrix(rotation, order=0):
+    m = numpy.eye(3)
+    for axis in ROTATE_ORDERS[order]:
+        m = m @ axis_rotation(axis, rotation[axis])
+    return m
+
+
+def matrix_euler(m, order=0):
+    m = m[:3, :3] / numpy.linalg.norm(m[:3, :3], axis=1, keepdims=True)
+    i, j, k = ROTATE_ORDERS[order]
+    parity = 1.0 if order < 3 else -1.0
+    result = numpy.zeros(3)
+    cos_b = math.hypot(m[i, i], m[i, j])
+    result[j] = math.asin(max(-1.0, min(1.0, -parity * m[i, k])))
+    if cos_b < 1.0e-6:
+        result[i] = math.atan2(-parity * m[k, j], m[j, j])
+    else:
+        result[i] = math.atan2(parity * m[j, k], m[k, k])
+        result[k] = math.atan2(parity * m[i, j], m[i, i])
+    return result
+
+
+def quaternion_matrix(x, y, z, w):
+    n = math.sqrt(x * x + y * y + z * z + w * w) or 1.0
+    x, y, z, w = x / n, y / n, z / n, w / n
+    return numpy.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y + z * w), 2 * (x * z - y * w)],
+        [2 * (x * y - z * w), 1 - 2 * (x * x + z * z), 2 * (y * z + x * w)],
+        [2 * (x * z + y * w), 2 * (y * z - x * w), 1 - 2 * (x * x + y * y)]])
+
+
+def matrix_quaternion(m):
+    m = m[:3, :3] / numpy.linalg.norm(m[:3, :3], axis=1, keepdims=True)
+    trace = m[0, 0] + m[1, 1] + m[2, 2]
+    if trace > 0:
+        s = math.sqrt(trace + 1.0) * 2
+        return (m[1, 2] - m[2, 1]) / s, (m[2, 0] - m[0, 2]) / s, (m[0, 1] - m[1, 0]) / s, 0.25 * s
+    if m[0, 0] > m[1, 1] and m[0, 0] > m[2, 2]:
+        s = math.sqrt(1.0 + m[0, 0] - m[1, 1] - m[2, 2]) * 2
+        return 0.25 * s, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s, (m[1, 2] - m[2, 1]) / s
+    if m[1, 1] > m[2, 2]:
+        s = math.sqrt(1.0 + m[1, 1] - m[0, 0] - m[2, 2]) * 2
+        return (m[0, 1] + m[1, 0]) / s, 0.25 * s, (m[1, 2] + m[2, 1]) / s, (m[2, 0] - m[0, 2]) / s
+    s = math.sqrt(1.0 + m[2, 2] - m[0, 0] - m[1, 1]) * 2
+    return (m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, 0.25 * s, (m[0, 1] - m[1, 0]) / s
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Scene
+
+class Node(object):
+    def __init__(self, scene, name, node_type='transform', parent=None):
+        self.scene = scene
+        self.name = name
+        self.type = node_type
+        self.parent = parent
+        self.alive = True
+
+        self.values = {'translate': numpy.zeros(3), 'rotate': numpy.zeros(3), 'scale': numpy.ones(3),
+                       'jointOrient': numpy.zeros(3), 'rotateAxis': numpy.zeros(3)}
+        self.rotate_order = 0
+        self.attributes = dict()
+        self.curves = dict()  # channel: anim curve node
+        self.overrides = dict()  # channel: value until the time changes
+        self.locked = set()
+        self.constraint = None
+
+        # Anim curve nodes only
+        self.times = numpy.zeros(0)
+        self.keys = numpy.zeros(0)
+        self.target = None
+
+    def __repr__(self):
+        return f'Node({self.name!r})'
+
+    @property
+    def children(self):
+        return [node for node in self.scene.nodes.values() if node.parent is self]
+
+    @staticmethod
+    def split_channel(channel):
+        if channel[-1] in 'XYZ' and channel[:-1] in CHANNELS:
+            return CHANNELS[channel[:-1]], 'XYZ'.index(channel[-1])
+        if channel[-1] in 'xyz' and channel[:-1] in CHANNELS:
+            return CHANNELS[channel[:-1]], 'xyz'.index(channel[-1])
+        return None, None
+
+    def evaluate_curve(self, frame):
+        if not len(self.times):
+            return 0.0
+        return float(numpy.interp(frame, self.times, self.keys))
+
+    def channel(self, channel, frame):
+        if channel in self.overrides and frame == self.scene.time:
+            return self.overrides[channel]
+        if channel in self.curves:
+            return self.curves[channel].evaluate_curve(frame)
+        attr, axis = self.split_channel(channel)
+        if attr is None:
+            return float(self.attributes.get(channel, 1.0 if channel == 'inheritsTransform' else 0.0))
+        return float(self.values[attr][axis])
+
+    def vector(self, attr, frame):
+        return numpy.array([self.channel(f'{attr}{axis}', frame) for axis in 'XYZ'])
+
+    def set_channel(self, channel, value):
+        if channel in self.curves:
+            self.overrides[channel] = float(value)
+        else:
+            attr, axis = self.split_channel(channel)
+            self.values[attr][axis] = value
+        self.scene.dirty()
+
+    def local_matrix(self, frame):
+        m = numpy.eye(4)
+        # Maya's order: scale, rotate axis, rotate, joint orient
+        m[:3, :3] = (numpy.diag(self.vector('scale', frame)) @ euler_matrix(self.values['rotateAxis']) @
+                     euler_matrix(self.vector('rotate', frame), self.rotate_order) @
+                     euler_matrix(self.values['jointOrient']))
+        m[3, :3] = self.vector('translate', frame)
+        return m
+
+    def parent_matrix(self, frame):
+        return self.parent.world_matrix(frame) if self.parent else numpy.eye(4)
+
+    def world_matrix(self, frame):
+        key = (id(self), frame)
+        cache = self.scene.matrix_cache
+        if key not in cache:
+            if self.constraint is not None:
+                cache[key] = self.constraint.world_matrix(frame)
+            else:
+                cache[key] = self.local_matrix(frame) @ self.parent_matrix(frame)
+        return cache[key]
+
+    def set_local_matrix(self, local):
+        self.set_channel('translateX', local[3, 0])
+        self.set_channel('translateY', local[3, 1])
+        self.set_channel('translateZ', local[3, 2])
+        for axis, value in zip('XYZ', matrix_euler(local, self.rotate_order)):
+            self.set_channel(f'rotate{axis}', value)
+
+    def set_world_matrix(self, world):
+        self.set_local_matrix(world @ numpy.linalg.inv(self.parent_matrix(self.scene.time)))
+
+    def set_world_position(self, position):
+        local = numpy.append(position, 1.0) @ numpy.linalg.inv(self.parent_matrix(self.scene.time))
+        for axis, value in zip('XYZ', local[:3]):
+            self.set_channel(f'translate{axis}', value)
+
+    def set_world_rotation(self, rotation):
+        parent = self.parent_matrix(self.scene.time)[:3, :3]
+        parent = parent / numpy.linalg.norm(parent, axis=1, keepdims=True)
+        local = rotation @ parent.T
+        for axis, value in zip('XYZ', matrix_euler(local, self.rotate_order)):
+            self.set_channel(f'rotate{axis}', value)
+
+
+class Scene(object):
+    def __init__(self):
+        self.batch = False
+        self.version = '2024'
+        self.evaluate_on_time_change = True
+        self.reset()
+
+    def reset(self):
+        self.nodes = OrderedDict()
+        self.selection = list()
+        self.time = 1.0
+        self.context_time = None
+        self.min_time = 1.0
+        self.max_time = 100.0
+        self.attributes = dict()
+        self.callbacks = dict()
+        self.next_callback = 1
+        self.commands = dict()
+        self.plugins = set()
+        self.matrix_cache = dict()
+        self.mel_history = list()
+        self.exports = list()
+        self.fbx_range = [1.0, 1.0]
+
+    # Nodes
+
+    def dirty(self):
+        self.matrix_cache = dict()
+
+    def node(self, name):
+        if isinstance(name, Node):
+            return name
+        name = name.split('|')[-1]
+        node = self.nodes.get(name)
+        if node is None or not node.alive:
+            raise RuntimeError(f'No object matches name: {name}')
+        return node
+
+    def exists(self, name):
+        try:
+            self.node(name)
+        except RuntimeError:
+            return False
+        return True
+
+    def create(self, name, node_type='transform', parent=None, translate=None, rotate=None, rotate_order=0):
+        node = Node(self, name, node_type, self.node(parent) if parent else None)
+        if translate is not None:
+            node.values['translate'] = numpy.array(translate, dtype=float)
+        if rotate is not None:
+            node.values['rotate'] = numpy.radians(numpy.array(rotate, dtype=float))
+        node.rotate_order = rotate_order
+        self.nodes[name] = node
+        self.dirty()
+        self.fire('added', node, MObject(node), None)
+        return node
+
+    def delete(self, name):
+        node = self.node(name)
+        for child in node.children:
+            self.delete(child)
+        self.fire('removal', node, MObject(node), None)
+        self.fire('removed', node, MObject(node), None)
+        node.alive = False
+        del self.nodes[node.name]
+        self.selection = [one for one in self.selection if one != node.name]
+        self.dirty()
+
+    def rename(self, name, new_name):
+        node = self.node(name)
+        previous = node.name
+        del self.nodes[previous]
+        node.name = new_name
+        self.nodes[new_name] = node
+        self.fire('name', node, MObject(node), previous, None)
+        return new_name
+
+    def new_file(self):
+        self.nodes = OrderedDict()
+        self.selection = list()
+        self.dirty()
+        self.fire('kAfterNew', None, None)
+
+    def add_callback(self, kind, node, func):
+        callback_id = self.next_callback
+        self.next_callback += 1
+        self.callbacks[callback_id] = (kind, node, func)
+        return callback_id
+
+    def fire(self, kind, node, *args):
+        """Run the callbacks of a kind registered for this node, or for every node."""
+        for callback_kind, owner, func in list(self.callbacks.values()):
+            if callback_kind == kind and (owner is None or owner is node):
+                func(*args)
+
+    def curve(self, node, channel):
+        node = self.node(node)
+        if channel not in node.curves:
+            curve = self.create(f'{node.name}_{channel}', 'animCurve')
+            curve.target = (node, channel)
+            node.curves[channel] = curve
+        return node.curves[channel]
+
+    def key(self, node, channel, frames, values):
+        curve = self.curve(node, channel)
+        curve.times = numpy.asarray(frames, dtype=float)
+        curve.keys = numpy.asarray(values, dtype=float)
+        self.dirty()
+        return curve
+
+    def set_time(self, frame):
+        self.time = float(frame)
+        for node in self.nodes.values():
+            node.overrides = dict()
+        self.dirty()
+
+        # Like Maya, changing time evaluates the whole scene
+        if self.evaluate_on_time_change:
+            for node in self.nodes.values():
+                if node.type in ('transform', 'joint'):
+                    node.world_matrix(self.time)
+
+    @property
+    def eval_time(self):
+        return self.context_time if self.context_time is not None else self.time
+
+    def namespaces(self):
+        found = list()
+        for name in self.nodes:
+            if ':' in name and name.rsplit(':', 1)[0] not in found:
+                found.append(name.rsplit(':', 1)[0])
+        return found
+
+    # Rigs
+
+    def build_character(self, namespace=None, limbs=4, frames=100, joints=0, seed=0):
+        """Rig with limbs arm/leg modules following the Limb_Side(Number)_type_Suffix convention."""
+        rng = numpy.random.default_rng(seed)
+        prefix = f'{namespace}:' if namespace else ''
+        frame_range = numpy.arange(1, frames + 1, dtype=float)
+        self.min_time, self.max_time = 1.0, float(frames)
+
+        self.create(f'{prefix}global_C0_ctl')
+        slots = [('arm', 'L'), ('arm', 'R'), ('leg', 'L'), ('leg', 'R')]
+        for i in range(limbs):
+            limb, side = slots[i % 4]
+            sign = -1.0 if side == 'R' else 1.0
+            module = f'{prefix}{limb}_{side}{i // 4}'
+            height = 150.0 if limb == 'arm' else 90.0
+            origin = (sign * 15.0, height - 20.0 * (i // 4), 0.0)
+
+            fk0_npo = self.create(f'{module}_fk0_npo', parent=f'{prefix}global_C0_ctl', translate=origin)
+            self.create(f'{module}_fk0_ctl', parent=fk0_npo.name, rotate_order=i % 6)
+            self.create(f'{module}_fk1_npo', parent=f'{module}_fk0_ctl', translate=(sign * 30.0, 0, 0))
+            self.create(f'{module}_fk1_ctl', parent=f'{module}_fk1_npo', rotate_order=(i + 1) % 6)
+            self.create(f'{module}_fk2_npo', parent=f'{module}_fk1_ctl', translate=(sign * 28.0, 0, 0))
+            self.create(f'{module}_fk2_ctl', parent=f'{module}_fk2_npo')
+
+            # IK rests within reach so the animation never straightens the chain
+            tip = numpy.array(origin) + (sign * 45.0, -10.0, 5.0)
+            mid = self.node(f'{module}_fk1_ctl').world_matrix(self.time)[3, :3]
+            self.create(f'{module}_ik_npo', parent=f'{prefix}global_C0_ctl', translate=tip)
+            self.create(f'{module}_ik_ctl', parent=f'{module}_ik_npo')
+            self.create(f'{module}_upv_npo', parent=f'{prefix}global_C0_ctl', translate=mid + (0, 0, -30.0))
+            self.create(f'{module}_upv_ctl', parent=f'{module}_upv_npo')
+
+            # Mocap-like motion on both chains
+            phase = rng.uniform(0, math.pi)
+            for ctr, amplitude in ((f'{module}_fk0_ctl', 0.6), (f'{module}_fk1_ctl', 0.8)):
+                for axis in 'YZ':
+                    self.key(ctr, f'rotate{axis}', frame_range,
+                             amplitude * numpy.sin(frame_range / 12.0 + phase + (axis == 'Z')))
+            self.key(f'{module}_fk1_ctl', 'rotateZ', frame_range,
+                     -sign * (0.3 + 0.6 * numpy.abs(numpy.sin(frame_range / 15.0 + phase))))
+            for axis in 'XYZ':
+                self.key(f'{module}_ik_ctl', f'translate{axis}', frame_range,
+                         8.0 * numpy.sin(frame_range / 10.0 + phase + 'XYZ'.index(axis)))
+                self.key(f'{module}_ik_ctl', f'rotate{axis}', frame_range,
+                         0.3 * numpy.sin(frame_range / 9.0 + phase + 'XYZ'.index(axis)))
+
+        if joints:
+            parent = None
+            for j in range(joints):
+                name = f'{prefix}Root_jnt' if not j else f'{prefix}joint{j}_jnt'
+                node = self.create(name, 'joint', parent=parent, translate=(0, 10.0 if j else 100.0, 0),
+                                   rotate_order=j % 6)
+                node.values['jointOrient'] = rng.uniform(-0.5, 0.5, 3)
+                for axis in 'XYZ':
+                    self.key(name, f'rotate{axis}', frame_range,
+                             0.2 * numpy.sin(frame_range / (8.0 + j % 5) + 'XYZ'.index(axis)))
+                parent = name if j % 10 else (f'{prefix}Root_jnt' if j else name)
+
+        return self
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# maya.api.OpenMaya
+
+class MFn(object):
+    kInvalid = 0
+    kDependencyNode = 1
+    kDagNode = 2
+    kTransform = 3
+    kJoint = 4
+    kAnimCurve = 5
+
+
+class MSpace(object):
+    kInvalid = 0
+    kTransform = 1
+    kPreTransform = 2
+    kPostTransform = 3
+    kWorld = 4
+    kObject = kPreTransform
+
+
+class MObject(object):
+    def __init__(self, node=None, data=None):
+        self._node = node
+        self._data = data
+
+    def isNull(self):
+        return self._node is None and self._data is None
+
+    def hasFn(self, fn):
+        node_type = self._node.type if self._node else None
+        return {MFn.kDependencyNode: self._node is not None,
+                MFn.kDagNode: node_type in ('transform', 'joint'),
+                MFn.kTransform: node_type in ('transform', 'joint'),
+                MFn.kJoint: node_type == 'joint',
+                MFn.kAnimCurve: node_type == 'animCurve'}.get(fn, False)
+
+    def apiTypeStr(self):
+        return self._node.type if self._node else 'kInvalid'
+
+    def __eq__(self, other):
+        return isinstance(other, MObject) and other._node is self._node and other._data is self._data
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return id(self._node)
+
+
+MObject.kNullObj = MObject()
+
+
+class MObjectHandle(object):
+    def __init__(self, obj=None):
+        self._obj = obj if obj is not None else MObject()
+
+    def isValid(self):
+        return self._obj._node is not None and self._obj._node.alive
+
+    def isAlive(self):
+        return self.isValid()
+
+    def object(self):
+        return self._obj
+
+    def hashCode(self):
+        return id(self._obj._node)
+
+
+class MMatrix(object):
+    def __init__(self, values=None):
+        if values is None:
+            self._m = numpy.eye(4)
+        elif isinstance(values, MMatrix):
+            self._m = values._m.copy()
+        else:
+            self._m = numpy.array(values, dtype=float).reshape(4, 4)
+
+    def __mul__(self, other):
+        return MMatrix(self._m @ other._m)
+
+    def __getitem__(self, index):
+        return float(self._m.flat[index])
+
+    def __len__(self):
+        return 16
+
+    def __bool__(self):
+        return True
+
+    def inverse(self):
+        return MMatrix(numpy.linalg.inv(self._m))
+
+    def transpose(self):
+        return MMatrix(self._m.T)
+
+    def getElement(self, row, column):
+        return float(self._m[row, column])
+
+    def isEquivalent(self, other, tolerance=1.0e-10):
+        return numpy.allclose(self._m, other._m, atol=tolerance)
+
+
+class MVector(object):
+    def __init__(self, *args):
+        if len(args) == 1:
+            args = tuple(args[0])
+        self.x, self.y, self.z = (list(args) + [0.0, 0.0, 0.0])[:3]
+
+    def _array(self):
+        return numpy.array([self.x, self.y, self.z], dtype=float)
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z)[index]
+
+    def __len__(self):
+        return 3
+
+    def __add__(self, other):
+        return MVector(self._array() + numpy.array(list(other)))
+
+    def __sub__(self, other):
+        return MVector(self._array() - numpy.array(list(other)))
+
+    def __neg__(self):
+        return MVector(-self._array())
+
+    def __mul__(self, other):
+        if isinstance(other, MVector):
+            return float(self._array() @ other._array())
+        return MVector(self._array() * other)
+
+    __rmul__ = __mul__
+
+    def __xor__(self, other):
+        return MVector(numpy.cross(self._array(), other._array()))
+
+    def length(self):
+        return float(numpy.linalg.norm(self._array()))
+
+    def normal(self):
+        length = self.length() or 1.0
+        return MVector(self._array() / length)
+
+    def normalize(self):
+        self.x, self.y, self.z = self.normal()
+        return self
+
+
+MVector.kXaxisVector = MVector(1, 0, 0)
+MVector.kYaxisVector = MVector(0, 1, 0)
+MVector.kZaxisVector = MVector(0, 0, 1)
+
+
+class MQuaternion(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0, w=1.0):
+        self.x, self.y, self.z, self.w = float(x), float(y), float(z), float(w)
+
+    def asMatrix(self):
+        m = numpy.eye(4)
+        m[:3, :3] = quaternion_matrix(self.x, self.y, self.z, self.w)
+        return MMatrix(m)
+
+
+class MEulerRotation(object):
+    kXYZ, kYZX, kZXY, kXZY, kYXZ, kZYX = range(6)
+
+    def __init__(self, x=0.0, y=0.0, z=0.0, order=0):
+        self.x, self.y, self.z, self.order = x, y, z, order
+
+    def asMatrix(self):
+        m = numpy.eye(4)
+        m[:3, :3] = euler_matrix((self.x, self.y, self.z), self.order)
+        return MMatrix(m)
+
+    def reorder(self, order):
+        m = euler_matrix((self.x, self.y, self.z), self.order)
+        return MEulerRotation(*matrix_euler(m, order), order=order)
+
+
+class MTransformationMatrix(object):
+    def __init__(self, matrix=None):
+        self._m = MMatrix(matrix)._m if matrix is not None else numpy.eye(4)
+
+    def asMatrix(self):
+        return MMatrix(self._m)
+
+    def translation(self, space=MSpace.kTransform):
+        return MVector(self._m[3, :3])
+
+    def rotation(self, asQuaternion=False):
+        if asQuaternion:
+            return MQuaternion(*matrix_quaternion(self._m))
+        return MEulerRotation(*matrix_euler(self._m, 0))
+
+    def setRotation(self, quaternion):
+        scale = numpy.linalg.norm(self._m[:3, :3], axis=1, keepdims=True)
+        self._m[:3, :3] = quaternion_matrix(quaternion.x, quaternion.y, quaternion.z, quaternion.w) * scale
+        return self
+
+
+class MTime(object):
+    kInvalid = 0
+    kFilm = 6
+
+    def __init__(self, value=0.0, unit=None):
+        self.value = float(value)
+        self.unit = unit
+
+    @staticmethod
+    def uiUnit():
+        return MTime.kFilm
+
+    def asUnits(self, unit):
+        return self.value
+
+
+class MDistance(object):
+    kCentimeters = 6
+
+    def __init__(self, value=0.0, unit=kCentimeters):
+        self.value = value
+
+    @staticmethod
+    def uiUnit():
+        return MDistance.kCentimeters
+
+    def asUnits(self, unit):
+        return self.value
+
+
+class MAngle(object):
+    kRadians = 1
+    kDegrees = 2
+
+    def __init__(self, value=0.0, unit=kRadians):
+        self.value = value if unit == MAngle.kRadians else math.radians(value)
+
+    @staticmethod
+    def uiUnit():
+        return MAngle.kDegrees
+
+    def asUnits(self, unit):
+        return math.degrees(self.value) if unit == MAngle.kDegrees else self.value
+
+
+class MTimeArray(list):
+    pass
+
+
+class MDoubleArray(list):
+    pass
+
+
+class MDGContext(object):
+    def __init__(self, time=None):
+        self.time = time
+
+    def isNormal(self):
+        return self.time is None
+
+
+MDGContext.kNormal = MDGContext()
+
+
+class MDGContextGuard(object):
+    def __init__(self, context):
+        self.context = context
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = SCENE.context_time
+        SCENE.context_time = self.context.time.value if self.context.time is not None else None
+        return self
+
+    def __exit__(self, *args):
+        SCENE.context_time = self.previous
+
+
+MATRIX_ATTRIBUTES = ('worldMatrix', 'worldInverseMatrix', 'parentMatrix', 'parentInverseMatrix', 'matrix')
+
+
+class MPlug(object):
+    def __init__(self, node=None, attribute=None, index=None):
+        self._node = node
+        self._attribute = attribute
+        self._index = index
+
+    @property
+    def isNull(self):
+        return self._node is None
+
+    @property
+    def isArray(self):
+        return self._attribute in MATRIX_ARRAYS and self._index is None
+
+    @property
+    def isLocked(self):
+        return self._attribute in self._node.locked
+
+    @property
+    def isConnected(self):
+        return self._attribute in self._node.curves
+
+    def elementByLogicalIndex(self, index):
+        return MPlug(self._node, self._attribute, index)
+
+    def node(self):
+        return MObject(self._node)
+
+    def name(self):
+        return f'{self._node.name}.{self._attribute}'
+
+    def partialName(self, *args):
+        return self._attribute
+
+    def source(self):
+        if self._attribute in self._node.curves:
+            return MPlug(self._node.curves[self._attribute], 'output')
+        return MPlug()
+
+    def _matrix(self):
+        frame = SCENE.eval_time
+        node = self._node
+        return {'worldMatrix': lambda: node.world_matrix(frame),
+                'worldInverseMatrix': lambda: numpy.linalg.inv(node.world_matrix(frame)),
+                'parentMatrix': lambda: node.parent_matrix(frame),
+                'parentInverseMatrix': lambda: numpy.linalg.inv(node.parent_matrix(frame)),
+                'matrix': lambda: node.local_matrix(frame),
+                'offsetParentMatrix': lambda: numpy.eye(4)}[self._attribute]()
+
+    def asMObject(self):
+        return MObject(data=MMatrix(self._matrix()))
+
+    def asDouble(self):
+        if self._attribute == 'output':
+            return self._node.evaluate_curve(SCENE.eval_time)
+        return self._node.channel(self._attribute, SCENE.eval_time)
+
+    def asInt(self):
+        if self._attribute == 'rotateOrder':
+            return self._node.rotate_order
+        return int(self._node.attributes.get(self._attribute, 0))
+
+    def asBool(self):
+        return bool(self.asInt())
+
+
+MATRIX_ARRAYS = ('worldMatrix', 'worldInverseMatrix', 'parentMatrix', 'parentInverseMatrix')
+
+
+class MFnMatrixData(object):
+    def __init__(self, obj=None):
+        self._obj = obj
+
+    def matrix(self):
+        return self._obj._data
+
+
+class MDagPath(object):
+    def __init__(self, node=None):
+        self._node = node
+
+    def isValid(self):
+        return self._node is not None and self._node.alive
+
+    def node(self):
+        return MObject(self._node)
+
+    def inclusiveMatrix(self):
+        return MMatrix(self._node.world_matrix(SCENE.eval_time))
+
+    def exclusiveMatrix(self):
+        return MMatrix(self._node.parent_matrix(SCENE.eval_time))
+
+    def inclusiveMatrixInverse(self):
+        return self.inclusiveMatrix().inverse()
+
+    def exclusiveMatrixInverse(self):
+        return self.exclusiveMatrix().inverse()
+
+    def partialPathName(self):
+        return self._node.name
+
+    def fullPathName(self):
+        names = list()
+        node = self._node
+        while node:
+            names.insert(0, node.name)
+            node = node.parent
+        return '|' + '|'.join(names)
+
+
+class MSelectionList(object):
+    def __init__(self):
+        self._items = list()
+
+    def add(self, name, *args):
+        if isinstance(name, (MObject, MDagPath)):
+            self._items.append((name._node, None))
+            return self
+        node_name, _, attribute = name.partition('.')
+        try:
+            node = SCENE.node(node_name)
+        except RuntimeError:
+            raise RuntimeError('(kInvalidParameter): Object does not exist')
+        self._items.append((node, attribute or None))
+        return self
+
+    def length(self):
+        return len(self._items)
+
+    def merge(self, other, *args):
+        self._items += [item for item in other._items if item not in self._items]
+        return self
+
+    def getDependNode(self, index):
+        return MObject(self._items[index][0])
+
+    def getDagPath(self, index):
+        return MDagPath(self._items[index][0])
+
+    def getPlug(self, index):
+        node, attribute = self._items[index]
+        return MPlug(node, attribute)
+
+    def getSelectionStrings(self):
+        return [node.name if not attribute else f'{node.name}.{attribute}' for node, attribute in self._items]
+
+
+class MFnBase(object):
+    def __init__(self, obj=None):
+        self._node = None
+        if isinstance(obj, (MObject, MDagPath)):
+            self._node = obj._node
+
+    def object(self):
+        return MObject(self._node)
+
+
+class MFnDependencyNode(MFnBase):
+    def name(self):
+        return self._node.name
+
+    def setName(self, name):
+        return SCENE.rename(self._node, name)
+
+    def findPlug(self, attribute, want_networked=False):
+        return MPlug(self._node, attribute)
+
+    def hasAttribute(self, attribute):
+        return True
+
+    def getConnections(self):
+        return [MPlug(self._node, channel) for channel in self._node.curves]
+
+
+class MFnDagNode(MFnDependencyNode):
+    def getPath(self):
+        return MDagPath(self._node)
+
+    def parent(self, index=0):
+        return MObject(self._node.parent)
+
+    def fullPathName(self):
+        return MDagPath(self._node).fullPathName()
+
+
+class MFnTransform(MFnDagNode):
+    def transformation(self):
+        return MTransformationMatrix(MMatrix(self._node.local_matrix(SCENE.eval_time)))
+
+    def rotationOrder(self):
+        return self._node.rotate_order + 1
+
+    def translation(self, space):
+        if space == MSpace.kWorld:
+            return MVector(self._node.world_matrix(SCENE.eval_time)[3, :3])
+        return MVector(self._node.vector('translate', SCENE.eval_time))
+
+    def setTranslation(self, vector, space):
+        if space == MSpace.kWorld:
+            self._node.set_world_position(numpy.array(list(vector), dtype=float))
+            return
+        for axis, value in zip('XYZ', vector):
+            self._node.set_channel(f'translate{axis}', value)
+
+    def setRotation(self, rotation, space):
+        if isinstance(rotation, MQuaternion):
+            matrix = quaternion_matrix(rotation.x, rotation.y, rotation.z, rotation.w)
+        else:
+            matrix = euler_matrix((rotation.x, rotation.y, rotation.z), rotation.order)
+
+        if space == MSpace.kWorld:
+            self._node.set_world_rotation(matrix)
+            return
+        for axis, value in zip('XYZ', matrix_euler(matrix, self._node.rotate_order)):
+            self._node.set_channel(f'rotate{axis}', value)
+
+
+class MFnAnimCurve(MFnDependencyNode):
+    kAnimCurveTA = 0
+    kAnimCurveTL = 1
+    kAnimCurveTU = 3
+    kAnimCurveUnknown = 8
+    kTangentGlobal = 0
+    kTangentLinear = 2
+    kTangentAuto = 10
+
+    def create(self, plug, curve_type=None, modifier=None):
+        self._node = SCENE.curve(plug._node, plug._attribute)
+        return MObject(self._node)
+
+    def timedAnimCurveTypeForPlug(self, plug):
+        return self.kAnimCurveTA if plug._attribute.startswith('rotate') else self.kAnimCurveTL
+
+    @property
+    def numKeys(self):
+        return len(self._node.times)
+
+    def input(self, index):
+        return MTime(self._node.times[index])
+
+    def value(self, index):
+        return float(self._node.keys[index])
+
+    def evaluate(self, time):
+        return self._node.evaluate_curve(time.value)
+
+    def remove(self, index, change=None):
+        self._node.times = numpy.delete(self._node.times, index)
+        self._node.keys = numpy.delete(self._node.keys, index)
+        SCENE.dirty()
+
+    def addKey(self, time, value, *args):
+        self.addKeys([time], [value], 0, 0, True)
+
+    def addKeys(self, times, values, tangent_in=0, tangent_out=0, keep_existing=False, change=None):
+        frames = numpy.array([one.value for one in times], dtype=float)
+        values = numpy.array(values, dtype=float)
+        if keep_existing and len(self._node.times):
+            keep = ~numpy.isin(self._node.times, frames)
+            frames = numpy.concatenate([self._node.times[keep], frames])
+            values = numpy.concatenate([self._node.keys[keep], values])
+        order = numpy.argsort(frames, kind='stable')
+        self._node.times, self._node.keys = frames[order], values[order]
+        target, channel = self._node.target
+        target.overrides.pop(channel, None)
+        SCENE.dirty()
+
+
+class MDGModifier(object):
+    def doIt(self):
+        pass
+
+    def undoIt(self):
+        pass
+
+    def createNode(self, node_type):
+        return MObject(SCENE.create(f'{node_type}{len(SCENE.nodes)}', node_type))
+
+    def deleteNode(self, obj):
+        SCENE.delete(obj._node)
+
+    def renameNode(self, obj, name):
+        SCENE.rename(obj._node, name)
+
+    def connect(self, *args):
+        pass
+
+    def disconnect(self, *args):
+        pass
+
+
+class MDagModifier(MDGModifier):
+    pass
+
+
+class MAnimCurveChange(object):
+    def undoIt(self):
+        pass
+
+    def redoIt(self):
+        pass
+
+
+class MMessage(object):
+    @staticmethod
+    def removeCallback(callback_id):
+        SCENE.callbacks.pop(callback_id, None)
+
+    @staticmethod
+    def removeCallbacks(callback_ids):
+        for callback_id in callback_ids:
+            SCENE.callbacks.pop(callback_id, None)
+
+
+class MNodeMessage(MMessage):
+    kAttributeSet = 8
+
+    @staticmethod
+    def addAttributeChangedCallback(obj, func, client_data=None):
+        return SCENE.add_callback('attribute', obj._node, func)
+
+    @staticmethod
+    def addNameChangedCallback(obj, func, client_data=None):
+        return SCENE.add_callback('name', obj._node, func)
+
+    @staticmethod
+    def addNodePreRemovalCallback(obj, func, client_data=None):
+        return SCENE.add_callback('removal', obj._node, func)
+
+    @staticmethod
+    def addNodeAboutToDeleteCallback(obj, func, client_data=None):
+        return SCENE.add_callback('removal', obj._node, func)
+
+
+NODE_TYPES = {'dependNode': None, 'transform': ('transform', 'joint'), 'joint': ('joint',),
+              'animCurve': ('animCurve',)}
+
+
+class MDGMessage(MMessage):
+    @staticmethod
+    def _filtered(func, node_type):
+        types = NODE_TYPES.get(node_type, (node_type,))
+
+        def callback(obj, *args):
+            if types is None or obj._node.type in types:
+                func(obj, *args)
+        return callback
+
+    @staticmethod
+    def addNodeAddedCallback(func, node_type='dependNode', client_data=None):
+        return SCENE.add_callback('added', None, MDGMessage._filtered(func, node_type))
+
+    @staticmethod
+    def addNodeRemovedCallback(func, node_type='dependNode', client_data=None):
+        return SCENE.add_callback('removed', None, MDGMessage._filtered(func, node_type))
+
+    @staticmethod
+    def addConnectionCallback(func, client_data=None):
+        return SCENE.add_callback('connection', None, func)
+
+
+class MAnimMessage(MMessage):
+    @staticmethod
+    def addAnimCurveEditedCallback(func, client_data=None):
+        return SCENE.add_callback('curve edited', None, func)
+
+
+class MEventMessage(MMessage):
+    @staticmethod
+    def addEventCallback(event, func, client_data=None):
+        return SCENE.add_callback(event, None, func)
+
+
+class MDagMessage(MMessage):
+    @staticmethod
+    def addParentAddedCallback(func, client_data=None):
+        return SCENE.add_callback('parent added', None, func)
+
+
+class MSceneMessage(MMessage):
+    kAfterNew = 'kAfterNew'
+    kAfterOpen = 'kAfterOpen'
+    kAfterImport = 'kAfterImport'
+    kAfterLoadReference = 'kAfterLoadReference'
+    kAfterUnloadReference = 'kAfterUnloadReference'
+    kBeforeSave = 'kBeforeSave'
+
+    @staticmethod
+    def addCallback(message, func, client_data=None):
+        return SCENE.add_callback(message, None, func)
+
+
+class MGlobal(object):
+    kReplaceList = 0
+    kAddToList = 2
+
+    @staticmethod
+    def apiVersion():
+        return 20240000
+
+    @staticmethod
+    def setActiveSelectionList(selection, mode=0):
+        nodes = [node.name for node, attribute in selection._items]
+        if mode == MGlobal.kAddToList:
+            nodes = SCENE.selection + [name for name in nodes if name not in SCENE.selection]
+        SCENE.selection = list(dict.fromkeys(nodes))
+
+    @staticmethod
+    def selectCommand(selection, mode=0):
+        MGlobal.setActiveSelectionList(selection, mode)
+
+    @staticmethod
+    def displayInfo(message):
+        print(message)
+
+    @staticmethod
+    def displayWarning(message):
+        print(f'Warning: {message}')
+
+    @staticmethod
+    def displayError(message):
+        print(f'Error: {message}')
+
+
+class MArgList(object):
+    def length(self):
+        return 0
+
+
+class MPxCommand(object):
+    def __init__(self):
+        pass
+
+
+class MFnPlugin(object):
+    def __init__(self, obj=None, vendor='', version='', api_version='Any'):
+        pass
+
+    def registerCommand(self, name, creator, *args):
+        SCENE.commands[name] = creator
+
+    def deregisterCommand(self, name):
+        SCENE.commands.pop(name, None)
+
+
+OPEN_MAYA_CLASSES = [MFn, MSpace, MObject, MObjectHandle, MMatrix, MVector, MQuaternion, MEulerRotation,
+                     MTransformationMatrix, MTime, MDistance, MAngle, MTimeArray, MDoubleArray, MDGContext,
+                     MDGContextGuard, MPlug, MFnMatrixData, MDagPath, MSelectionList, MFnBase, MFnDependencyNode,
+                     MFnDagNode, MFnTransform, MFnAnimCurve, MDGModifier, MDagModifier, MAnimCurveChange, MMessage,
+                     MNodeMessage, MDGMessage, MAnimMessage, MEventMessage, MDagMessage, MSceneMessage, MGlobal,
+                     MArgList, MPxCommand, MFnPlugin]
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# maya.cmds
+
+def _flatten(values):
+    flat = list()
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            flat.extend(_flatten(value))
+        elif value is not None:
+            flat.append(value)
+    return flat
+
+
+def _split_plug(plug):
+    node, _, attribute = plug.partition('.')
+    return SCENE.node(node), attribute
+
+
+class Cmds(object):
+    @staticmethod
+    def about(version=False, batch=False, **kwargs):
+        if batch:
+            return SCENE.batch
+        return SCENE.version
+
+    @staticmethod
+    def ls(*names, **kwargs):
+        selected = kwargs.get('sl') or kwargs.get('selection')
+        names = _flatten(names)
+        if selected and not names:
+            names = list(SCENE.selection)
+
+        if not names and not selected:
+            found = [node.name for node in SCENE.nodes.values()]
+        else:
+            found = list()
+            for pattern in names:
+                if '*' in pattern or '?' in pattern:
+                    found.extend(name for name in SCENE.nodes if fnmatch.fnmatchcase(name, pattern))
+                elif SCENE.exists(pattern):
+                    found.append(SCENE.node(pattern).name)
+
+        node_type = kwargs.get('type') or kwargs.get('typ')
+        if node_type:
+            found = [name for name in found if SCENE.nodes[name].type == node_type]
+
+        if kwargs.get('sns') or kwargs.get('showNamespace'):
+            result = list()
+            for name in found:
+                namespace, _, short = name.rpartition(':')
+                result += [short, namespace or ':']
+            return result
+        return found
+
+    @staticmethod
+    def xform(*names, **kwargs):
+        node = SCENE.node(_flatten(names)[0] if names else SCENE.selection[0])
+        world = kwargs.get('ws') or kwargs.get('worldSpace')
+        translate = kwargs.get('t', kwargs.get('translation'))
+        matrix = kwargs.get('m', kwargs.get('matrix'))
+
+        if kwargs.get('q') or kwargs.get('query'):
+            if matrix:
+                source = node.world_matrix(SCENE.time) if world else node.local_matrix(SCENE.time)
+                return source.flatten().tolist()
+            if translate:
+                if world:
+                    return node.world_matrix(SCENE.time)[3, :3].tolist()
+                return node.vector('translate', SCENE.time).tolist()
+            return None
+
+        if matrix is not None:
+            matrix = numpy.array(list(matrix), dtype=float).reshape(4, 4)
+            if world:
+                node.set_world_matrix(matrix)
+            else:
+                node.set_local_matrix(matrix)
+        if translate is not None:
+            if world:
+                node.set_world_position(numpy.array(list(translate), dtype=float))
+            else:
+                for axis, value in zip('XYZ', translate):
+                    node.set_channel(f'translate{axis}', value)
+
+    @staticmethod
+    def getAttr(plug, **kwargs):
+        if kwargs.get('mi') or kwargs.get('multiIndices'):
+            indices = {int(key[len(plug) + 1:].partition(']')[0]) for key in SCENE.attributes
+                       if key.startswith(f'{plug}[')}
+            return sorted(indices) or None
+
+        node_name, _, attribute = plug.partition('.')
+        if not SCENE.exists(node_name):
+            return SCENE.attributes.get(plug)
+        node = SCENE.node(node_name)
+
+        if kwargs.get('settable') or kwargs.get('se'):
+            return attribute not in node.locked
+        if kwargs.get('lock') or kwargs.get('l'):
+            return attribute in node.locked
+        if attribute == 'rotateOrder':
+            return node.rotate_order
+
+        attr, axis = Node.split_channel(attribute)
+        if attr is None:
+            return node.attributes.get(attribute)
+        value = node.channel(attribute, SCENE.time)
+        return math.degrees(value) if attr == 'rotate' else value
+
+    @staticmethod
+    def setAttr(plug, *values, **kwargs):
+        node_name, _, attribute = plug.partition('.')
+        if not SCENE.exists(node_name):
+            if values:
+                SCENE.attributes[plug] = values[0]
+            return
+        node = SCENE.node(node_name)
+
+        if 'lock' in kwargs or 'l' in kwargs:
+            if kwargs.get('lock', kwargs.get('l')):
+                node.locked.add(attribute)
+            else:
+                node.locked.discard(attribute)
+        if not values:
+            return
+        if attribute == 'rotateOrder':
+            node.rotate_order = int(values[0])
+            SCENE.dirty()
+            return
+
+        attr, axis = Node.split_channel(attribute)
+        if attr is None:
+            node.attributes[attribute] = values[0]
+            return
+        node.set_channel(attribute, math.radians(values[0]) if attr == 'rotate' else values[0])
+
+    @staticmethod
+    def select(*names, **kwargs):
+        names = _flatten(names)
+        if kwargs.get('clear') or kwargs.get('cl'):
+            SCENE.selection = list()
+            return
+        nodes = [SCENE.node(name).name for name in names]
+        if kwargs.get('add'):
+            SCENE.selection += [name for name in nodes if name not in SCENE.selection]
+        else:
+            SCENE.selection = nodes
+
+    @staticmethod
+    def currentTime(*frame, **kwargs):
+        if kwargs.get('q') or kwargs.get('query'):
+            return SCENE.time
+        SCENE.set_time(frame[0])
+        return SCENE.time
+
+    @staticmethod
+    def playbackOptions(**kwargs):
+        if kwargs.get('minTime') or kwargs.get('min') or kwargs.get('animationStartTime'):
+            return SCENE.min_time
+        if kwargs.get('maxTime') or kwargs.get('max') or kwargs.get('animationEndTime'):
+            return SCENE.max_time
+        return None
+
+    @staticmethod
+    def currentUnit(**kwargs):
+        return {'time': 'film', 'linear': 'cm', 'angle': 'deg'}.get(next(iter(kwargs.keys() - {'q', 'query'}), 'time'))
+
+    @staticmethod
+    def listConnections(*names, **kwargs):
+        # Only the anim curves driving nodes, the one connection exports and fingerprints look for
+        if kwargs.get('d', kwargs.get('destination', True)) and not kwargs.get('s', kwargs.get('source', True)):
+            return None
+        curves = [curve.name for name in _flatten(names) for curve in SCENE.node(name).curves.values()]
+        return curves or None
+
+    @staticmethod
+    def namespaceInfo(*args, **kwargs):
+        if kwargs.get('listOnlyDependencyNodes') or kwargs.get('dp'):
+            prefix = f"{args[0].strip(':')}:"
+            return [name for name in SCENE.nodes if name.startswith(prefix)] or None
+        return SCENE.namespaces() + ['UI', 'shared']
+
+    @staticmethod
+    def listHistory(*names, **kwargs):
+        # The nodes and the anim curves driving them, enough for the export hash
+        nodes = [SCENE.node(name) for name in _flatten(names)]
+        return [node.name for node in nodes] + [curve.name for node in nodes for curve in node.curves.values()]
+
+    @staticmethod
+    def objExists(name):
+        return SCENE.exists(name)
+
+    @staticmethod
+    def delete(*names, **kwargs):
+        for name in _flatten(names):
+            if SCENE.exists(name):
+                SCENE.delete(name)
+
+    @staticmethod
+    def rename(name, new_name):
+        return SCENE.rename(name, new_name)
+
+    @staticmethod
+    def keyframe(*names, **kwargs):
+        curve = SCENE.node(_flatten(names)[0])
+        if kwargs.get('q') or kwargs.get('query'):
+            if kwargs.get('tc') or kwargs.get('timeChange'):
+                return curve.times.tolist()
+            if kwargs.get('vc') or kwargs.get('valueChange'):
+                return curve.keys.tolist()
+            return len(curve.times)
+
+    @staticmethod
+    def keyTangent(*names, **kwargs):
+        curve = SCENE.node(_flatten(names)[0])
+        if kwargs.get('q') or kwargs.get('query'):
+            if kwargs.get('weightedTangents') or kwargs.get('wt'):
+                return [False]
+            if any(kwargs.get(flag) for flag in ('itt', 'ott', 'inTangentType', 'outTangentType')):
+                return ['auto'] * len(curve.times)
+            if any(kwargs.get(flag) for flag in ('iw', 'ow', 'inWeight', 'outWeight')):
+                return [1.0] * len(curve.times)
+            return [0.0] * len(curve.times)
+
+    @staticmethod
+    def cutKey(*names, **kwargs):
+        for name in _flatten(names):
+            node = SCENE.node(name)
+            for curve in list(node.curves.values()):
+                SCENE.delete(curve.name)
+            node.curves = dict()
+        SCENE.dirty()
+
+    @staticmethod
+    def setInfinity(*names, **kwargs):
+        return ['constant']
+
+    @staticmethod
+    def evalDeferred(command, **kwargs):
+        if callable(command):
+            command()
+
+    @staticmethod
+    def parentConstraint(driver, driven, **kwargs):
+        driven_node = SCENE.node(driven)
+        driven_node.constraint = SCENE.node(driver)
+        constraint = SCENE.create(f'{driven_node.name}_parentConstraint1', 'parentConstraint', driven_node.name)
+        SCENE.dirty()
+        return [constraint.name]
+
+    @staticmethod
+    def setKeyframe(*names, **kwargs):
+        attribute = kwargs.get('attribute') or kwargs.get('at')
+        frame = kwargs.get('t', kwargs.get('time', SCENE.time))
+        for name in _flatten(names):
+            node = SCENE.node(name)
+            attr, axis = Node.split_channel(attribute)
+            value = kwargs.get('v', kwargs.get('value'))
+            if value is None:
+                value = node.channel(attribute, SCENE.time)
+            elif attr == 'rotate':
+                value = math.radians(value)
+            curve = SCENE.curve(node, attribute)
+            keep = curve.times != frame
+            order = numpy.argsort(numpy.append(curve.times[keep], frame), kind='stable')
+            curve.times = numpy.append(curve.times[keep], frame)[order]
+            curve.keys = numpy.append(curve.keys[keep], value)[order]
+        SCENE.dirty()
+
+    @staticmethod
+    def pluginInfo(name, **kwargs):
+        return os.path.splitext(os.path.basename(name))[0] in SCENE.plugins
+
+    @staticmethod
+    def loadPlugin(path, **kwargs):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if not path.endswith('.py'):  # Maya's own plugins, fbxmaya...
+            SCENE.plugins.add(name)
+            return [name]
+        spec = importlib.util.spec_from_file_location(f'_plugin_{name}', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.initializePlugin(MObject())
+        SCENE.plugins.add(name)
+        return [name]
+
+
+def _cmds_getattr(name):
+    if name.startswith('__'):
+        raise AttributeError(name)
+    if name in SCENE.commands:
+        def command(*args, **kwargs):
+            SCENE.commands[name]().doIt(MArgList())
+        return RECORDER.wrap(f'cmds.{name}', command)
+    return RECORDER.wrap(f'cmds.{name}', lambda *args, **kwargs: None)
+
+
+def _fbx_bake(start, end, path=None):
+    # FBX bakes every selected node on every frame of the range
+    nodes = [SCENE.node(name) for name in SCENE.selection]
+    frame = start
+    while frame <= end:
+        for node in nodes:
+            node.world_matrix(frame)
+        frame += 1.0
+    SCENE.exports.append({'nodes': len(nodes), 'frames': int(end - start + 1), 'path': path})
+    if path:
+        with open(path, 'w') as f:
+            f.write(json.dumps(SCENE.exports[-1]))
+
+
+GAME_PRESET = 'gameExporterPreset2'
+
+
+def _game_clips():
+    """(start, end) of the Game Exporter clips set to export."""
+    clips = list()
+    for index in Cmds.getAttr(f'{GAME_PRESET}.animClips', mi=1) or []:
+        clip = f'{GAME_PRESET}.animClips[{index}]'
+        if SCENE.attributes.get(f'{clip}.exportAnimClip', True):
+            clips.append((SCENE.attributes[f'{clip}.animClipStart'], SCENE.attributes[f'{clip}.animClipEnd']))
+    return clips
+
+
+def _mel_eval(command):
+    SCENE.mel_history.append(command)
+    words = command.rstrip(';').split()
+    if command.startswith('gameExp_DoExport'):
+        for start, end in _game_clips() or [(SCENE.min_time, SCENE.max_time)]:
+            _fbx_bake(start, end)
+    elif words[0] == 'gameExp_AddNewAnimationClip':
+        index = len(Cmds.getAttr(f'{GAME_PRESET}.animClips', mi=1) or [])
+        for attribute, value in (('animClipName', 'clip'), ('animClipStart', SCENE.min_time),
+                                 ('animClipEnd', SCENE.max_time), ('exportAnimClip', True)):
+            SCENE.attributes[f'{GAME_PRESET}.animClips[{index}].{attribute}'] = value
+    elif words[0] == 'gameExp_DeleteAnimationClipLayout':
+        prefix = f'{GAME_PRESET}.animClips[{words[1]}].'
+        for key in [key for key in SCENE.attributes if key.startswith(prefix)]:
+            del SCENE.attributes[key]
+    elif words[0] == 'FBXResetExport':
+        SCENE.fbx_range = [SCENE.min_time, SCENE.max_time]
+    elif words[0] in ('FBXExportBakeComplexStart', 'FBXExportBakeComplexEnd'):
+        SCENE.fbx_range[words[0].endswith('End')] = float(words[-1])
+    elif words[0] == 'FBXExport':
+        _fbx_bake(*SCENE.fbx_range, path=command.split('"')[1])
+
+
+class MQtUtil(object):
+    @staticmethod
+    def mainWindow():
+        return 1
+
+    @staticmethod
+    def findControl(name):
+        return None
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# MayaData
+
+def _skeleton_get(root, *args):
+    root_node = SCENE.node(root)
+    joints, parents, nodes = list(), list(), list()
+
+    def walk(node):
+        joints.append(node.name.rpartition(':')[2])
+        parents.append(node.parent.name.rpartition(':')[2] if node.parent is not root_node.parent else None)
+        nodes.append(node)
+        for child in node.children:
+            if child.type == 'joint':
+                walk(child)
+
+    walk(root_node)
+    return {'joints': joints, 'parents': parents, 'orients': [node.values['jointOrient'].copy() for node in nodes],
+            'rotate_orders': [node.rotate_order for node in nodes]}
+
+
+def _skeleton_load(data):
+    for joint, parent, orient, order in zip(data['joints'], data['parents'], data['orients'], data['rotate_orders']):
+        SCENE.create(joint, 'joint', parent, rotate_order=order).values['jointOrient'] = orient
+
+
+def _constraint_matrix(driver, driven):
+    SCENE.node(driven).set_world_matrix(SCENE.node(driver).world_matrix(SCENE.time))
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# PySide2
+
+class _Stub(object):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _Stub()
+
+    def __call__(self, *args, **kwargs):
+        return _Stub()
+
+    def __xor__(self, other):
+        return self
+
+    __or__ = __and__ = __rxor__ = __ror__ = __rand__ = __xor__
+
+
+class _BoundSignal(object):
+    def __init__(self):
+        self.slots = list()
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, *args):
+        self.slots = list()
+
+    def emit(self, *args):
+        for slot in self.slots:
+            slot(*args)
+
+
+class Signal(object):
+    def __init__(self, *types):
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.__dict__.setdefault(f'_signal_{self.name}', _BoundSignal())
+
+
+class _QtEnum(type):
+    def __getattr__(cls, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return 0
+
+
+class Qt(metaclass=_QtEnum):
+    WindowContextHelpButtonHint = 1 << 14
+    UserRole = 256
+    DisplayRole = 0
+    EditRole = 2
+    ItemIsSelectable = 1
+    ItemIsEditable = 2
+    ItemIsEnabled = 32
+    Key_Delete = 0x01000007
+
+
+class QWidget(_Stub):
+    def __init__(self, *args, **kwargs):
+        self._hidden = True
+
+    def show(self):
+        self._hidden = False
+        self.showEvent(None)
+
+    def showEvent(self, event):
+        pass
+
+    def close(self):
+        self._hidden = True
+        self.closeEvent(None)
+        return True
+
+    def isHidden(self):
+        return self._hidden
+
+    def closeEvent(self, event):
+        pass
+
+    def windowFlags(self):
+        return 0
+
+
+class QDialog(QWidget):
+    pass
+
+
+class QTableWidgetItem(object):
+    def __init__(self, text=''):
+        self._text = text
+        self._data = dict()
+        self._flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        self._table = None
+
+    def text(self):
+        return self._text
+
+    def setText(self, text):
+        self._text = text
+
+    def data(self, role):
+        return self._data.get(role)
+
+    def setData(self, role, value):
+        self._data[role] = value
+
+    def flags(self):
+        return self._flags
+
+    def setFlags(self, flags):
+        self._flags = flags
+
+    def row(self):
+        for row, items in enumerate(self._table._rows):
+            if self in items.values():
+                return row
+        return -1
+
+
+class QTableWidget(QWidget):
+    def __init__(self, *args, **kwargs):
+        super(QTableWidget, self).__init__()
+        self._rows = list()
+        self._selected = list()
+        self.itemSelectionChanged = _BoundSignal()
+        self.itemDoubleClicked = _BoundSignal()
+
+    def rowCount(self):
+        return len(self._rows)
+
+    def setRowCount(self, count):
+        self._rows = self._rows[:count] + [dict() for _ in range(count - len(self._rows))]
+
+    def insertRow(self, row):
+        self._rows.insert(row, dict())
+
+    def removeRow(self, row):
+        if 0 <= row < len(self._rows):
+            self._rows.pop(row)
+
+    def setItem(self, row, column, item):
+        item._table = self
+        self._rows[row][column] = item
+
+    def item(self, row, column):
+        if 0 <= row < len(self._rows):
+            return self._rows[row].get(column)
+        return None
+
+    def clear(self):
+        self._rows = [dict() for _ in self._rows]
+        self._selected = list()
+
+    def selectedItems(self):
+        return list(self._selected)
+
+
+class QModelIndex(object):
+    def __init__(self, model=None, row=-1, column=-1):
+        self._model = model
+        self._row = row
+        self._column = column
+
+    def isValid(self):
+        return self._model is not None
+
+    def row(self):
+        return self._row
+
+    def column(self):
+        return self._column
+
+    def model(self):
+        return self._model
+
+    def data(self, role=0):
+        return self._model.data(self, role)
+
+
+class QAbstractTableModel(object):
+    def __init__(self, parent=None):
+        self.dataChanged = _BoundSignal()
+        self.modelReset = _BoundSignal()
+        self.rowsInserted = _BoundSignal()
+        self.rowsRemoved = _BoundSignal()
+
+    def index(self, row, column, parent=None):
+        if 0 <= row < self.rowCount() and 0 <= column < self.columnCount():
+            return QModelIndex(self, row, column)
+        return QModelIndex()
+
+    def beginResetModel(self):
+        pass
+
+    def endResetModel(self):
+        self.modelReset.emit()
+
+    def beginInsertRows(self, parent, first, last):
+        pass
+
+    def endInsertRows(self):
+        self.rowsInserted.emit()
+
+    def beginRemoveRows(self, parent, first, last):
+        pass
+
+    def endRemoveRows(self):
+        self.rowsRemoved.emit()
+
+
+class QSortFilterProxyModel(QAbstractTableModel):
+    """Plain substring filter on the display text of column 0, rows mapped lazily like Qt's."""
+    def __init__(self, parent=None):
+        super(QSortFilterProxyModel, self).__init__(parent)
+        self._source = None
+        self._filter = ''
+        self._rows = None
+
+    def setSourceModel(self, model):
+        self._source = model
+        for signal in (model.modelReset, model.rowsInserted, model.rowsRemoved, model.dataChanged):
+            signal.connect(self._invalidate)
+        self._invalidate()
+
+    def sourceModel(self):
+        return self._source
+
+    def setFilterCaseSensitivity(self, sensitivity):
+        pass
+
+    def setFilterFixedString(self, text):
+        self._filter = text.lower()
+        self._invalidate()
+
+    def _invalidate(self, *args):
+        self._rows = None
+
+    def _mapping(self):
+        if self._rows is None:
+            source = self._source
+            self._rows = [row for row in range(source.rowCount())
+                          if self._filter in str(source.data(source.index(row, 0), Qt.DisplayRole)).lower()]
+        return self._rows
+
+    def rowCount(self, parent=None):
+        return len(self._mapping())
+
+    def columnCount(self, parent=None):
+        return self._source.columnCount()
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self._source.index(self._mapping()[index.row()], index.column())
+
+    def data(self, index, role=0):
+        return self._source.data(self.mapToSource(index), role)
+
+    def setData(self, index, value, role=0):
+        return self._source.setData(self.mapToSource(index), value, role)
+
+
+class QItemSelectionModel(object):
+    def __init__(self):
+        self._rows = list()
+
+    def selectedRows(self, column=0):
+        return list(self._rows)
+
+
+class QTableView(QWidget):
+    def __init__(self, *args):
+        super(QTableView, self).__init__()
+        self._model = None
+        self._selection = QItemSelectionModel()
+        self.doubleClicked = _BoundSignal()
+
+    def setModel(self, model):
+        self._model = model
+
+    def model(self):
+        return self._model
+
+    def selectionModel(self):
+        return self._selection
+
+    def selectRow(self, row):
+        self._selection._rows = [self._model.index(row, 0)]
+
+    def edit(self, index):
+        pass
+
+
+class QLineEdit(QWidget):
+    def __init__(self, text='', *args):
+        super(QLineEdit, self).__init__()
+        self._text = text
+        self.textChanged = _BoundSignal()
+        self.returnPressed = _BoundSignal()
+
+    def text(self):
+        return self._text
+
+    def setText(self, text):
+        self._text = text
+        self.textChanged.emit(text)
+
+
+class QComboBox(QWidget):
+    def __init__(self, *args):
+        super(QComboBox, self).__init__()
+        self._items = list()
+        self._current = ''
+        self.currentTextChanged = _BoundSignal()
+
+    def clear(self):
+        self._items = list()
+
+    def addItem(self, text):
+        self._items.append(text)
+
+    def currentText(self):
+        return self._current
+
+    def setCurrentText(self, text):
+        self._current = text
+
+
+class QPushButton(QWidget):
+    def __init__(self, *args):
+        super(QPushButton, self).__init__()
+        self.clicked = _BoundSignal()
+
+
+class QTimer(object):
+    """Fires from process_events(), standing in for Qt's event loop."""
+    active = list()
+
+    def __init__(self, *args):
+        self.timeout = _BoundSignal()
+        self.interval = 0
+        self.single_shot = False
+
+    def setInterval(self, interval):
+        self.interval = interval
+
+    def setSingleShot(self, single_shot):
+        self.single_shot = single_shot
+
+    def start(self, *args):
+        if self not in QTimer.active:
+            QTimer.active.append(self)
+
+    def stop(self):
+        if self in QTimer.active:
+            QTimer.active.remove(self)
+
+    def isActive(self):
+        return self in QTimer.active
+
+
+def process_events(limit=100000):
+    """Fire the running timers until they all stopped, returns how many times they fired."""
+    fired = 0
+    while QTimer.active and fired < limit:
+        for timer in list(QTimer.active):
+            if timer.single_shot:
+                timer.stop()
+            timer.timeout.emit()
+            fired += 1
+    return fired
+
+
+class QHeaderView(_Stub):
+    Stretch = 1
+    Fixed = 2
+    ResizeToContents = 3
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Installation
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def _templates_dir():
+    path = os.path.join(tempfile.mkdtemp(prefix='animtools_bench_'), 'templates')
+    os.makedirs(path)
+    with open(os.path.join(path, 'shapes.json'), 'w') as f:
+        f.write(json.dumps({'knot': {}}))
+    return path
+
+
+def install():
+    """Register the stand-in modules in sys.modules, returns the shared Scene. Safe to call several times."""
+    global SCENE
+
+    if SCENE is not None:
+        SCENE.reset()
+        return SCENE
+    SCENE = Scene()
+
+    for cls in OPEN_MAYA_CLASSES:
+        _record_class(cls, 'OpenMaya')
+
+    open_maya = _module('maya.api.OpenMaya', **{cls.__name__: cls for cls in OPEN_MAYA_CLASSES})
+    open_maya.MObject.kNullObj = MObject()
+
+    cmds = _module('maya.cmds', __getattr__=_cmds_getattr)
+    for name, value in vars(Cmds).items():
+        if isinstance(value, staticmethod):
+            setattr(cmds, name, RECORDER.wrap(f'cmds.{name}', value.__func__))
+
+    mel = _module('maya.mel', eval=RECORDER.wrap('mel.eval', _mel_eval))
+    open_maya_ui = _module('maya.OpenMayaUI', MQtUtil=MQtUtil)
+    api = _module('maya.api', OpenMaya=open_maya)
+    api.__path__ = []
+    maya = _module('maya', cmds=cmds, mel=mel, OpenMayaUI=open_maya_ui, api=api)
+    maya.__path__ = []
+
+    templates = _module('MayaData.lib.templates')
+    templates.__path__ = [_templates_dir()]
+    constraint = _module('MayaData.lib.constraint', matrix=RECORDER.wrap('MayaData.constraint.matrix',
+                                                                         _constraint_matrix),
+                         blend_matrix=lambda *args, **kwargs: None)
+    lib = _module('MayaData.lib', constraint=constraint, templates=templates)
+    lib.__path__ = []
+    skeleton = _module('MayaData.skeleton', get=RECORDER.wrap('MayaData.skeleton.get', _skeleton_get),
+                       load=RECORDER.wrap('MayaData.skeleton.load', _skeleton_load))
+    curves = _module('MayaData.curves', get_shape=lambda *args: {}, get_color=lambda *args: 0,
+                     load_shape=lambda *args, **kwargs: kwargs.get('name'), load_color=lambda *args, **kwargs: None)
+    maya_data = _module('MayaData', skeleton=skeleton, curves=curves, lib=lib)
+    maya_data.__path__ = []
+
+    qt_widgets = _module('PySide2.QtWidgets', QWidget=QWidget, QDialog=QDialog, QTableWidget=QTableWidget,
+                         QTableWidgetItem=QTableWidgetItem, QLineEdit=QLineEdit, QComboBox=QComboBox,
+                         QPushButton=QPushButton, QHeaderView=QHeaderView, QHBoxLayout=_Stub, QVBoxLayout=_Stub,
+                         QMenu=_Stub, QLabel=QWidget, QProgressBar=QWidget, QCheckBox=QWidget,
+                         QTableView=QTableView, QAbstractItemView=Qt)
+    qt_core = _module('PySide2.QtCore', Qt=Qt, Signal=Signal, QTimer=QTimer, QObject=_Stub, QModelIndex=QModelIndex,
+                      QAbstractTableModel=QAbstractTableModel, QSortFilterProxyModel=QSortFilterProxyModel)
+    qt_gui = _module('PySide2.QtGui')
+    pyside = _module('PySide2', QtWidgets=qt_widgets, QtCore=qt_core, QtGui=qt_gui)
+    pyside.__path__ = []
+    shiboken = _module('shiboken2', wrapInstance=lambda pointer, cls: cls())
+
+    sys.modules.update({
+        'maya': maya, 'maya.cmds': cmds, 'maya.mel': mel, 'maya.OpenMayaUI': open_maya_ui, 'maya.api': api,
+        'maya.api.OpenMaya': open_maya, 'MayaData': maya_data, 'MayaData.lib': lib,
+        'MayaData.lib.constraint': constraint, 'MayaData.lib.templates': templates, 'MayaData.skeleton': skeleton,
+        'MayaData.curves': curves, 'PySide2': pyside, 'PySide2.QtWidgets': qt_widgets, 'PySide2.QtCore': qt_core,
+        'PySide2.QtGui': qt_gui, 'shiboken2': shiboken,
+    })
+    return SCENE
@@ -0,0 +1,326 @@
+"""
+Benchmarks for AnimTools against the Maya stand-in in mayaStub, runs anywhere numpy is installed.
+
+    python benchmarks/run.py
+    python benchmarks/run.py -s bake_ik_to_fk -c 8 -f 1000 --json result.json
+    python benchmarks/run.py --baseline result.json --tolerance 0.1
+
+Every scenario reports its throughput and how many cmds/OpenMaya calls it made per frame (or per module,
+per selection). With --baseline the run exits with 1 when a scenario makes more calls per unit, or with
+--time-tolerance runs slower, than the baseline allows.
+"""
+from collections import OrderedDict
+import argparse
+import tempfile
+import time
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mayaStub
+
+SCENARIOS = OrderedDict()
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def build(scene, options, joints=0):
+    for c in range(options.characters):
+        scene.build_character(f'char{c}', limbs=options.limbs, frames=options.frames, joints=joints, seed=c)
+
+
+def namespaces(options):
+    return [f'char{c}' for c in range(options.characters)]
+
+
+def discover(scene, options):
+    """ikfkUI with every module of every character registered."""
+    from maya import cmds
+    from AnimTools import ikfkSwitch
+
+    cmds.select([f'{ns}:global_C0_ctl' for ns in namespaces(options)], r=True)
+    ui = ikfkSwitch.ikfkUI()
+    ui.add()
+    ui.ik_fk.workers = options.workers
+    ui.ik_fk.use_timeline = options.timeline
+    ui.ik_fk.reduce_keys = options.reduce
+    return ui
+
+
+def run_bake(direction, scene, options):
+    build(scene, options)
+    ik_fk = discover(scene, options).ik_fk
+
+    mayaStub.RECORDER.reset()
+    start = time.perf_counter()
+    ik_fk.bake(direction)
+    return time.perf_counter() - start, options.frames, 'frames'
+
+
+@scenario('bake_ik_to_fk')
+def bake_ik_to_fk(scene, options):
+    from AnimTools import bakeScheduler
+    return run_bake(bakeScheduler.IK_FOLLOWS_FK, scene, options)
+
+
+@scenario('bake_fk_to_ik')
+def bake_fk_to_ik(scene, options):
+    from AnimTools import bakeScheduler
+    return run_bake(bakeScheduler.FK_FOLLOWS_IK, scene, options)
+
+
+@scenario('ikfkUI.add_modules')
+def add_modules(scene, options):
+    from maya import cmds
+    from AnimTools import ikfkSwitch
+
+    build(scene, options)
+    cmds.select([f'{ns}:global_C0_ctl' for ns in namespaces(options)], r=True)
+    ui = ikfkSwitch.ikfkUI()
+
+    mayaStub.RECORDER.reset()
+    start = time.perf_counter()
+    ui.add()
+    return time.perf_counter() - start, len(ui.ik_fk.modules), 'modules'
+
+
+def selection_ui(scene, options, data_file):
+    from AnimTools import SelectionHelper
+
+    SelectionHelper.SelectUI.data_path = staticmethod(lambda: data_file)
+    return SelectionHelper.SelectUI()
+
+
+@scenario('SelectUI.new_selection')
+def new_selection(scene, options):
+    from maya import cmds
+
+    build(scene, options)
+    with tempfile.TemporaryDirectory() as folder:
+        ui = selection_ui(scene, options, os.path.join(folder, 'SelectionData.json'))
+        controls = cmds.ls('char0:*_ctl')
+
+        mayaStub.RECORDER.reset()
+        start = time.perf_counter()
+        for i in range(options.selections):
+            cmds.select(controls[i % len(controls):] + controls[:i % len(controls)], r=True)
+            ui.new_selection(f'selection{i}')
+        ui.save()  # The batched write the flush timer would make
+        return time.perf_counter() - start, options.selections, 'selections'
+
+
+@scenario('SelectUI.load_selection')
+def load_selection(scene, options):
+    from maya import cmds
+
+    build(scene, options)
+    with tempfile.TemporaryDirectory() as folder:
+        ui = selection_ui(scene, options, os.path.join(folder, 'SelectionData.json'))
+        controls = [name.split(':')[-1] for name in cmds.ls('char0:*_ctl')]
+        for i in range(options.selections):
+            ui.new_selection(f'selection{i}', controls[i % len(controls):] + controls[:i % len(controls)])
+        ui.save()
+
+        mayaStub.RECORDER.reset()
+        start = time.perf_counter()
+        for i, ns in enumerate(namespaces(options)):
+            ui.namespace_box.setCurrentText(ns)
+            for row in range(ui.proxy.rowCount()):
+                ui.load_selection(ui.proxy.index(row, 0))
+        return time.perf_counter() - start, options.selections * options.characters, 'selections'
+
+
+@scenario('SelectUI.reselect')
+def reselect(scene, options):
+    from maya import cmds
+    from AnimTools import SelectionHelper
+
+    build(scene, options)
+    with tempfile.TemporaryDirectory() as folder:
+        ui = selection_ui(scene, options, os.path.join(folder, 'SelectionData.json'))
+        ui.show()  # Starts the scene watcher the resolver relies on
+        controls = [name.split(':')[-1] for name in cmds.ls('char0:*_ctl')]
+        for i in range(10):
+            ui.new_selection(f'selection{i}', controls[i % len(controls):] + controls[:i % len(controls)])
+        ui.save()
+        cmds.select([f'{ns}:global_C0_ctl' for ns in namespaces(options)], r=True)
+        ui.namespace_box.setCurrentText(SelectionHelper.SELECTED)
+
+        mayaStub.RECORDER.reset()
+        start = time.perf_counter()
+        for i in range(options.selections):  # Animators going back and forth between a few sets
+            ui.load_selection(ui.proxy.index(i % 10, 0))
+        return time.perf_counter() - start, options.selections, 'selections'
+
+
+@scenario('SelectUI.refresh')
+def refresh_selections(scene, options):
+    from AnimTools import SelectionHelper, selectionStore
+
+    build(scene, options)
+    with tempfile.TemporaryDirectory() as folder:
+        data_file = os.path.join(folder, 'SelectionData.json')
+        with open(data_file, 'w') as f:
+            f.write(json.dumps({f'selection{i}': [f'control{j}_ctl' for j in range(20)]
+                                for i in range(options.selections)}))
+        SelectionHelper.SelectUI.stores[data_file] = selectionStore.SelectionStore(data_file)
+        ui = selection_ui(scene, options, data_file)
+
+        mayaStub.RECORDER.reset()
+        start = time.perf_counter()
+        SelectionHelper.SelectUI.update_data(ui)
+        for text in ('s', 'se', 'sel', 'selection1', 'selection12'):  # Typing in the filter box
+            ui.filter_line.setText(text)
+            ui.proxy.rowCount()
+        return time.perf_counter() - start, options.selections, 'selections'
+
+
+@scenario('game_exporter')
+def game_exporter(scene, options):
+    from maya import cmds
+    from AnimTools import Exporter
+
+    build(scene, options, joints=options.joints)
+    cmds.select('char0:Root_jnt', r=True)
+
+    mayaStub.RECORDER.reset()
+    start = time.perf_counter()
+    Exporter.game_exporter()
+    return time.perf_counter() - start, options.frames, 'frames'
+
+
+@scenario('game_export_clips')
+def game_export_clips(scene, options):
+    from maya import cmds
+    from AnimTools import Exporter
+
+    build(scene, options, joints=options.joints)
+    cmds.select('char0:Root_jnt', r=True)
+    step = max(options.frames // 4, 1)
+    clips = [(f'clip{i}', 1 + i * step, (i + 1) * step) for i in range(4)]
+
+    mayaStub.RECORDER.reset()
+    start = time.perf_counter()
+    Exporter.game_exporter(clips=clips)
+    return time.perf_counter() - start, 4 * step, 'frames'
+
+
+@scenario('fbx_export')
+def fbx_export(scene, options):
+    from AnimTools import Exporter
+
+    build(scene, options, joints=options.joints)
+    output_dir = tempfile.mkdtemp(prefix='animtools_bench_')
+
+    mayaStub.RECORDER.reset()
+    start = time.perf_counter()
+    Exporter.export_clips('char0', [('clip', 1, options.frames)], output_dir)
+    return time.perf_counter() - start, options.frames, 'frames'
+
+
+def run_scenario(name, options):
+    scene = mayaStub.install()
+    best = None
+    for _ in range(options.repeat):
+        scene.reset()
+        seconds, count, unit = SCENARIOS[name](scene, options)
+        if best is None or seconds < best['seconds']:
+            calls = mayaStub.RECORDER.total_calls()
+            best = {
+                'scenario': name,
+                'unit': unit,
+                'count': count,
+                'seconds': seconds,
+                'per_second': count / seconds if seconds else 0.0,
+                'api_calls': calls,
+                'calls_per_unit': calls / count if count else 0.0,
+                'api_seconds': mayaStub.RECORDER.total_seconds(),
+                'top_calls': mayaStub.RECORDER.report(options.top),
+            }
+    return best
+
+
+def compare(results, baseline, tolerance, time_tolerance):
+    regressions = list()
+    previous = {one['scenario']: one for one in baseline['results']}
+    for result in results:
+        old = previous.get(result['scenario'])
+        if not old:
+            continue
+        if result['calls_per_unit'] > old['calls_per_unit'] * (1.0 + tolerance):
+            regressions.append(f"{result['scenario']}: {result['calls_per_unit']:.1f} calls per {result['unit'][:-1]}"
+                               f" (baseline {old['calls_per_unit']:.1f})")
+        if time_tolerance is not None and result['per_second'] < old['per_second'] / (1.0 + time_tolerance):
+            regressions.append(f"{result['scenario']}: {result['per_second']:.1f} {result['unit']}/s"
+                               f" (baseline {old['per_second']:.1f})")
+    return regressions
+
+
+def print_result(result, verbose):
+    print(f"{result['scenario']:<26} {result['count']:>7} {result['unit']:<10} {result['seconds']:>9.3f}s "
+          f"{result['per_second']:>11.1f}/s {result['api_calls']:>9} calls {result['calls_per_unit']:>9.1f}/"
+          f"{result['unit'][:-1]}")
+    if verbose:
+        for call in result['top_calls']:
+            print(f"    {call['call']:<44} {call['count']:>9} {call['seconds']:>9.3f}s")
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-s', '--scenario', action='append', choices=list(SCENARIOS),
+                        help='Scenario to run, repeat for several, all by default')
+    parser.add_argument('-c', '--characters', type=int, default=4)
+    parser.add_argument('-l', '--limbs', type=int, default=4, help='IK/FK modules per character')
+    parser.add_argument('-f', '--frames', type=int, default=200)
+    parser.add_argument('-j', '--joints', type=int, default=60, help='Skeleton joints for game_exporter')
+    parser.add_argument('--selections', type=int, default=50, help='Stored selections for SelectUI')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Solver processes for bakes')
+    parser.add_argument('--timeline', action='store_true', help='Bake by moving the playhead')
+    parser.add_argument('--reduce', action='store_true', help='Reduce baked keys')
+    parser.add_argument('--profile', action='store_true', help='Run with AnimTools.profiler enabled')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='Keep the fastest of n runs')
+    parser.add_argument('--top', type=int, default=8, help='Slowest API calls kept per scenario')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print the slowest API calls')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.05, help='Allowed increase of calls per unit')
+    parser.add_argument('--time-tolerance', type=float, help='Allowed throughput loss, off by default')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = parse_args(args)
+    mayaStub.install()
+
+    if options.profile:
+        from AnimTools import profiler
+        profiler.enable(os.path.join(tempfile.gettempdir(), 'AnimToolsBenchmarkProfile.json'))
+
+    results = list()
+    for name in options.scenario or SCENARIOS:
+        results.append(run_scenario(name, options))
+        print_result(results[-1], options.verbose)
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            f.write(json.dumps({'options': vars(options), 'results': results}, indent=4))
+
+    if options.baseline:
+        with open(options.baseline, 'r') as f:
+            regressions = compare(results, json.loads(f.read()), options.tolerance, options.time_tolerance)
+        for regression in regressions:
+            print(f'Regression, {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import sys
+import os
+
+# The Maya-free modules are tested straight from the repository, no Maya or install needed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,123 @@
+from AnimTools import animCache, ikfkSolver
+
+import numpy
+import pytest
+
+RANDOM = numpy.random.default_rng(11)
+JOINTS = ('Root_jnt', 'Spine_jnt', 'Head_jnt')
+PARENTS = (None, 0, 1)
+
+
+def local_matrices(frames):
+    rotation = ikfkSolver.euler_to_matrix(RANDOM.uniform(-3.0, 3.0, (len(JOINTS), frames, 3)))
+    scale = RANDOM.uniform(0.5, 2.0, (len(JOINTS), frames, 3))
+    translation = RANDOM.uniform(-100.0, 100.0, (len(JOINTS), frames, 3))
+    return ikfkSolver.compose_matrix(rotation * scale[..., None], translation)
+
+
+def same_values(data, values):
+    """Equal values, quaternions up to their sign which the writer chooses."""
+    data, values = numpy.asarray(data), numpy.asarray(values)
+    sign = numpy.where(numpy.sum(data[..., 3:7] * values[..., 3:7], axis=-1, keepdims=True) < 0.0, -1.0, 1.0)
+    return (numpy.array_equal(data[..., :3], values[..., :3]) and numpy.array_equal(data[..., 7:], values[..., 7:])
+            and numpy.array_equal(data[..., 3:7], values[..., 3:7] * sign))
+
+
+def test_transforms_round_trip():
+    local = local_matrices(20)
+    values = animCache.transforms(local)
+
+    assert values.shape == (20, len(JOINTS), len(animCache.VALUES))
+    assert values.dtype == animCache.DTYPE
+    assert numpy.allclose(animCache.local_matrices(values), local, atol=1.0e-4)
+
+
+def test_write_and_read(tmp_path):
+    path = str(tmp_path / f'shot{animCache.EXTENSION}')
+    values = animCache.transforms(local_matrices(30))
+
+    with animCache.CacheWriter(path, JOINTS, PARENTS, start_frame=1001, frame_rate=24.0) as writer:
+        writer.write(values[:10])
+        writer.write(values[10:])
+
+    header, data = animCache.read(path)
+    assert header['joints'] == list(JOINTS)
+    assert header['parents'] == [-1, 0, 1]
+    assert header['start_frame'] == 1001 and header['frame_rate'] == 24.0
+    assert header['frames'] == 30
+    assert header['offset'] % animCache.ALIGN == 0
+    assert same_values(data, values)
+
+
+def test_unfinished_cache(tmp_path):
+    """A writer that never closed still reads with the frames on disk, a partial frame is dropped."""
+    path = str(tmp_path / 'crashed.animcache')
+    values = animCache.transforms(local_matrices(8))
+
+    writer = animCache.CacheWriter(path, JOINTS, PARENTS)
+    writer.write(values)
+    writer.file.write(b'\0' * 7)
+    writer.file.flush()
+
+    header, data = animCache.read(path)
+    assert header['frames'] == 8
+    assert same_values(data, values)
+    writer.file.close()
+
+
+def test_empty_cache(tmp_path):
+    path = str(tmp_path / 'empty.animcache')
+    animCache.CacheWriter(path, JOINTS, PARENTS).close()
+
+    header, data = animCache.read(path)
+    assert header['frames'] == 0
+    assert data.shape == (0, len(JOINTS), len(animCache.VALUES))
+
+
+def test_wrong_shape(tmp_path):
+    with animCache.CacheWriter(str(tmp_path / 'shape.animcache'), JOINTS, PARENTS) as writer:
+        with pytest.raises(ValueError):
+            writer.write(numpy.zeros((4, 2, len(animCache.VALUES))))
+
+
+def test_not_a_cache(tmp_path):
+    path = tmp_path / 'other.animcache'
+    path.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        animCache.read_header(str(path))
+
+
+def test_newer_version(tmp_path):
+    path = tmp_path / 'future.animcache'
+    path.write_bytes(animCache.PRELUDE.pack(animCache.MAGIC, animCache.VERSION + 1, 2, 0) + b'{}')
+    with pytest.raises(ValueError):
+        animCache.read_header(str(path))
+
+
+def test_quaternions_continuous(tmp_path):
+    """A joint turning past 180 degrees keeps its quaternions on one hemisphere, across writes too."""
+    path = str(tmp_path / 'spin.animcache')
+    angles = numpy.zeros((len(JOINTS), 90, 3))
+    angles[..., 1] = numpy.linspace(0.0, 4.0 * numpy.pi, 90)
+    local = ikfkSolver.compose_matrix(ikfkSolver.euler_to_matrix(angles), numpy.zeros(3))
+    values = animCache.transforms(local)
+    assert (values[..., 6] < 0.0).sum() == 0  # Written as returned, w >= 0 would jump at 180 degrees
+
+    with animCache.CacheWriter(path, JOINTS, PARENTS) as writer:
+        for start in range(0, 90, 7):
+            writer.write(values[start:start + 7])
+
+    data = animCache.read(path)[1]
+    quaternions = data[..., 3:7].astype(numpy.float64)
+    assert numpy.all(numpy.sum(quaternions[1:] * quaternions[:-1], axis=-1) > 0.0)
+    assert same_values(data, values)
+    assert numpy.allclose(animCache.local_matrices(data), local, atol=1.0e-5)
+
+
+def test_continuous_quaternions_previous():
+    quaternions = numpy.array([[0.0, 0.0, 0.0, 1.0], [0.0, 0.0, 0.0, -1.0], [0.0, 0.6, 0.0, 0.8]])
+    assert numpy.array_equal(ikfkSolver.continuous_quaternions(quaternions)[:, 3], [1.0, 1.0, 0.8])
+
+    flipped = ikfkSolver.continuous_quaternions(quaternions, previous=[0.0, 0.0, 0.0, -1.0])
+    assert numpy.array_equal(flipped, -ikfkSolver.continuous_quaternions(quaternions))
+    assert ikfkSolver.continuous_quaternions(numpy.zeros((0, 4))).shape == (0, 4)
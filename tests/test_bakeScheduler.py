@@ -0,0 +1,40 @@
+"""Range bakes on the Maya stand-in the benchmarks run against."""
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import mayaStub  # noqa: E402
+
+
+@pytest.fixture
+def ik_fk():
+    scene = mayaStub.install()
+    scene.build_character('char0', limbs=2, frames=10, seed=3)
+
+    from AnimTools import ikfk
+    ik_fk = ikfk.IKFK()
+    for module, controls in ik_fk.index.modules('char0').items():
+        ik_fk.add_module(module, list(controls))
+    return ik_fk
+
+
+@pytest.mark.parametrize('incremental', (False, True))
+def test_empty_range(ik_fk, incremental):
+    from AnimTools import bakeScheduler
+
+    ik_fk.incremental = incremental
+    ik_fk.start_frame, ik_fk.end_frame = 10, 1
+    writer = ik_fk.bake(bakeScheduler.FK_FOLLOWS_IK)
+
+    assert not writer.channels
+    assert not ik_fk.fingerprints
+
+
+def test_no_dirty_frames_without_frames(ik_fk):
+    from AnimTools import bakeScheduler
+
+    scheduler = bakeScheduler.BakeScheduler(ik_fk, incremental=True)
+    scheduler.add(list(ik_fk.modules), bakeScheduler.IK_FOLLOWS_FK)
+    assert scheduler.dirty_frames(list(ik_fk.modules), []) == {mod: [] for mod in ik_fk.modules}
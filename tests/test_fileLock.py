@@ -0,0 +1,41 @@
+from AnimTools import fileLock
+
+import os
+
+
+def test_file_state(tmp_path):
+    path = tmp_path / 'data.json'
+    assert fileLock.file_state(str(path)) is None
+
+    path.write_text('abc')
+    mtime_ns, size = fileLock.file_state(str(path))
+    assert size == 3 and mtime_ns == os.stat(path).st_mtime_ns
+
+
+def test_acquire_and_release(tmp_path):
+    lock_path = str(tmp_path / 'data.json.lock')
+    lock = fileLock.acquire(lock_path)
+    assert lock is not None and os.path.exists(lock_path)
+    assert fileLock.acquire(lock_path, wait=False) is None
+
+    fileLock.release(lock_path, lock)
+    assert not os.path.exists(lock_path)
+    fileLock.release(lock_path, fileLock.acquire(lock_path))
+
+
+def test_stale_lock_taken_over(tmp_path):
+    lock_path = str(tmp_path / 'data.json.lock')
+    open(lock_path, 'w').close()
+    assert not fileLock.is_stale(lock_path)
+
+    old = os.path.getmtime(lock_path) - fileLock.LOCK_SECONDS - 1
+    os.utime(lock_path, (old, old))
+    assert fileLock.is_stale(lock_path)
+
+    lock = fileLock.acquire(lock_path, wait=False)
+    assert lock is not None
+    fileLock.release(lock_path, lock)
+
+
+def test_acquire_in_missing_directory(tmp_path):
+    assert fileLock.acquire(str(tmp_path / 'missing' / 'data.json.lock')) is None
@@ -0,0 +1,307 @@
+"""
+ikfkSolver against the MVector and MQuaternion math it replaced in ikfkSwitch, rewritten here with plain Python
+vectors so the tests run without Maya.
+"""
+from AnimTools import ikfkSolver
+
+import numpy
+import pytest
+import math
+
+RANDOM = numpy.random.default_rng(7)
+
+
+def add(a, b):
+    return tuple(x + y for x, y in zip(a, b))
+
+
+def sub(a, b):
+    return tuple(x - y for x, y in zip(a, b))
+
+
+def scale(a, s):
+    return tuple(x * s for x in a)
+
+
+def dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def cross(a, b):
+    return a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]
+
+
+def length(a):
+    return math.sqrt(dot(a, a))
+
+
+def normal(a):
+    return scale(a, 1.0 / length(a))
+
+
+def quaternion_axis_angle(angle, axis):
+    """MQuaternion(angle, axis)"""
+    axis = normal(axis)
+    return scale(axis, math.sin(angle / 2.0)) + (math.cos(angle / 2.0),)
+
+
+def quaternion_between(a, b):
+    """MQuaternion(a, b), the shortest arc from a to b"""
+    axis = cross(a, b)
+    angle = math.acos(max(min(dot(normal(a), normal(b)), 1.0), -1.0))
+    if length(axis) < 1.0e-9:
+        return (0.0, 0.0, 0.0, 1.0) if angle < 1.0 else (0.0, 0.0, 1.0, 0.0)
+    return quaternion_axis_angle(angle, axis)
+
+
+def hamilton(q, r):
+    x = q[3] * r[0] + q[0] * r[3] + q[1] * r[2] - q[2] * r[1]
+    y = q[3] * r[1] - q[0] * r[2] + q[1] * r[3] + q[2] * r[0]
+    z = q[3] * r[2] + q[0] * r[1] - q[1] * r[0] + q[2] * r[3]
+    w = q[3] * r[3] - q[0] * r[0] - q[1] * r[1] - q[2] * r[2]
+    return x, y, z, w
+
+
+def rotate_by(vector, q):
+    """MVector.rotateBy(MQuaternion)"""
+    conjugate = (-q[0], -q[1], -q[2], q[3])
+    return hamilton(hamilton(q, tuple(vector) + (0.0,)), conjugate)[:3]
+
+
+def maya_multiply(q, r):
+    """MQuaternion q * r, q applied first as Maya uses row vectors"""
+    return hamilton(r, q)
+
+
+def old_pole_vector(root, mid, end):
+    vector_ab = sub(mid, root)
+    ac_normal = normal(sub(end, root))
+    proj_vector = add(scale(ac_normal, dot(vector_ab, ac_normal)), root)
+    pb_normal = normal(sub(mid, proj_vector))
+    return add(mid, scale(pb_normal, length(vector_ab)))
+
+
+def old_elbow_position(ik_root, ik_end, pole_vector, upper_length, lower_length):
+    ik_vector = sub(ik_end, ik_root)
+    ik_length = length(ik_vector)
+    ik_dir = normal(ik_vector)
+    if ik_length > upper_length + lower_length:
+        ik_length = upper_length + lower_length - 0.001
+
+    a, b, c = upper_length, lower_length, ik_length
+    x = (a ** 2 - b ** 2 + c ** 2) / (2 * c)
+    proj_point = add(ik_root, scale(ik_dir, x))
+
+    pole_dir = sub(pole_vector, ik_root)
+    perp_dir = normal(sub(pole_dir, scale(ik_dir, dot(pole_dir, ik_dir))))
+    h = math.sqrt(max(0.0, a ** 2 - x ** 2))
+    return add(proj_point, scale(perp_dir, h))
+
+
+def old_aim_quaternion(obj_pos, aim_pos, sec_position, mirrored=False):
+    aim_vector = normal(sub(aim_pos, obj_pos))
+    up_vector = normal(sub(sec_position, aim_pos))
+    if mirrored:
+        aim_vector, up_vector = scale(aim_vector, -1), scale(up_vector, -1)
+
+    obj_u = aim_vector
+    obj_w = normal(cross(obj_u, up_vector))
+    obj_v = normal(cross(obj_w, obj_u))
+
+    quaternion = quaternion_between((1.0, 0.0, 0.0), obj_u)
+    sec_axis_rotated = rotate_by((0.0, 1.0, 0.0), quaternion)
+
+    angle = math.acos(max(min(dot(sec_axis_rotated, obj_v), 1.0), -1.0))
+    quaternion_v = quaternion_axis_angle(angle, obj_u)
+    if length(sub(obj_v, rotate_by(sec_axis_rotated, quaternion_v))) > 1.0e-5:
+        angle = (2 * math.pi) - angle
+        quaternion_v = quaternion_axis_angle(angle, obj_u)
+    return maya_multiply(quaternion, quaternion_v)
+
+
+def points(count=3):
+    return [tuple(RANDOM.uniform(-50.0, 50.0, 3)) for _ in range(count)]
+
+
+def same_rotation(quaternion_a, quaternion_b):
+    return abs(abs(dot(quaternion_a, quaternion_b)) - 1.0) < 1.0e-9
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_pole_vector(seed):
+    root, mid, tip = points()
+    assert numpy.allclose(ikfkSolver.pole_vector(root, mid, tip), old_pole_vector(root, mid, tip))
+
+
+@pytest.mark.parametrize('reach', (0.3, 0.7, 0.99, 1.5))
+def test_elbow_position(reach):
+    for _ in range(10):
+        root, direction, pole = points()
+        upper, lower = RANDOM.uniform(5.0, 40.0, 2)
+        end = add(root, scale(normal(direction), (upper + lower) * reach))
+
+        elbow = ikfkSolver.elbow_position(root, end, pole, upper, lower)
+        assert numpy.allclose(elbow, old_elbow_position(root, end, pole, upper, lower))
+        if (upper + lower) * reach > abs(upper - lower):  # Else the chain can't fold short enough
+            assert numpy.isclose(numpy.linalg.norm(elbow - numpy.array(root)), upper)
+
+
+def test_elbow_position_batched():
+    roots, ends, poles = (numpy.array(points(8)) for _ in range(3))
+    lengths = RANDOM.uniform(30.0, 60.0, (8, 2))
+
+    elbows = ikfkSolver.elbow_position(roots, ends, poles, lengths[:, 0], lengths[:, 1])
+    for index, elbow in enumerate(elbows):
+        old = old_elbow_position(roots[index], ends[index], poles[index], *lengths[index])
+        assert numpy.allclose(elbow, old)
+
+
+@pytest.mark.parametrize('mirrored', (False, True))
+def test_aim_matrix(mirrored):
+    for _ in range(20):
+        position, aim, secondary = points()
+        rotation = ikfkSolver.aim_matrix(position, aim, secondary, mirrored)
+        quaternion = old_aim_quaternion(position, aim, secondary, mirrored)
+
+        # Rows are where the old rotation sends the X, Y and Z axes
+        old_rows = [rotate_by(axis, quaternion) for axis in numpy.eye(3)]
+        assert numpy.allclose(rotation, old_rows)
+        assert same_rotation(ikfkSolver.matrix_to_quaternion(rotation), quaternion)
+
+
+def test_aim_matrix_batched_mirror_flags():
+    positions, aims, secondaries = (numpy.array(points(6)) for _ in range(3))
+    mirrored = numpy.arange(6) % 2 == 1
+
+    rotations = ikfkSolver.aim_matrix(positions, aims, secondaries, mirrored)
+    for index, rotation in enumerate(rotations):
+        single = ikfkSolver.aim_matrix(positions[index], aims[index], secondaries[index], mirrored[index])
+        assert numpy.allclose(rotation, single)
+
+
+def random_angles(count):
+    """Euler angles on the branch matrix_to_euler returns, the middle angle within +-pi/2."""
+    angles = RANDOM.uniform(-math.pi, math.pi, (count, 3))
+    angles[:, 1] *= 0.49
+    return angles
+
+
+@pytest.mark.parametrize('rotate_order', range(6))
+def test_euler_round_trip(rotate_order):
+    middle = ikfkSolver.ROTATE_ORDERS[rotate_order][1]
+    angles = RANDOM.uniform(-math.pi, math.pi, (200, 3))
+    angles[:, middle] *= 0.49
+
+    matrices = ikfkSolver.euler_to_matrix(angles, rotate_order)
+    assert numpy.allclose(matrices @ numpy.swapaxes(matrices, -1, -2), numpy.eye(3))
+    assert numpy.allclose(ikfkSolver.matrix_to_euler(matrices, rotate_order), angles)
+
+
+@pytest.mark.parametrize('rotate_order', range(6))
+def test_euler_matches_axis_rotations(rotate_order):
+    """Maya composes the rotations of the first axis in the order first, in row-vector layout."""
+    def axis_matrix(axis, angle):
+        matrix = numpy.eye(3)
+        i, j = (axis + 1) % 3, (axis + 2) % 3
+        matrix[i, i] = matrix[j, j] = math.cos(angle)
+        matrix[i, j], matrix[j, i] = math.sin(angle), -math.sin(angle)
+        return matrix
+
+    for angles in RANDOM.uniform(-math.pi, math.pi, (10, 3)):
+        expected = numpy.eye(3)
+        for axis in ikfkSolver.ROTATE_ORDERS[rotate_order]:
+            expected = expected @ axis_matrix(axis, angles[axis])
+        assert numpy.allclose(ikfkSolver.euler_to_matrix(angles, rotate_order), expected)
+
+
+def test_rotate_x_row_layout():
+    matrix = ikfkSolver.euler_to_matrix([math.pi / 2.0, 0.0, 0.0])
+    assert numpy.allclose(matrix[1], [0.0, 0.0, 1.0])
+
+
+def test_euler_mixed_rotate_orders():
+    angles = random_angles(6)
+    orders = numpy.arange(6)
+    matrices = ikfkSolver.euler_to_matrix(angles, orders)
+    for index, order in enumerate(orders):
+        assert numpy.allclose(matrices[index], ikfkSolver.euler_to_matrix(angles[index], order))
+        assert numpy.allclose(ikfkSolver.euler_to_matrix(ikfkSolver.matrix_to_euler(matrices[index], order), order),
+                              matrices[index])
+
+
+@pytest.mark.parametrize('rotate_order', range(6))
+def test_euler_gimbal_lock(rotate_order):
+    middle = ikfkSolver.ROTATE_ORDERS[rotate_order][1]
+    angles = numpy.array([0.3, 0.3, 0.3])
+    angles[middle] = math.pi / 2.0
+
+    matrix = ikfkSolver.euler_to_matrix(angles, rotate_order)
+    solved = ikfkSolver.matrix_to_euler(matrix, rotate_order)
+    assert numpy.allclose(ikfkSolver.euler_to_matrix(solved, rotate_order), matrix)
+
+
+@pytest.mark.parametrize('rotate_order', range(6))
+def test_quaternion_round_trip(rotate_order):
+    matrices = ikfkSolver.euler_to_matrix(random_angles(200), rotate_order)
+    quaternions = ikfkSolver.matrix_to_quaternion(matrices)
+
+    assert numpy.allclose(numpy.linalg.norm(quaternions, axis=-1), 1.0)
+    assert numpy.all(quaternions[:, 3] >= 0.0)
+    assert numpy.allclose(ikfkSolver.quaternion_to_matrix(quaternions), matrices)
+
+
+def test_quaternion_half_turns():
+    for matrix in (numpy.diag([1.0, -1.0, -1.0]), numpy.diag([-1.0, 1.0, -1.0]), numpy.diag([-1.0, -1.0, 1.0])):
+        assert numpy.allclose(ikfkSolver.quaternion_to_matrix(ikfkSolver.matrix_to_quaternion(matrix)), matrix)
+
+
+def test_quaternion_of_scaled_matrix():
+    """4x4 matrices are accepted, only the rotation is read."""
+    rotation = ikfkSolver.euler_to_matrix([0.4, -0.2, 1.1])
+    matrix = ikfkSolver.compose_matrix(rotation, [1.0, 2.0, 3.0])
+    assert numpy.allclose(ikfkSolver.quaternion_to_matrix(ikfkSolver.matrix_to_quaternion(matrix)), rotation)
+
+
+def scrambled(angles, rotate_order):
+    """Same rotations with random 2 pi turns and Euler branches, as matrix_to_euler or a bake may return them."""
+    angles = numpy.where(RANDOM.random((len(angles), 1)) < 0.5, ikfkSolver.alternate_euler(angles, rotate_order),
+                         angles)
+    return angles + 2.0 * math.pi * RANDOM.integers(-2, 3, angles.shape)
+
+
+@pytest.mark.parametrize('rotate_order', range(6))
+def test_unroll_euler(rotate_order):
+    middle = ikfkSolver.ROTATE_ORDERS[rotate_order][1]
+    frames = numpy.linspace(0.0, 1.0, 120)[:, None]
+    smooth = numpy.array([0.2, 0.1, -0.3]) + frames * numpy.array([9.0, 9.0, -7.0])
+    smooth[:, middle] = 0.4 * numpy.sin(frames[:, 0] * 6.0)
+
+    angles = scrambled(smooth, rotate_order)
+    angles[0] = smooth[0]
+    unrolled = ikfkSolver.unroll_euler(angles, rotate_order)
+
+    assert numpy.allclose(unrolled, smooth)
+    assert numpy.allclose(ikfkSolver.euler_to_matrix(unrolled, rotate_order),
+                          ikfkSolver.euler_to_matrix(angles, rotate_order))
+
+
+def test_unroll_euler_reference():
+    smooth = numpy.array([0.5, 0.2, 0.1]) + numpy.linspace(0.0, 3.0, 50)[:, None]
+    smooth[:, 1] = 0.2
+    reference = smooth[0] + numpy.array([0.01, -0.01, 0.02])
+
+    unrolled = ikfkSolver.unroll_euler(scrambled(smooth + 4.0 * math.pi, 0), reference=reference)
+    assert numpy.allclose(unrolled, smooth)
+
+    shifted = ikfkSolver.unroll_euler(smooth, reference=reference + 2.0 * math.pi)
+    assert numpy.allclose(shifted, smooth + 2.0 * math.pi)
+
+
+def test_unroll_euler_batched():
+    smooth = numpy.stack([numpy.linspace(0.0, 8.0, 40)] * 3, axis=-1)
+    smooth[:, 1] = 0.3
+    angles = numpy.stack([scrambled(smooth, order) for order in (0, 5)])
+    angles[:, 0] = smooth[0]
+
+    assert numpy.allclose(ikfkSolver.unroll_euler(angles, numpy.array([0, 5])), smooth)
+    assert ikfkSolver.unroll_euler(numpy.zeros((0, 3))).shape == (0, 3)
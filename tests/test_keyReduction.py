@@ -0,0 +1,69 @@
+from AnimTools import keyReduction
+
+import numpy
+import pytest
+
+RANDOM = numpy.random.default_rng(3)
+
+
+def interpolate(values, frames, keep):
+    """Linear curves through the kept keys, as the reduced channels are written."""
+    return numpy.array([numpy.interp(frames, frames[mask], channel[mask]) for channel, mask in zip(values, keep)])
+
+
+def test_run_ends():
+    frames = numpy.array([1, 2, 3, 4, 10, 11, 12, 20])
+    expected = [True, False, False, True, True, False, True, True]
+    assert keyReduction.run_ends(frames).tolist() == expected
+    assert keyReduction.run_ends([]).tolist() == []
+
+
+@pytest.mark.parametrize('tolerance', (0.001, 0.01, 0.1, 1.0))
+def test_reduce_within_tolerance(tolerance):
+    frames = numpy.arange(240, dtype=numpy.float64)
+    values = numpy.cumsum(RANDOM.normal(0.0, 0.05, (9, len(frames))), axis=-1)
+
+    keep = keyReduction.reduce(values, frames, tolerance)
+    assert keep.shape == values.shape
+    assert keep[:, 0].all() and keep[:, -1].all()
+    assert numpy.abs(interpolate(values, frames, keep) - values).max() <= tolerance + 1.0e-12
+
+
+def test_reduce_drops_linear_and_static_channels():
+    frames = numpy.arange(100, dtype=numpy.float64)
+    values = numpy.stack([numpy.full(100, 2.5), frames * 0.3 - 4.0])
+
+    keep = keyReduction.reduce(values, frames, 1.0e-6)
+    assert keep.sum(axis=-1).tolist() == [2, 2]
+
+
+def test_reduce_tolerance_per_channel():
+    frames = numpy.arange(200, dtype=numpy.float64)
+    values = numpy.tile(numpy.sin(frames * 0.1), (2, 1))
+
+    keep = keyReduction.reduce(values, frames, [0.001, 0.5])
+    assert keep[0].sum() > keep[1].sum()
+    error = numpy.abs(interpolate(values, frames, keep) - values).max(axis=-1)
+    assert error[0] <= 0.001 and error[1] <= 0.5
+
+
+def test_reduce_keeps_every_run():
+    """Split ranges are never interpolated across the gap."""
+    frames = numpy.concatenate([numpy.arange(0, 50), numpy.arange(100, 150)]).astype(numpy.float64)
+    values = numpy.zeros((1, len(frames)))
+
+    keep = keyReduction.reduce(values, frames, 0.1)
+    assert numpy.flatnonzero(keep[0]).tolist() == [0, 49, 50, 99]
+
+
+def test_reduce_spike():
+    frames = numpy.arange(21, dtype=numpy.float64)
+    values = numpy.zeros((1, 21))
+    values[0, 10] = 1.0
+
+    keep = keyReduction.reduce(values, frames, 0.01)
+    assert numpy.flatnonzero(keep[0]).tolist() == [0, 9, 10, 11, 20]
+
+
+def test_reduce_empty():
+    assert keyReduction.reduce(numpy.zeros((3, 0)), [], 0.1).shape == (3, 0)
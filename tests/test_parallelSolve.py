@@ -0,0 +1,56 @@
+from AnimTools import parallelSolve, ikfkSolver
+
+import numpy
+import pytest
+
+RANDOM = numpy.random.default_rng(5)
+
+
+def sampled(modules, frames):
+    def matrices(*shape):
+        rotation = ikfkSolver.euler_to_matrix(RANDOM.uniform(-3.0, 3.0, shape + (3,)))
+        return ikfkSolver.compose_matrix(rotation, RANDOM.uniform(-50.0, 50.0, shape + (3,)))
+
+    return {
+        'world': matrices(modules, 5, frames),
+        'parent_inverse': matrices(modules, 5, frames),
+        'tip_offset': matrices(modules),
+        'mid_offset': matrices(modules),
+        'rotate_order': RANDOM.integers(0, 6, (modules, 5)),
+        'lengths': RANDOM.uniform(10.0, 40.0, (modules, 2)),
+        'mirrored': numpy.arange(modules) % 2 == 1,
+    }
+
+
+@pytest.fixture(scope='module', autouse=True)
+def pool():
+    yield
+    parallelSolve.shutdown()
+
+
+def test_blocks_cover_every_frame():
+    covered = numpy.zeros((7, 1234), dtype=int)
+    for module_slice, frame_slice in parallelSolve.blocks(7, 1234, 3, block_frames=100):
+        covered[module_slice, frame_slice] += 1
+    assert (covered == 1).all()
+
+
+@pytest.mark.parametrize('direction', (ikfkSolver.IK_FOLLOWS_FK, ikfkSolver.FK_FOLLOWS_IK))
+def test_parallel_matches_serial(direction):
+    if parallelSolve.shared_memory is None:
+        pytest.skip('No shared memory in this Python')
+    data = sampled(3, 2 * parallelSolve.BLOCK_FRAMES + 17)
+
+    serial = ikfkSolver.bake(data, direction)
+    parallel = parallelSolve.solve_parallel(data, direction, 2)
+    assert set(parallel) == set(ikfkSolver.BAKE_CHANNELS[direction])
+    for channel, values in serial.items():
+        assert numpy.allclose(parallel[channel], values)
+
+
+def test_small_batches_solve_serially(monkeypatch):
+    monkeypatch.setattr(parallelSolve, 'solve_parallel', None)  # Would raise if called
+    data = sampled(2, 10)
+    solved = parallelSolve.solve(data, ikfkSolver.IK_FOLLOWS_FK, workers=4)
+    for channel, values in ikfkSolver.bake(data, ikfkSolver.IK_FOLLOWS_FK).items():
+        assert numpy.allclose(solved[channel], values)
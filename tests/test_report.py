@@ -0,0 +1,9 @@
+from AnimTools import report
+
+
+def test_names():
+    assert report.names([]) == ''
+    assert report.names(['a', 'b']) == 'a, b'
+    assert report.names(list('abcde')) == 'a, b, c, d, e'
+    assert report.names(list('abcdefgh')) == 'a, b, c, d, e and 3 more'
+    assert report.names(list('abcd'), shown=2) == 'a, b and 2 more'
@@ -0,0 +1,151 @@
+from AnimTools import selectionStore, fileLock
+
+import pytest
+import json
+import os
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'selections.json')
+
+
+def store_at(path):
+    store = selectionStore.SelectionStore(path)
+    store.reload()
+    return store
+
+
+def test_set_delete_rename(path):
+    store = store_at(path)
+    store.set('hands', ['char:L_hand_ctrl', 'char:R_hand_ctrl'])
+    store.set('feet', ['char:L_foot_ctrl'])
+    store.rename('feet', 'legs')
+    store.delete('hands')
+    assert store.data == {'legs': ['char:L_foot_ctrl']}
+
+    store.flush()
+    assert store_at(path).data == {'legs': ['char:L_foot_ctrl']}
+
+
+def test_flush_appends_one_line_per_change(path):
+    store = store_at(path)
+    store.set('a', ['a1'])
+    store.set('b', ['b1'])
+    assert not os.path.exists(store.log_path)
+
+    store.flush()
+    with open(store.log_path) as f:
+        assert [json.loads(line) for line in f] == [{'set': 'a', 'selection': ['a1']},
+                                                   {'set': 'b', 'selection': ['b1']}]
+    assert store.pending == []
+
+
+def test_reload_only_when_changed(path):
+    store = store_at(path)
+    other = store_at(path)
+    assert not store.reload()
+
+    other.set('face', ['char:jaw_ctrl'])
+    other.flush()
+    assert store.reload()
+    assert store.data == {'face': ['char:jaw_ctrl']}
+    assert not store.reload()
+
+
+def test_reload_keeps_pending_changes(path):
+    store = store_at(path)
+    other = store_at(path)
+    store.set('mine', ['x'])
+
+    other.set('theirs', ['y'])
+    other.flush()
+    store.reload()
+    assert store.data == {'mine': ['x'], 'theirs': ['y']}
+
+    store.flush()
+    assert store_at(path).data == {'mine': ['x'], 'theirs': ['y']}
+
+
+def test_snapshot_and_log(path):
+    with open(path, 'w') as f:
+        f.write(json.dumps({'old': ['a'], 'kept': ['b']}))
+    with open(f'{path}.log', 'w') as f:
+        f.write(json.dumps({'delete': 'old'}) + '\n')
+
+    assert store_at(path).data == {'kept': ['b']}
+
+
+def test_truncated_log_line(path):
+    """A line cut short by a crash is skipped, and the next change is not glued to it."""
+    store = store_at(path)
+    store.set('a', ['a1'])
+    store.flush()
+    with open(store.log_path, 'a') as f:
+        f.write('{"set": "b", "selec')
+
+    store.set('c', ['c1'])
+    store.flush()
+    assert store_at(path).data == {'a': ['a1'], 'c': ['c1']}
+
+
+def test_compaction(path, monkeypatch):
+    monkeypatch.setattr(selectionStore, 'COMPACT_LINES', 10)
+    store = store_at(path)
+    for index in range(12):
+        store.set(f'set{index}', [f'ctrl{index}'])
+    store.flush()
+
+    assert not os.path.exists(store.log_path)
+    assert not os.path.exists(store.lock_path)
+    assert store.log_lines == 0
+    with open(path) as f:
+        assert len(json.loads(f.read())) == 12
+    assert store_at(path).data == store.data
+
+
+def test_compaction_skipped_while_locked(path, monkeypatch):
+    monkeypatch.setattr(selectionStore, 'COMPACT_LINES', 2)
+    store = store_at(path)
+    open(store.lock_path, 'w').close()
+
+    for index in range(4):
+        store.set(f'set{index}', [])
+    store.flush()
+    assert os.path.exists(store.log_path)
+    assert store_at(path).data == store.data
+
+
+def test_stale_lock_removed(path, monkeypatch):
+    monkeypatch.setattr(selectionStore, 'COMPACT_LINES', 2)
+    store = store_at(path)
+    open(store.lock_path, 'w').close()
+    old = os.path.getmtime(store.lock_path) - fileLock.LOCK_SECONDS - 1
+    os.utime(store.lock_path, (old, old))
+
+    store.set('a', [])
+    store.set('b', [])
+    store.set('c', [])
+    store.flush()
+    assert not os.path.exists(store.lock_path)
+
+
+def test_crashed_compaction_is_folded(path):
+    """A log moved aside by a compaction that never finished is still read, before the current log."""
+    with open(f'{path}.log.compacting', 'w') as f:
+        f.write(json.dumps({'set': 'a', 'selection': ['old']}) + '\n')
+    with open(f'{path}.log', 'w') as f:
+        f.write(json.dumps({'set': 'a', 'selection': ['new']}) + '\n')
+
+    store = store_at(path)
+    assert store.data == {'a': ['new']}
+    store.compact()
+    assert not os.path.exists(store.compacting_path)
+    assert store_at(path).data == {'a': ['new']}
+
+
+def test_unreadable_snapshot(path, capsys):
+    with open(path, 'w') as f:
+        f.write('{not json')
+    assert store_at(path).data == {}
+    assert 'Could not read selections' in capsys.readouterr().out